@@ -0,0 +1,334 @@
+"""Headless HTTP API over the dashboard datasets (Arrow IPC or JSON).
+
+    python api_server.py --port 8600
+    curl -H 'Accept: application/vnd.apache.arrow.stream' localhost:8600/top-items?window=last1h
+
+Serves the same scheduler snapshots the pages read (datasets.py), so
+store screens and BI tools no longer have to run page scripts. Each
+response is computed once per (endpoint, parameters, format, data
+version) and shared by every client. Its ETag is a hash of the body,
+so ``If-None-Match`` gets a 304 while the data is unchanged.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from datasets import (RECENT_SALES_MAX, cashier_rollups, get_scheduler, heatmap_pyramid,
+                      recent_blocks)
+from heatmap_pyramid import LEVELS, auto_level
+from sales_buckets import GROUP_COLS, TIME_WINDOWS, VALUE_COLS
+
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+JSON_MIME  = "application/json"
+WAIT_S     = 5.0            # first-load wait before answering 503
+MAX_ENTRIES = 512           # cached bodies (arbitrary date ranges are keys too)
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class NotReady(LookupError):
+    pass
+
+
+# ───────────────────────────────────────────────────────────────
+# 1. Endpoints: parameters → (scheduler jobs, frame builder)
+# ───────────────────────────────────────────────────────────────
+def _slug(s: str) -> str:
+    return "".join(ch for ch in s.lower() if ch.isalnum())
+
+
+_WINDOWS = {_slug(w): w for w in TIME_WINDOWS}
+_LEVELS  = {col for col, _ in GROUP_COLS}
+
+
+def _window(q: dict) -> str:
+    w = _WINDOWS.get(_slug(q.get("window", "Last 1 h")))
+    if w is None:
+        raise BadRequest(f"window must be one of {sorted(_WINDOWS)}")
+    return w
+
+
+def _int(q: dict, name: str, default: int, hi: int) -> int:
+    try:
+        return max(1, min(int(q.get(name, default)), hi))
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer") from None
+
+
+def _measure(q: dict) -> str:
+    by = q.get("by", "totalprice")
+    if by not in VALUE_COLS:
+        raise BadRequest(f"by must be one of {VALUE_COLS}")
+    return by
+
+
+def _days(q: dict, default_days: int) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """[start, end) from ISO dates; whole days so cache keys stay stable."""
+    today = pd.Timestamp.now().normalize()
+    try:
+        start = (pd.Timestamp(q["start"]) if "start" in q
+                 else today - pd.Timedelta(days=default_days - 1))
+        end   = pd.Timestamp(q["end"]) if "end" in q else today + pd.Timedelta(days=1)
+    except ValueError:
+        raise BadRequest("start / end must be ISO dates") from None
+    if end <= start:
+        raise BadRequest("end must be after start")
+    return start, end
+
+
+def _ready(value):
+    if value is None:
+        raise NotReady("dataset is still loading")
+    return value
+
+
+def recent_sales(q: dict):
+    n = _int(q, "n", 50, RECENT_SALES_MAX)
+
+    def build():
+        sales, lines = _ready(recent_blocks(n, WAIT_S))
+        if sales.empty:
+            return sales
+        counts = lines.groupby("saleid").size() if not lines.empty else pd.Series(dtype=int)
+        return sales.assign(lines=sales["saleid"].map(counts).fillna(0).astype(int))
+    return ("recent_blocks",), (n,), build
+
+
+def top_items_endpoint(q: dict):
+    window, by, n = _window(q), _measure(q), _int(q, "n", 20, 1000)
+
+    def build():
+        # the page helper turns a missing snapshot into an empty frame
+        tops = _ready(get_scheduler().snapshot("top_items", WAIT_S))
+        totals = tops.get(window, pd.DataFrame(columns=[*VALUE_COLS, "itemnameenglish"]))
+        return totals.nlargest(n, by).reset_index()
+    return ("top_items",), (window, by, n), build
+
+
+def leaderboard(q: dict):
+    col = q.get("level", "familycat")
+    if col not in _LEVELS:
+        raise BadRequest(f"level must be one of {sorted(_LEVELS)}")
+    window, by, n = _window(q), _measure(q), _int(q, "n", 20, 1000)
+
+    def build():
+        boards = _ready(get_scheduler().snapshot("category_leaderboards", WAIT_S))
+        board = boards.get((col, window), pd.DataFrame(columns=VALUE_COLS))
+        return board.nlargest(n, by).reset_index()
+    return ("category_leaderboards",), (col, window, by, n), build
+
+
+def cashiers(q: dict):
+    start, end = _days(q, 1)
+
+    def build():
+        return _ready(cashier_rollups(WAIT_S)).summary(start, end)
+    return ("cashier_rollups",), (start, end), build
+
+
+def heatmap(q: dict):
+    start, end = _days(q, 7)
+    level = q.get("level", "auto")
+    if level == "auto":
+        level = auto_level(start, end)
+    if level not in LEVELS:
+        raise BadRequest(f"level must be auto or one of {list(LEVELS)}")
+
+    def build():
+        grid = _ready(heatmap_pyramid(WAIT_S)).pivot(level, start, end)
+        grid.columns = [str(c) for c in grid.columns]
+        return grid.rename_axis("row").reset_index()
+    return ("heatmap_pyramid",), (level, start, end), build
+
+
+ENDPOINTS = {
+    "/recent-sales": recent_sales,
+    "/top-items":    top_items_endpoint,
+    "/leaderboard":  leaderboard,
+    "/cashiers":     cashiers,
+    "/heatmap":      heatmap,
+}
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Encoded responses, one computation per data version
+# ───────────────────────────────────────────────────────────────
+def encode(df: pd.DataFrame, fmt: str) -> bytes:
+    if fmt == "arrow":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    # {"columns": [...], "data": [[...], ...]}: column names once, not per row
+    return df.to_json(orient="split", index=False, date_format="iso",
+                      double_precision=6).encode()
+
+
+class ResponseCache:
+    """Latest encoded body per (endpoint, params, format), rebuilt only when
+    the scheduler jobs behind it publish a new snapshot.
+
+    Concurrent requests for a stale key wait for one rebuild; the oldest
+    keys are dropped past ``MAX_ENTRIES``.
+    """
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._entries: dict[tuple, dict] = {}
+        self._building: dict[tuple, threading.Lock] = {}
+        self.stats = {"requests": 0, "hits": 0, "builds": 0, "not_modified": 0,
+                      "unchanged_rebuilds": 0}
+
+    def get(self, key: tuple, version: tuple, build) -> dict:
+        with self._lock:
+            self.stats["requests"] += 1
+            entry = self._entries.get(key)
+            if entry is not None and entry["version"] == version:
+                self.stats["hits"] += 1
+                return entry
+            building = self._building.setdefault(key, threading.Lock())
+        with building:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry["version"] == version:
+                    self.stats["hits"] += 1
+                    return entry
+            body = build()
+            etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+            with self._lock:
+                self.stats["builds"] += 1
+                if entry is not None and entry["etag"] == etag:
+                    self.stats["unchanged_rebuilds"] += 1
+                self._entries.pop(key, None)
+                entry = self._entries[key] = {"version": version, "etag": etag, "body": body}
+                while len(self._entries) > MAX_ENTRIES:
+                    old = next(iter(self._entries))
+                    del self._entries[old]
+                    self._building.pop(old, None)
+            return entry
+
+    def not_modified(self) -> None:
+        with self._lock:
+            self.stats["not_modified"] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries),
+                    "bytes": sum(len(e["body"]) for e in self._entries.values()),
+                    **self.stats}
+
+
+responses = ResponseCache()
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+# ───────────────────────────────────────────────────────────────
+# 3. HTTP handler
+# ───────────────────────────────────────────────────────────────
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "viz-api/1"
+
+    def _send(self, status: int, body: bytes = b"", mime: str = JSON_MIME,
+              headers: dict | None = None) -> None:
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        if status != 304:
+            self.send_header("Content-Type", mime)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304 and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status: int, message: str, headers: dict | None = None) -> None:
+        self._send(status, json.dumps({"error": message}).encode(), headers=headers)
+
+    def _format(self, q: dict) -> str:
+        fmt = q.pop("format", None)
+        if fmt is None:
+            fmt = "arrow" if ARROW_MIME in self.headers.get("Accept", "") else "json"
+        if fmt not in ("arrow", "json"):
+            raise BadRequest("format must be arrow or json")
+        if fmt == "arrow" and pa is None:
+            raise BadRequest("pyarrow is not installed; use format=json")
+        return fmt
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == "/status":
+            stats = get_scheduler().stats()
+            body = {"responses": responses.metrics(),
+                    "jobs": json.loads(stats.to_json(orient="records")) if not stats.empty else []}
+            return self._send(200, json.dumps(body, default=str).encode(),
+                              headers={"Cache-Control": "no-store"})
+        endpoint = ENDPOINTS.get(url.path)
+        if endpoint is None:
+            return self._error(404, f"unknown endpoint; try {sorted(ENDPOINTS)} or /status")
+        try:
+            fmt = self._format(q)
+            jobs, params, build = endpoint(q)
+            version = get_scheduler().version(*jobs)
+            entry = responses.get((url.path, params, fmt), version,
+                                  lambda: encode(build(), fmt))
+        except BadRequest as exc:
+            return self._error(400, str(exc))
+        except NotReady as exc:
+            return self._error(503, str(exc), headers={"Retry-After": "2"})
+        except Exception:
+            # details stay in the server log; clients only learn that it failed
+            traceback.print_exc()
+            return self._error(500, "internal error")
+        headers = {"ETag": entry["etag"], "Cache-Control": "no-cache"}
+        if _etag_matches(self.headers.get("If-None-Match"), entry["etag"]):
+            responses.not_modified()
+            return self._send(304, headers=headers)
+        self._send(200, entry["body"], ARROW_MIME if fmt == "arrow" else JSON_MIME, headers)
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1",
+                    help="bind address; use 0.0.0.0 to serve other machines")
+    ap.add_argument("--port", type=int, default=8600)
+    args = ap.parse_args()
+
+    get_scheduler()                   # start the background jobs before the first client
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    server.daemon_threads = True
+    print(f"serving {sorted(ENDPOINTS)} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
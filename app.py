@@ -1,32 +1,34 @@
 import streamlit as st
+import os
 import pandas as pd
-from db_handler import DatabaseManager
+from psycopg2 import DataError
+from db_handler import DatabaseManager, connection_metrics
+from caching import budget_cache, result_cache
+from compact import compact_frame, compact_report
+from exporter import FORMATS, export_query, read_once
+from fact_frame import get_fact_frames
+from datasets import get_scheduler
+from query_control import query_stats
+from query_plans import plan_sampler
+from schema_registry import TEXT_TYPES, get_registry, quote_ident
+from shared_hot import get_store
+from warmup import start_warmup
 
 st.set_page_config(page_title="Sales & Sales Items Browser", page_icon="🧾")
 st.title("🧾 Sales & Sales Items Data Browser")
 
+# connections, reference data and hot snapshots (already running under serve.py)
+warmup = start_warmup()
+
 db = DatabaseManager()
 
-# Utility: list all table names in the current DB (for Postgres, not sqlite)
-@st.cache_data(ttl=600)
-def get_db_tables():
-    sql = """
-        SELECT table_name
-        FROM information_schema.tables
-        WHERE table_schema = 'public'
-        ORDER BY table_name;
-    """
-    df = db.fetch_data(sql)
-    return df['table_name'].tolist() if not df.empty else []
-
-tables = get_db_tables()
+# Table / column / index metadata: loaded once per process, reloaded on DDL
+registry = get_registry().ensure(db)
+tables = registry.tables()
 st.write("**Available tables in the database:**", tables)
 
 def first_existing_table(possibles):
-    for name in possibles:
-        if name in tables:
-            return name
-    return None
+    return registry.first_existing(possibles)
 
 sales_table = first_existing_table(["sales", "Sales"])
 salesitems_table = first_existing_table(["salesitems", "salesitem", "SalesItems", "SalesItem"])
@@ -35,31 +37,72 @@ if not sales_table or not salesitems_table:
     st.error(f"Could not find required tables. Found: {tables}")
     st.stop()
 
-# Load tables
-@st.cache_data(ttl=300)
-def load_table(tablename, ordercol=None):
-    q = f"SELECT * FROM {tablename}"
-    if ordercol:
-        q += f" ORDER BY {ordercol} DESC"
-    return db.fetch_data(q)
+FILTER_OPS = ["=", ">=", "<="]
+
+def column_controls(table, key, required=()):
+    """Column picker + filters; returns (columns, filters) to push into SQL."""
+    names = registry.column_names(table)
+    picked = st.multiselect("Columns", names, default=names, key=f"{key}_cols")
+    keep = set(picked) | {c for c in required if c in names}   # drill-down keys
+    columns = tuple(c for c in names if c in keep)
+    indexed = registry.indexed_columns(table)
+    filters = []
+    filter_on = st.multiselect("Filter on", names, key=f"{key}_filter_on",
+                               format_func=lambda c: f"{c} (indexed)" if c in indexed else c)
+    types = dict(zip(names, registry.columns(table)["data_type"]))
+    for col in filter_on:
+        c_op, c_val = st.columns([1, 3])
+        ops = FILTER_OPS + (["contains"] if types.get(col) in TEXT_TYPES else [])
+        op = c_op.selectbox(col, ops, key=f"{key}_op_{col}")
+        value = c_val.text_input("Value", key=f"{key}_val_{col}")
+        filters.append((col, op, value))
+    return columns, tuple(filters)
+
+# Load tables (only the picked columns / matching rows leave the database)
+@budget_cache(ttl=300)
+def load_table(tablename, ordercol=None, columns=None, filters=()):
+    q, params = registry.select_sql(tablename, columns, filters, order_by=ordercol)
+    return compact_frame(db.fetch_data(q, params or None), name=f"app:{tablename}")
 
-df_sales = load_table(sales_table, ordercol="saleid")
-df_salesitems = load_table(salesitems_table, ordercol="salesitemid")
+def load_filtered(tablename, **kwargs):
+    """``load_table``, reporting filter values the column type rejects."""
+    try:
+        return load_table(tablename, **kwargs)
+    except DataError as exc:
+        reason = exc.diag.message_primary or str(exc).splitlines()[0]
+        st.error(f"Could not filter {tablename}: {reason}")
+        return pd.DataFrame()
+
+def shipped_caption(table, df, columns):
+    n_all = len(registry.column_names(table))
+    full = registry.row_width(table) * len(df)
+    used = registry.row_width(table, columns) * len(df)
+    st.caption(f"{len(columns)} of {n_all} columns · {len(df):,} rows · "
+               f"≈ {used / 2**20:.1f} MB transferred (SELECT * ≈ {full / 2**20:.1f} MB)")
 
 tab1, tab2 = st.tabs(["Sales", "Sales Items"])
 
 with tab1:
     st.subheader(f"Table: {sales_table}")
+    sales_cols, sales_filters = column_controls(sales_table, "sales", required=["saleid"])
+    df_sales = load_filtered(sales_table, ordercol="saleid", columns=sales_cols,
+                             filters=sales_filters)
     if df_sales.empty:
         st.info("No sales records found.")
     else:
+        shipped_caption(sales_table, df_sales, sales_cols)
         st.dataframe(df_sales, use_container_width=True)
 
 with tab2:
     st.subheader(f"Table: {salesitems_table}")
+    items_cols, items_filters = column_controls(salesitems_table, "salesitems",
+                                                required=["saleid"])
+    df_salesitems = load_filtered(salesitems_table, ordercol="salesitemid",
+                                  columns=items_cols, filters=items_filters)
     if df_salesitems.empty:
         st.info("No sales items found.")
     else:
+        shipped_caption(salesitems_table, df_salesitems, items_cols)
         st.dataframe(df_salesitems, use_container_width=True)
 
 # Optional: Drill-down - show salesitems for a selected sale
@@ -70,3 +113,100 @@ if not df_sales.empty and not df_salesitems.empty:
         subitems = df_salesitems[df_salesitems['saleid'] == selected]
         st.write(f"Items in Sale ID {selected}:")
         st.dataframe(subitems, use_container_width=True)
+
+# Streaming export: COPY / server-side cursor → file, never a full DataFrame
+# (same column pickers as the tabs above)
+_sales_sql, _ = registry.select_sql(sales_table, sales_cols)
+_items_sql, _ = registry.select_sql(salesitems_table, items_cols)
+_in_dates = (f" WHERE saleid IN (SELECT saleid FROM {quote_ident(sales_table)} "
+             "WHERE saletime >= %s AND saletime < %s)")
+EXPORTS = {
+    "Sales": (_sales_sql, _sales_sql + " WHERE saletime >= %s AND saletime < %s"),
+    "Sales Items": (_items_sql, _items_sql + _in_dates),
+    "Items of one sale": (None, _items_sql + " WHERE saleid = %s"),
+}
+
+with st.expander("Export (CSV / Parquet)", expanded=False):
+    what = st.radio("Data", list(EXPORTS), horizontal=True)
+    fmt = st.radio("Format", list(FORMATS), horizontal=True)
+    full_sql, filtered_sql = EXPORTS[what]
+    if full_sql is None:
+        saleid = st.number_input("Sale ID", min_value=1, step=1,
+                                 value=int(df_sales["saleid"].max()) if not df_sales.empty else 1)
+        query, params = filtered_sql, (int(saleid),)
+    elif st.checkbox("Only sales between dates"):
+        today = pd.Timestamp.now().normalize()
+        d0, d1 = st.columns(2)
+        start = d0.date_input("From", today - pd.Timedelta(days=30))
+        end = d1.date_input("To (inclusive)", today)
+        query = filtered_sql
+        params = (pd.Timestamp(start).to_pydatetime(),
+                  (pd.Timestamp(end) + pd.Timedelta(days=1)).to_pydatetime())
+    else:
+        query, params = full_sql, None
+
+    if st.button("Prepare export"):
+        bar = st.progress(0.0, text="Starting export…")
+        shown = {"t": 0.0}
+
+        def show_progress(rows, est, elapsed):
+            if elapsed - shown["t"] < 0.2:          # throttle UI updates
+                return
+            shown["t"] = elapsed
+            bar.progress(min(rows / est, 0.99) if est else 0.0,
+                         text=f"{rows:,} rows · {rows / max(elapsed, 1e-6):,.0f} rows/s")
+
+        name = what.lower().replace(" ", "_")
+        result = export_query(db, query, params, fmt=fmt, name=name, progress=show_progress)
+        bar.progress(1.0, text=f"{result['rows']:,} rows · {result['rows_per_s']:,.0f} rows/s")
+        old = st.session_state.get("export")
+        if old and os.path.exists(old["path"]):
+            os.remove(old["path"])
+        st.session_state["export"] = result
+
+    done = st.session_state.get("export")
+    if done and os.path.exists(done["path"]):
+        st.caption(f"{done['file_name']}: {done['rows']:,} rows, "
+                   f"{done['bytes'] / 2**20:.1f} MB in {done['seconds']:.1f} s "
+                   f"({done['rows_per_s']:,.0f} rows/s)")
+        st.download_button(f"Download {done['file_name']}",
+                           data=lambda path=done["path"]: read_once(path),
+                           file_name=done["file_name"], mime=done["mime"])
+
+# Background jobs keeping the realtime pages' datasets warm
+with st.expander("Background precompute jobs", expanded=False):
+    st.dataframe(get_scheduler().stats(), use_container_width=True)
+    store = get_store()
+    if store is not None:
+        role = "writer" if store.is_writer() else "reader"
+        st.caption(f"Shared hot data: this process is the {role} ({store.root})")
+    st.caption("Enriched sales fact frame shared by the family and profit pages")
+    st.json(get_fact_frames().metrics())
+
+# Memory held by the compacted cached frames (for sizing workers)
+with st.expander("Cached frame memory", expanded=False):
+    st.dataframe(compact_report(), use_container_width=True)
+
+# Byte-budgeted result cache behind load_table and the other table loads
+with st.expander("Result cache", expanded=False):
+    st.json(result_cache.metrics())
+
+# Connection health: breaker state, cold starts, warm spares
+with st.expander("Database connection", expanded=False):
+    st.json(connection_metrics())
+    st.caption("Schema registry")
+    st.json(registry.metrics())
+    st.caption("Statement timeouts and rerun cancellations per query class")
+    st.dataframe(query_stats(), use_container_width=True)
+
+# Per-statement timings; slow ones get a sampled EXPLAIN (ANALYZE, BUFFERS)
+with st.expander("Query timings and sampled plans", expanded=False):
+    st.dataframe(plan_sampler.report(), use_container_width=True)
+    st.caption("Full plans are appended to the plan log; run "
+               "tools/explain_report.py for seq-scan flags and index suggestions.")
+
+# What the startup warm-up did and how long each step took
+with st.expander("Startup warm-up", expanded=False):
+    st.caption(f"State: {warmup.state}"
+               + (f", {warmup.finished - warmup.started:.1f} s" if warmup.finished else ""))
+    st.dataframe(warmup.report(), use_container_width=True)
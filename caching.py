@@ -0,0 +1,363 @@
+import functools
+import os
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import RerunException, StopException
+
+from db_handler import DatabaseManager
+from db_resilience import DatabaseUnavailable, metrics as conn_metrics
+
+# ───────────────────────────────────────────────────────────────
+# 1. Single-flight cache with stale-while-revalidate
+# ───────────────────────────────────────────────────────────────
+class _Call:
+    """One in-flight load that concurrent misses wait on."""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class _Entry:
+    __slots__ = ("value", "stored", "call", "refreshing")
+
+    def __init__(self):
+        self.value      = None
+        self.stored     = None      # monotonic time of last successful load
+        self.call       = None      # _Call while a blocking load runs
+        self.refreshing = False     # background refresh running
+
+
+class SingleFlightCache:
+    """Process-wide cache that runs at most one load per key at a time.
+
+    * fresh  (age < ttl)                → cached value
+    * stale  (age < ttl + max_stale)    → cached value, one background refresh
+    * miss / too old                    → one caller loads, the rest wait for it
+    * database unavailable              → last loaded value, however old
+
+    Keys come from widget values, so at most ``max_entries`` are kept:
+    past that, entries too old to serve go first, then the least recently
+    used. Entries with a load in flight are never dropped.
+    """
+
+    def __init__(self, name: str, ttl: float, max_stale: float, max_entries: int = 256):
+        self.name        = name
+        self.ttl         = ttl
+        self.max_stale   = max_stale
+        self.max_entries = max_entries
+        self._lock       = threading.Lock()
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self.stats = {
+            "hits": 0, "misses": 0, "coalesced": 0, "stale_served": 0,
+            "refreshes": 0, "refresh_errors": 0, "evictions": 0,
+            "last_stale_age_s": 0.0, "max_stale_age_s": 0.0,
+        }
+
+    def _evict(self, keep) -> None:
+        # lock held; ``keep`` is the entry about to be loaded
+        now  = time.monotonic()
+        idle = [k for k, e in self._entries.items()
+                if k != keep and e.call is None and not e.refreshing]
+        too_old = [k for k in idle if self._entries[k].stored is None
+                   or now - self._entries[k].stored >= self.ttl + self.max_stale]
+        for key in dict.fromkeys([*too_old, *idle]):     # too old first, then LRU
+            if len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+            self.stats["evictions"] += 1
+
+    def get(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+                if len(self._entries) > self.max_entries:
+                    self._evict(key)
+            self._entries.move_to_end(key)
+            if entry.stored is not None:
+                age = time.monotonic() - entry.stored
+                if age < self.ttl:
+                    self.stats["hits"] += 1
+                    return entry.value
+                if age < self.ttl + self.max_stale:
+                    self.stats["stale_served"] += 1
+                    self.stats["last_stale_age_s"] = age
+                    self.stats["max_stale_age_s"]  = max(self.stats["max_stale_age_s"], age)
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        threading.Thread(target=self._refresh, args=(entry, loader),
+                                         name=f"swr-{self.name}", daemon=True).start()
+                    return entry.value
+            call = entry.call
+            leader = call is None
+            if leader:
+                call = entry.call = _Call()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            call.event.wait()
+            if isinstance(call.error, (StopException, RerunException)):
+                # the leader's session stopped or moved on; its rerun is not ours
+                return self.get(key, loader)
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = loader()
+        except DatabaseUnavailable as exc:
+            with self._lock:
+                last_good = entry.stored is not None
+                if last_good:
+                    self.stats["stale_served"] += 1
+            if not last_good:
+                call.error = exc
+                raise
+            conn_metrics.add(stale_served=1)
+            call.value = entry.value
+            return call.value
+        except BaseException as exc:
+            call.error = exc
+            raise
+        else:
+            with self._lock:
+                entry.value, entry.stored = call.value, time.monotonic()
+            return call.value
+        finally:
+            with self._lock:
+                entry.call = None
+            call.event.set()
+
+    def _refresh(self, entry: _Entry, loader) -> None:
+        try:
+            value = loader()
+        except Exception:
+            with self._lock:
+                self.stats["refresh_errors"] += 1
+        else:
+            with self._lock:
+                entry.value, entry.stored = value, time.monotonic()
+                self.stats["refreshes"] += 1
+        finally:
+            with self._lock:
+                entry.refreshing = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_registry_lock = threading.Lock()
+_caches: dict[str, SingleFlightCache] = {}
+
+
+@st.cache_resource(show_spinner=False)
+def loader_db(name: str) -> DatabaseManager:
+    """Process-level connection for the loads of one single-flight cache."""
+    return DatabaseManager(key=f"single-flight:{name}", query_class="interactive")
+
+
+def single_flight(ttl: float, max_stale: float = 30.0, max_entries: int = 256):
+    """Decorator: coalesce concurrent misses and serve stale while refreshing.
+
+    The loader is called with the cache's own ``DatabaseManager`` first:
+    a load serves every session and refreshes run on a background thread,
+    so neither may use the calling session's connection. Unlike
+    ``st.cache_data`` the cached object is shared, not copied, so callers
+    must treat returned frames as read-only.
+    """
+    def decorator(func):
+        # pages re-run their module body, so key by source location
+        name = f"{os.path.basename(func.__code__.co_filename)}:{func.__qualname__}"
+        with _registry_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                cache = _caches[name] = SingleFlightCache(name, ttl, max_stale, max_entries)
+            cache.ttl, cache.max_stale, cache.max_entries = ttl, max_stale, max_entries
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            db = loader_db(name)
+            return cache.get(key, lambda: func(db, *args, **kwargs))
+
+        wrapper.clear = cache.clear
+        return wrapper
+    return decorator
+
+
+def cache_metrics() -> pd.DataFrame:
+    """One row per single-flight cache with hit / coalescing / staleness stats."""
+    with _registry_lock:
+        caches = list(_caches.values())
+    rows = []
+    for cache in caches:
+        with cache._lock:
+            rows.append({"cache": cache.name, "entries": len(cache._entries), **cache.stats})
+    return pd.DataFrame(rows)
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Byte-budgeted result cache storing compressed Arrow IPC
+# ───────────────────────────────────────────────────────────────
+try:
+    import pyarrow as pa
+except ImportError:                 # fall back to pickle + zlib
+    pa = None
+
+RESULT_CACHE_BYTES = int(float(os.environ.get("RESULT_CACHE_MB", "256")) * 2**20)
+
+
+def _encode(value, codec: str) -> tuple[bytes, str]:
+    """Serialize ``value``; DataFrames go through Arrow IPC when available.
+
+    Frames Arrow cannot type (mixed-type object columns, e.g. json values)
+    take the pickle path like any other value.
+    """
+    if pa is not None and isinstance(value, pd.DataFrame):
+        try:
+            table = pa.Table.from_pandas(value, preserve_index=True)
+        except pa.ArrowException:
+            pass
+        else:
+            sink = pa.BufferOutputStream()
+            opts = pa.ipc.IpcWriteOptions(compression=codec)
+            with pa.ipc.new_stream(sink, table.schema, options=opts) as writer:
+                writer.write_table(table)
+            return sink.getvalue().to_pybytes(), "arrow"
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1), "pickle"
+
+
+def _decode(blob: bytes, kind: str):
+    if kind == "arrow":
+        return pa.ipc.open_stream(pa.py_buffer(blob)).read_all().to_pandas()
+    return pickle.loads(zlib.decompress(blob))
+
+
+class ResultCache:
+    """Process-wide cache bounded by total compressed bytes.
+
+    Values are stored compressed and decoded on every hit, so callers get
+    their own copy (same contract as ``st.cache_data``). When the budget
+    is exceeded the least recently (``lru``) or least frequently
+    (``lfu``) used entries are evicted.
+    """
+
+    def __init__(self, budget_bytes: int = RESULT_CACHE_BYTES,
+                 policy: str = "lru", codec: str = "lz4"):
+        self.budget_bytes = budget_bytes
+        self.policy       = policy
+        self.codec        = codec
+        self._lock        = threading.Lock()
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._bytes       = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0,
+                      "expired": 0, "rejected": 0}
+
+    def get(self, key, ttl: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry["stored"] > ttl:
+                # kept (until evicted) as a fallback for get_stale()
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return False, None
+            entry["uses"] += 1
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            blob, kind = entry["blob"], entry["kind"]
+        return True, _decode(blob, kind)
+
+    def get_stale(self, key):
+        """Last stored value regardless of age: (hit, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            blob, kind = entry["blob"], entry["kind"]
+        return True, _decode(blob, kind)
+
+    def put(self, key, value) -> None:
+        blob, kind = _encode(value, self.codec)
+        size = len(blob)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.budget_bytes:
+                self.stats["rejected"] += 1
+                return
+            while self._bytes + size > self.budget_bytes and self._entries:
+                self._drop(self._victim())
+                self.stats["evictions"] += 1
+            self._entries[key] = {"blob": blob, "kind": kind, "size": size,
+                                  "stored": time.monotonic(), "uses": 0}
+            self._bytes += size
+
+    def _victim(self):
+        if self.policy == "lfu":
+            # fewest uses; the dict order breaks ties towards least recent
+            return min(self._entries, key=lambda k: self._entries[k]["uses"])
+        return next(iter(self._entries))
+
+    def _drop(self, key) -> None:
+        self._bytes -= self._entries.pop(key)["size"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "budget_bytes": self.budget_bytes, "policy": self.policy,
+                    "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0,
+                    **self.stats}
+
+
+result_cache = ResultCache()
+
+
+def budget_cache(ttl: float):
+    """Decorator: memoise in ``result_cache`` (shared byte budget) for ``ttl`` s.
+
+    While the database is unavailable the last result is served past ``ttl``.
+    """
+    def decorator(func):
+        name = f"{os.path.basename(func.__code__.co_filename)}:{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            hit, value = result_cache.get(key, ttl)
+            if hit:
+                return value
+            try:
+                value = func(*args, **kwargs)
+            except DatabaseUnavailable:
+                # database down: fall back to the last result, if any
+                hit, value = result_cache.get_stale(key)
+                if not hit:
+                    raise
+                conn_metrics.add(stale_served=1)
+                return value
+            result_cache.put(key, value)
+            return value
+
+        return wrapper
+    return decorator
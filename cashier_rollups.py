@@ -0,0 +1,203 @@
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from sale_watermark import SaleWatermark, sale_batch
+
+# ───────────────────────────────────────────────────────────────
+# 1. Cashier × minute and cashier × day sales rollups
+# ───────────────────────────────────────────────────────────────
+MINUTE_HORIZON_DAYS = 35        # fine grain: a month of shifts
+DAY_HORIZON_DAYS    = 400       # coarse grain: a year+ of daily totals
+
+STAT_COLS = ["total", "count", "max_sale", "min_sale", "last_sale"]
+# how each rollup column combines when buckets are merged
+_MERGE = {"total": "sum", "count": "sum", "max_sale": "max",
+          "min_sale": "min", "last_sale": "max"}
+
+_ROLLUP_SQL = f"""
+    SELECT date_trunc(%s, saletime)   AS t,
+           cashier,
+           SUM(totalamount)           AS total,
+           COUNT(*)                   AS count,
+           MAX(totalamount)           AS max_sale,
+           MIN(totalamount)           AS min_sale,
+           MAX(saletime)              AS last_sale
+      FROM sales
+     WHERE {sale_batch()}
+       AND saletime >= LOCALTIMESTAMP - INTERVAL '%s days'
+     GROUP BY 1, 2
+"""
+
+
+def _empty_rollup() -> pd.DataFrame:
+    return pd.DataFrame({
+        "t":         pd.Series(dtype="datetime64[ns]"),
+        "cashier":   pd.Series(dtype="object"),
+        "total":     pd.Series(dtype="float64"),
+        "count":     pd.Series(dtype="int64"),
+        "max_sale":  pd.Series(dtype="float64"),
+        "min_sale":  pd.Series(dtype="float64"),
+        "last_sale": pd.Series(dtype="datetime64[ns]"),
+    })
+
+
+def _normalise(rows: pd.DataFrame) -> pd.DataFrame:
+    rows = rows.copy()
+    rows["t"]         = pd.to_datetime(rows["t"]).astype("datetime64[ns]")
+    rows["last_sale"] = pd.to_datetime(rows["last_sale"]).astype("datetime64[ns]")
+    rows["cashier"]   = rows["cashier"].fillna("Unknown").astype(str)
+    rows["count"]     = rows["count"].astype("int64")
+    for col in ("total", "max_sale", "min_sale"):
+        rows[col] = pd.to_numeric(rows[col], errors="coerce").astype("float64")
+    return rows
+
+
+def _merge(rollup: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Fold ``new`` rows into a time-sorted rollup, re-aggregating the tail."""
+    if new.empty:
+        return rollup
+    cut  = rollup["t"].searchsorted(new["t"].min()) if len(rollup) else 0
+    tail = pd.concat([rollup.iloc[cut:], new], ignore_index=True)
+    tail = (tail.groupby(["t", "cashier"], as_index=False).agg(_MERGE)
+                .sort_values("t"))
+    return pd.concat([rollup.iloc[:cut], tail], ignore_index=True)
+
+
+def _trim(rollup: pd.DataFrame, oldest: pd.Timestamp) -> pd.DataFrame:
+    if len(rollup) and rollup["t"].iat[0] < oldest:
+        rollup = rollup.iloc[rollup["t"].searchsorted(oldest):].reset_index(drop=True)
+    return rollup
+
+
+class CashierRollups:
+    """Per-cashier sale stats per minute and per day, extended by saleid.
+
+    The first refresh loads both grains from the database; later refreshes
+    read only sales not folded yet (see ``SaleWatermark``) at minute grain
+    and fold the same rows, floored to the day, into the day rollup.
+    """
+
+    def __init__(self):
+        self.minutes     = _empty_rollup()
+        self.days        = _empty_rollup()
+        self.watermark   = SaleWatermark()
+        self.now         = pd.Timestamp.now().floor("min")
+        self._lock       = threading.Lock()
+
+    @property
+    def last_saleid(self) -> int:
+        return self.watermark.last_saleid
+
+    def _load(self, db, grain: str, batch: tuple, days: int) -> pd.DataFrame:
+        rows = db.fetch_data(_ROLLUP_SQL, (grain, *batch, days))
+        return _normalise(rows) if not rows.empty else _empty_rollup()
+
+    # ────────── maintenance ──────────
+    def refresh(self, db) -> int:
+        with self._lock:
+            top = db.fetch_data("SELECT COALESCE(MAX(saleid), 0) AS m, "
+                                "LOCALTIMESTAMP AS now FROM sales")
+            self.now = pd.Timestamp(top["now"].iat[0]).floor("min")
+            first = self.last_saleid == 0
+            batch = self.watermark.batch(db, int(top["m"].iat[0]))
+            if batch is not None:
+                if first:
+                    self.minutes = self._load(db, "minute", batch, MINUTE_HORIZON_DAYS)
+                    self.days    = self._load(db, "day", batch, DAY_HORIZON_DAYS)
+                else:
+                    new = self._load(db, "minute", batch, MINUTE_HORIZON_DAYS)
+                    self.minutes = _merge(self.minutes, new)
+                    self.days    = _merge(self.days, new.assign(t=new["t"].dt.normalize()))
+            self.watermark.advance()
+            self.minutes = _trim(self.minutes, self.now - pd.Timedelta(days=MINUTE_HORIZON_DAYS))
+            self.days    = _trim(self.days, self.now.normalize() - pd.Timedelta(days=DAY_HORIZON_DAYS))
+            return self.last_saleid
+
+    def install(self, minutes: pd.DataFrame, days: pd.DataFrame,
+                now: pd.Timestamp, last_saleid: int) -> None:
+        """Adopt rollups published by another process (see shared_hot)."""
+        with self._lock:
+            self.minutes, self.days = minutes, days
+            self.now, self.watermark = now, SaleWatermark(last_saleid)
+
+    # ────────── queries ──────────
+    @staticmethod
+    def _between(rollup: pd.DataFrame, start, end) -> pd.DataFrame:
+        lo, hi = rollup["t"].searchsorted([start, end])
+        return rollup.iloc[lo:hi]
+
+    @staticmethod
+    def _span(minutes: pd.DataFrame, now: pd.Timestamp,
+              start: pd.Timestamp, end: pd.Timestamp) -> tuple[pd.Timestamp, pd.Timestamp]:
+        # before the minute horizon only whole days are available
+        fine_from = minutes["t"].iat[0] if len(minutes) else now
+        if start < fine_from:
+            start = start.floor("D")
+        if end.floor("D") < fine_from:
+            end = end.ceil("D")
+        return start, end
+
+    def span(self, start, end) -> tuple[pd.Timestamp, pd.Timestamp]:
+        """The [start, end) ``summary`` covers: partial days older than the
+        minute rollup are widened to whole days."""
+        return self._span(self.minutes, self.now, pd.Timestamp(start), pd.Timestamp(end))
+
+    def _rows(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        """Rollup rows covering ``span(start, end)``: whole days from the day
+        rollup, the partial first / last day from the minute rollup."""
+        minutes, days = self.minutes, self.days
+        start, end = self._span(minutes, self.now, start, end)
+        first_day = start.ceil("D")
+        last_day  = end.floor("D")
+        if first_day >= last_day:
+            return self._between(minutes, start, end)
+        return pd.concat([self._between(minutes, start, first_day),
+                          self._between(days, first_day, last_day),
+                          self._between(minutes, last_day, end)],
+                         ignore_index=True)
+
+    def summary(self, start, end) -> pd.DataFrame:
+        """total / count / avg / max / min / last sale per cashier in [start, end)."""
+        rows = self._rows(pd.Timestamp(start), pd.Timestamp(end))
+        if rows.empty:
+            return pd.DataFrame(columns=["cashier", "total_sales", "num_sales", "avg_sale",
+                                         "max_sale", "min_sale", "last_sale"])
+        out = rows.groupby("cashier").agg(_MERGE)
+        return (pd.DataFrame({
+                    "total_sales": out["total"],
+                    "num_sales":   out["count"],
+                    "avg_sale":    out["total"] / out["count"],
+                    "max_sale":    out["max_sale"],
+                    "min_sale":    out["min_sale"],
+                    "last_sale":   out["last_sale"],
+                })
+                .sort_values("total_sales", ascending=False)
+                .reset_index())
+
+    def series(self, start, end, freq: str) -> pd.DataFrame:
+        """Sales total per (cashier, t) at ``freq`` (day grain for ``"D"``)."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        rollup = self.days if freq == "D" else self.minutes
+        rows = self._between(rollup, start.floor("D") if freq == "D" else start, end)
+        if rows.empty:
+            return pd.DataFrame(columns=["cashier", "t", "total"])
+        rows = rows.assign(t=rows["t"].dt.floor(freq))
+        return rows.groupby(["cashier", "t"], as_index=False)["total"].sum()
+
+
+def series_freq(span: pd.Timedelta) -> str:
+    """Series resolution for a time span (keeps point counts flat)."""
+    if span <= pd.Timedelta(hours=2):
+        return "min"
+    if span <= pd.Timedelta(days=1):
+        return "15min"
+    if span <= pd.Timedelta(days=7):
+        return "h"
+    return "D"
+
+
+@st.cache_resource(show_spinner=False)
+def get_cashier_rollups() -> CashierRollups:
+    return CashierRollups()
@@ -0,0 +1,126 @@
+import decimal
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ───────────────────────────────────────────────────────────────
+# 1. Process-wide category dictionary
+# ───────────────────────────────────────────────────────────────
+# Repeated strings become categoricals whose categories are shared by
+# every cached frame, so each distinct label is stored once per process.
+SHARED_CATEGORY_COLS = ["familycat", "sectioncat", "departmentcat",
+                        "classcat", "cashier", "itemnameenglish"]
+
+# pages normalise missing labels with fillna("Unknown").replace("", …)
+_SEED_CATEGORIES = ["Unknown", ""]
+
+
+class SharedCategories:
+    """Append-only category list per column name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cats: dict[str, pd.Index] = {}
+
+    def encode(self, col: str, values: pd.Series) -> pd.Categorical:
+        with self._lock:
+            cats = self._cats.get(col)
+            if cats is None:
+                cats = pd.Index(_SEED_CATEGORIES, dtype=object)
+            new = pd.Index(values.dropna().unique()).difference(cats)
+            if len(new):
+                cats = cats.append(new)
+                self._cats[col] = cats
+            else:
+                self._cats.setdefault(col, cats)
+        return pd.Categorical(values, categories=cats)
+
+    def categories(self, col: str) -> pd.Index:
+        """Current categories of ``col``; codes issued earlier stay valid."""
+        with self._lock:
+            return self._cats.get(col, pd.Index(_SEED_CATEGORIES, dtype=object))
+
+    def sizes(self) -> dict:
+        with self._lock:
+            return {col: len(cats) for col, cats in self._cats.items()}
+
+
+shared_categories = SharedCategories()
+
+# ───────────────────────────────────────────────────────────────
+# 2. compact_frame: downcast ids, Decimals and repeated strings
+# ───────────────────────────────────────────────────────────────
+_report_lock = threading.Lock()
+_report: dict[str, dict] = {}
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """Deep memory footprint of ``df`` in bytes."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _first_is(col: pd.Series, kind) -> bool:
+    first = col.first_valid_index()
+    return first is not None and isinstance(col[first], kind)
+
+
+def compact_frame(df: pd.DataFrame, name: str | None = None,
+                  amount_scale: int | None = None) -> pd.DataFrame:
+    """Return a memory-compact copy of ``df``.
+
+    * integer columns are downcast to the smallest signed int that fits
+    * ``Decimal`` amounts become float32, or ints scaled by ``amount_scale``
+      (e.g. 100 → cents) when no value is missing
+    * ``SHARED_CATEGORY_COLS`` use the process-wide categories; other
+      low-cardinality strings get their own categorical
+
+    With ``name`` the before/after sizes are kept for ``compact_report()``.
+    """
+    if df.empty:
+        return df
+    before = frame_bytes(df) if name else 0
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_integer_dtype(s):
+            out[col] = pd.to_numeric(s, downcast="integer")
+        elif pd.api.types.is_float_dtype(s):
+            out[col] = s.astype(np.float32)
+        elif s.dtype == object and _first_is(s, decimal.Decimal):
+            if amount_scale and s.notna().all():
+                scaled = (s.astype(float) * amount_scale).round().astype(np.int64)
+                out[col] = pd.to_numeric(scaled, downcast="integer")
+            else:
+                out[col] = s.astype(float).astype(np.float32)
+        elif col in SHARED_CATEGORY_COLS:
+            out[col] = pd.Series(shared_categories.encode(col, s), index=s.index)
+        elif ((s.dtype == object or pd.api.types.is_string_dtype(s)) and _first_is(s, str)
+              and s.nunique(dropna=True) <= len(s) // 2):
+            out[col] = s.astype("category")
+        else:
+            out[col] = s
+    compact = pd.DataFrame(out, index=df.index)
+    if amount_scale:
+        compact.attrs["amount_scale"] = amount_scale
+    if name:
+        after = frame_bytes(compact)
+        with _report_lock:
+            _report[name] = {"frame": name, "rows": len(df),
+                             "bytes_before": before, "bytes_after": after,
+                             "ratio": after / before if before else 1.0}
+    return compact
+
+
+def compact_report() -> pd.DataFrame:
+    """Latest before/after byte counts per named frame, plus a total row."""
+    with _report_lock:
+        rows = [dict(r) for r in _report.values()]
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    total = {"frame": "TOTAL", "rows": int(df["rows"].sum()),
+             "bytes_before": int(df["bytes_before"].sum()),
+             "bytes_after": int(df["bytes_after"].sum())}
+    total["ratio"] = total["bytes_after"] / total["bytes_before"] if total["bytes_before"] else 1.0
+    return pd.concat([df, pd.DataFrame([total])], ignore_index=True)
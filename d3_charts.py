@@ -0,0 +1,177 @@
+import json
+import os
+
+import pandas as pd
+import streamlit as st
+
+# ───────────────────────────────────────────────────────────────
+# 1. Line / multi-series chart: SVG, or canvas above a point count
+# ───────────────────────────────────────────────────────────────
+CANVAS_POINTS = int(os.environ.get("VIZ_CANVAS_POINTS", "2000"))
+RENDERERS     = ["Auto", "SVG", "Canvas"]
+
+
+def renderer_picker() -> str:
+    """Sidebar override of the automatic SVG / canvas switch."""
+    return st.sidebar.selectbox(
+        "Chart renderer", RENDERERS,
+        help=f"Auto draws lines on a canvas above {CANVAS_POINTS:,} points.")
+
+
+def pick_renderer(n_points: int, choice: str = "Auto") -> str:
+    if choice in ("SVG", "Canvas"):
+        return choice.lower()
+    return "canvas" if n_points > CANVAS_POINTS else "svg"
+
+
+# Axes, grid and end labels stay SVG in both modes (a few dozen nodes);
+# only the line paths move to a canvas layer under the SVG. The draw and
+# first-frame times are printed under the chart and to the console.
+_TEMPLATE = """
+<script src="https://d3js.org/d3.v7.min.js"></script>
+<div id="__ID___wrap" style="position:relative;display:inline-block;max-width:100%;
+     background:#fff;border-radius:__RADIUS__px;overflow:hidden;"></div>
+<div id="__ID___perf" style="font:11px sans-serif;color:#999;margin-top:2px;"></div>
+<script>
+const cfg = __CFG__;
+const t0 = performance.now();
+const n = cfg.t.length;
+const data = new Array(n);
+for (let i = 0; i < n; i++) {
+    data[i] = {date: new Date(cfg.t[i]), value: cfg.v[i], key: cfg.keys[cfg.g ? cfg.g[i] : 0]};
+}
+const series = Array.from(d3.group(data, d => d.key), ([key, values]) => ({key, values}));
+
+const width = cfg.width, height = cfg.height, m = cfg.margin;
+const x = d3.scaleUtc(d3.extent(data, d => d.date), [m.left, width - m.right]);
+const y = d3.scaleLinear([0, d3.max(data, d => d.value) * cfg.yHeadroom],
+                         [height - m.bottom, m.top]);
+const color = d3.scaleOrdinal(d3[cfg.scheme]);
+const colorOf = i => cfg.grouped ? color(i) : cfg.stroke;
+const line = d3.line()
+    .defined(d => !isNaN(d.value))
+    .x(d => x(d.date))
+    .y(d => y(d.value));
+
+const wrap = d3.select("#__ID___wrap");
+const dpr = window.devicePixelRatio || 1;
+const canvas = cfg.renderer === "canvas"
+    ? wrap.append("canvas")
+        .attr("width", width * dpr).attr("height", height * dpr)
+        .attr("style", "position:absolute;left:0;top:0;width:100%;height:100%;")
+    : null;
+
+const svg = wrap.append("svg")
+    .attr("width", width)
+    .attr("height", height)
+    .attr("viewBox", [0, 0, width, height])
+    .attr("style", "position:relative;display:block;max-width:100%;height:auto;");
+
+svg.append("g")
+    .attr("transform", `translate(0,${height - m.bottom})`)
+    .call(d3.axisBottom(x).ticks(width / cfg.xTickPx).tickSizeOuter(0));
+
+svg.append("g")
+    .attr("transform", `translate(${m.left},0)`)
+    .call(d3.axisLeft(y).ticks(height / cfg.yTickPx))
+    .call(g => g.select(".domain").remove())
+    .call(g => g.selectAll(".tick line").clone()
+        .attr("x2", width - m.left - m.right)
+        .attr("stroke-opacity", 0.1))
+    .call(g => g.append("text")
+        .attr("x", -m.left + 5)
+        .attr("y", 10)
+        .attr("fill", "currentColor")
+        .attr("text-anchor", "start")
+        .text(cfg.yLabel));
+
+const g = svg.append("g")
+    .attr("font-family", "sans-serif")
+    .attr("font-size", 12)
+    .attr("fill", "none")
+    .attr("stroke-width", 2);
+
+if (canvas) {
+    const ctx = canvas.node().getContext("2d");
+    ctx.setTransform(dpr, 0, 0, dpr, 0, 0);   // draw in viewBox units
+    ctx.lineWidth = 2;
+    line.context(ctx);
+    series.forEach((s, i) => {
+        ctx.beginPath();
+        line(s.values);
+        ctx.strokeStyle = colorOf(i);
+        ctx.stroke();
+    });
+    line.context(null);
+} else {
+    series.forEach((s, i) => {
+        g.append("path").datum(s.values).attr("d", line).attr("stroke", colorOf(i));
+    });
+}
+
+// label at the end of each line
+if (cfg.grouped) {
+    series.forEach((s, i) => {
+        const last = s.values[s.values.length - 1];
+        if (!last) return;
+        g.append("text")
+            .attr("paint-order", "stroke")
+            .attr("stroke", "#fff")
+            .attr("stroke-width", 4)
+            .attr("fill", colorOf(i))
+            .attr("font-size", cfg.labelSize)
+            .attr("dx", cfg.labelDx)
+            .attr("dy", "0.32em")
+            .attr("x", x(last.date))
+            .attr("y", y(last.value))
+            .text(s.key);
+    });
+}
+
+const drawn = performance.now();
+requestAnimationFrame(() => {
+    const msg = `${cfg.renderer} · ${n.toLocaleString()} points · ${series.length} series · `
+              + `draw ${(drawn - t0).toFixed(1)} ms · first frame ${(performance.now() - t0).toFixed(1)} ms`;
+    document.getElementById("__ID___perf").textContent = msg;
+    console.log("[chart __ID__]", msg);
+});
+</script>
+"""
+
+
+def line_chart_html(points: pd.DataFrame, *, x: str = "date", y: str = "value",
+                    group: str | None = None, renderer: str = "Auto",
+                    chart_id: str = "chart", width: int = 928, height: int = 400,
+                    margin: tuple = (20, 30, 30, 60), y_label: str = "",
+                    scheme: str = "schemeCategory10", stroke: str = "steelblue",
+                    x_tick_px: int = 100, y_tick_px: int = 40, y_headroom: float = 1.0,
+                    label_size: str = "12px", label_dx: int = 8, radius: int = 12) -> str:
+    """HTML for ``components.html``: one line per ``group`` (or a single line).
+
+    Points travel as columns (times, values, group codes) rather than one
+    object per point. ``renderer`` is Auto / SVG / Canvas, see
+    ``pick_renderer``.
+    """
+    cols = [group, x] if group else [x]
+    pts = points.sort_values(cols, kind="stable")
+    if group:
+        codes, keys = pd.factorize(pts[group].astype(str), sort=True)
+    else:
+        codes, keys = None, [""]
+    top, right, bottom, left = margin
+    cfg = {
+        "t": pd.to_datetime(pts[x]).dt.strftime("%Y-%m-%dT%H:%M:%S").tolist(),
+        "v": pd.to_numeric(pts[y], errors="coerce").astype(float).round(4).tolist(),
+        "g": codes.tolist() if codes is not None else None,
+        "keys": [str(k) for k in keys], "grouped": bool(group),
+        "renderer": pick_renderer(len(pts), renderer),
+        "width": width, "height": height,
+        "margin": {"top": top, "right": right, "bottom": bottom, "left": left},
+        "yLabel": y_label, "scheme": scheme, "stroke": stroke,
+        "xTickPx": x_tick_px, "yTickPx": y_tick_px, "yHeadroom": y_headroom,
+        "labelSize": label_size, "labelDx": label_dx,
+    }
+    # json.dumps writes NaN, which is also valid JavaScript
+    return (_TEMPLATE.replace("__CFG__", json.dumps(cfg))
+                     .replace("__ID__", chart_id)
+                     .replace("__RADIUS__", str(radius)))
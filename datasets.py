@@ -0,0 +1,369 @@
+import pandas as pd
+import streamlit as st
+
+from cashier_rollups import get_cashier_rollups
+from compact import compact_frame
+from db_handler import DatabaseManager
+from heatmap_pyramid import get_pyramid
+from heavy_hitters import MEASURES, get_heavy_hitters
+from item_cost import get_cost_index
+from item_dim import get_item_dim
+from quantiles import get_sketches
+from sales_buckets import GROUP_COLS, TIME_WINDOWS, VALUE_COLS, get_buckets
+from scheduler import NotReady, Scheduler
+from shared_hot import get_store
+
+# ───────────────────────────────────────────────────────────────
+# 1. Hot datasets refreshed in the background
+# ───────────────────────────────────────────────────────────────
+RECENT_SALES_MAX = 300      # largest "last N sales" any page offers
+
+
+def load_recent_blocks(db) -> dict:
+    """Last ``RECENT_SALES_MAX`` sales with their lines."""
+    sales = db.fetch_prepared("recent_sales", RECENT_SALES_MAX)
+    if sales.empty:
+        return {}
+    salesitems = db.fetch_prepared("salesitems_by_sale", sales.saleid.tolist())
+    if salesitems.empty:
+        return {"sales": sales, "salesitems": salesitems}
+    get_item_dim().ensure(db, salesitems.itemid.unique())   # pages enrich from it
+    blocks = {"sales": sales, "salesitems": salesitems}
+    return {k: compact_frame(v, f"recent_blocks:{k}") for k, v in blocks.items()}
+
+
+def slice_blocks(blocks: dict, n_sales: int):
+    """(sales, salesitems) restricted to the last ``n_sales``."""
+    empty = pd.DataFrame()
+    sales = blocks.get("sales", empty)
+    if sales.empty:
+        return empty, empty
+    sales = sales.head(n_sales)                       # ordered by saleid DESC
+    salesitems = blocks.get("salesitems", empty)
+    if not salesitems.empty:
+        salesitems = salesitems[salesitems.saleid.isin(sales.saleid)]
+    return sales, salesitems
+
+
+def load_top_items() -> dict:
+    """Per-item window totals (with item name) for every time window."""
+    buckets, dim = get_buckets(), get_item_dim()
+    out = {}
+    for window in TIME_WINDOWS:
+        totals = buckets.window_totals(window)
+        totals["itemnameenglish"] = dim.take(totals.index, "itemnameenglish")
+        out[window] = totals
+    return out
+
+
+def load_category_leaderboards() -> dict:
+    """Window totals per ``GROUP_COLS`` level, keyed by (column, window)."""
+    buckets = get_buckets()
+    return {(col, window): buckets.window_totals(window, by=col)
+            for col, _ in GROUP_COLS for window in TIME_WINDOWS}
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Cross-process sharing: one writer queries, the others map
+# ───────────────────────────────────────────────────────────────
+BLOCK_PARTS   = ["sales", "salesitems"]
+PYRAMID_PARTS = ["hourly", "daily", "monthly"]
+
+
+def _blocks_token(blocks: dict) -> tuple:
+    # a late sale can enter the last N without moving the newest saleid
+    sales = blocks.get("sales", pd.DataFrame())
+    return (int(sales["saleid"].sum()) if not sales.empty else 0, len(sales),
+            len(blocks.get("salesitems", ())))
+
+
+def _watermark_token(folder) -> tuple:
+    # readers derive their windows from ``now``, so republish once a minute
+    return folder.watermark.state, pd.Timestamp(folder.now).floor("min")
+
+
+def _encode_blocks(blocks: dict) -> dict:
+    return {part: blocks.get(part, pd.DataFrame()) for part in BLOCK_PARTS}
+
+
+def _decode_blocks(frames: dict) -> dict:
+    return {part: df for part, df in frames.items() if not df.empty}
+
+
+def _encode_buckets(_last_saleid) -> dict:
+    buckets = get_buckets()
+    return {
+        "buckets": buckets.buckets,
+        "meta":    pd.DataFrame({"now": [buckets.now],
+                                 "last_saleid": [buckets.last_saleid]}),
+    }
+
+
+def _decode_buckets(frames: dict) -> int:
+    meta = frames["meta"]
+    last_saleid = int(meta["last_saleid"].iat[0])
+    get_buckets().install(frames["buckets"], pd.Timestamp(meta["now"].iat[0]),
+                          last_saleid)
+    return last_saleid
+
+
+def _encode_item_dim(_rows) -> dict:
+    return {"dim": get_item_dim().frame()}
+
+
+def _decode_item_dim(frames: dict) -> int:
+    dim = get_item_dim()
+    dim.upsert(frames["dim"])
+    return len(dim)
+
+
+def _encode_item_costs(_n) -> dict:
+    return {"costs": get_cost_index().frame()}
+
+
+def _decode_item_costs(frames: dict) -> int:
+    index = get_cost_index()
+    index.install(frames["costs"])
+    return len(index)
+
+
+def _encode_cashier_rollups(_last_saleid) -> dict:
+    rollups = get_cashier_rollups()
+    return {
+        "minutes": rollups.minutes,
+        "days":    rollups.days,
+        "meta":    pd.DataFrame({"now": [rollups.now],
+                                 "last_saleid": [rollups.last_saleid]}),
+    }
+
+
+def _decode_cashier_rollups(frames: dict) -> int:
+    meta = frames["meta"]
+    last_saleid = int(meta["last_saleid"].iat[0])
+    get_cashier_rollups().install(frames["minutes"], frames["days"],
+                                  pd.Timestamp(meta["now"].iat[0]), last_saleid)
+    return last_saleid
+
+
+def _encode_sketches(_last_saleid) -> dict:
+    sketches = get_sketches()
+    return {
+        "cashier": sketches.cashier,
+        "items":   sketches.items,
+        "meta":    pd.DataFrame({"now": [sketches.now],
+                                 "last_saleid": [sketches.last_saleid]}),
+    }
+
+
+def _decode_sketches(frames: dict) -> int:
+    meta = frames["meta"]
+    last_saleid = int(meta["last_saleid"].iat[0])
+    get_sketches().install(frames["cashier"], frames["items"],
+                           pd.Timestamp(meta["now"].iat[0]), last_saleid)
+    return last_saleid
+
+
+def _encode_heavy_hitters(_last_saleid) -> dict:
+    hh = get_heavy_hitters()
+    floors = pd.DataFrame(hh.floors).rename_axis("hour").reset_index()
+    return {
+        **hh.counters,
+        "floors": floors,
+        "meta":   pd.DataFrame({"now": [hh.now], "last_saleid": [hh.last_saleid]}),
+    }
+
+
+def _decode_heavy_hitters(frames: dict) -> int:
+    meta = frames["meta"]
+    last_saleid = int(meta["last_saleid"].iat[0])
+    floors = frames["floors"].set_index("hour")
+    get_heavy_hitters().install(
+        {m: frames[m] for m in MEASURES},
+        {m: floors[m].dropna() for m in MEASURES},
+        pd.Timestamp(meta["now"].iat[0]), last_saleid)
+    return last_saleid
+
+
+def _encode_pyramid(_last_saleid) -> dict:
+    pyr = get_pyramid()
+    return {
+        **{name: getattr(pyr, name).rename("total").rename_axis("t").to_frame()
+           for name in PYRAMID_PARTS},
+        "meta": pd.DataFrame({"now": [pyr.now], "last_saleid": [pyr.last_saleid]}),
+    }
+
+
+def _decode_pyramid(frames: dict) -> int:
+    meta = frames["meta"]
+    last_saleid = int(meta["last_saleid"].iat[0])
+    get_pyramid().install(*(frames[name]["total"] for name in PYRAMID_PARTS),
+                          pd.Timestamp(meta["now"].iat[0]), last_saleid)
+    return last_saleid
+
+
+def shared_job(name: str, load, encode, decode, parts: list[str], token):
+    """Run ``load`` in the writer process and publish it; elsewhere read it.
+
+    ``token(value)`` identifies the loaded content: the writer only
+    publishes a new version when it changes, and readers only decode
+    versions they have not installed yet.
+    """
+    last = {"token": None, "version": 0, "value": None}
+
+    def job():
+        store = get_store()
+        if store is None:
+            return load()
+        if store.is_writer():
+            value = load()
+            key = token(value)
+            if key != last["token"]:
+                store.publish(name, encode(value))
+                last["token"] = key
+            return value
+        version = store.version(name)
+        if version and version == last["version"]:
+            return last["value"]
+        frames = store.read(name, parts)
+        if frames is None:
+            raise LookupError(f"{name} has not been published yet")
+        last["version"], last["value"] = version, decode(frames)
+        return last["value"]
+    return job
+
+
+# ───────────────────────────────────────────────────────────────
+# 3. One scheduler per process, started on first use
+# ───────────────────────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def get_scheduler() -> Scheduler:
+    sched = Scheduler()
+    dbs = {}
+
+    def job_db(job: str) -> DatabaseManager:
+        # one connection per job, opened only by the writer process
+        if job not in dbs:
+            dbs[job] = DatabaseManager(key=f"precompute:{job}")
+        return dbs[job]
+
+    def refresh_buckets():
+        get_buckets().refresh(job_db("minute_buckets"), min_interval=0)
+        return get_buckets().last_saleid
+
+    def after_buckets(loader):
+        # window aggregates are only meaningful once the buckets are loaded;
+        # fail fast and let the backoff retry rather than hold a worker
+        def job():
+            if not sched.is_ready("minute_buckets"):
+                raise NotReady("minute_buckets")
+            return loader()
+        return job
+
+    sched.register("recent_blocks",
+                   shared_job("recent_blocks", lambda: load_recent_blocks(job_db("recent_blocks")),
+                              _encode_blocks, _decode_blocks, BLOCK_PARTS, _blocks_token),
+                   2, max_backoff=30)
+    sched.register("minute_buckets",
+                   shared_job("minute_buckets", refresh_buckets,
+                              _encode_buckets, _decode_buckets, ["buckets", "meta"],
+                              lambda _: (*_watermark_token(get_buckets()),
+                                         len(get_buckets().buckets))),
+                   2, max_backoff=30)
+    sched.register("item_dim",
+                   shared_job("item_dim", lambda: get_item_dim().refresh(job_db("item_dim")),
+                              _encode_item_dim, _decode_item_dim, ["dim"],
+                              lambda _: (len(get_item_dim()), get_item_dim().max_xmin)),
+                   60, max_backoff=60)
+    sched.register("item_costs",
+                   shared_job("item_costs", lambda: get_cost_index().rebuild(job_db("item_costs")),
+                              _encode_item_costs, _decode_item_costs, ["costs"],
+                              lambda _: get_cost_index().content_hash()),
+                   120, max_backoff=120)
+    sched.register("cashier_rollups",
+                   shared_job("cashier_rollups",
+                              lambda: get_cashier_rollups().refresh(job_db("cashier_rollups")),
+                              _encode_cashier_rollups, _decode_cashier_rollups,
+                              ["minutes", "days", "meta"],
+                              lambda _: _watermark_token(get_cashier_rollups())),
+                   2, max_backoff=30)
+    sched.register("quantile_sketches",
+                   shared_job("quantile_sketches",
+                              lambda: get_sketches().refresh(job_db("quantile_sketches")),
+                              _encode_sketches, _decode_sketches,
+                              ["cashier", "items", "meta"],
+                              lambda _: _watermark_token(get_sketches())),
+                   10, max_backoff=60)
+    sched.register("heavy_hitters",
+                   shared_job("heavy_hitters",
+                              lambda: get_heavy_hitters().refresh(job_db("heavy_hitters")),
+                              _encode_heavy_hitters, _decode_heavy_hitters,
+                              [*MEASURES, "floors", "meta"],
+                              lambda _: _watermark_token(get_heavy_hitters())),
+                   10, max_backoff=60)
+    sched.register("top_items", after_buckets(load_top_items), 5, max_backoff=10)
+    sched.register("category_leaderboards", after_buckets(load_category_leaderboards), 5,
+                   max_backoff=10)
+    sched.register("heatmap_pyramid",
+                   shared_job("heatmap_pyramid",
+                              lambda: get_pyramid().refresh(job_db("heatmap_pyramid")),
+                              _encode_pyramid, _decode_pyramid, [*PYRAMID_PARTS, "meta"],
+                              lambda _: _watermark_token(get_pyramid())),
+                   30, max_backoff=60)
+    sched.start()
+    return sched
+
+
+def recent_blocks(n_sales: int, timeout: float = 5.0):
+    """Precomputed blocks for the last ``n_sales``, or None if not ready yet."""
+    blocks = get_scheduler().snapshot("recent_blocks", timeout)
+    return None if blocks is None else slice_blocks(blocks, n_sales)
+
+
+def window_buckets(timeout: float = 5.0):
+    """The bucket store, once the scheduler has loaded it at least once."""
+    get_scheduler().snapshot("minute_buckets", timeout)
+    return get_buckets()
+
+
+def category_leaderboard(col: str, window: str, timeout: float = 5.0) -> pd.DataFrame:
+    boards = get_scheduler().snapshot("category_leaderboards", timeout) or {}
+    return boards.get((col, window), pd.DataFrame(columns=VALUE_COLS))
+
+
+def top_items(window: str, timeout: float = 5.0) -> pd.DataFrame:
+    tops = get_scheduler().snapshot("top_items", timeout) or {}
+    return tops.get(window, pd.DataFrame(columns=[*VALUE_COLS, "itemnameenglish"]))
+
+
+def item_costs(timeout: float = 5.0):
+    """The item cost index, once it has been built at least once."""
+    get_scheduler().snapshot("item_costs", timeout)
+    return get_cost_index()
+
+
+def cashier_rollups(timeout: float = 5.0):
+    """Cashier rollups, or None if the first load has not finished yet."""
+    if get_scheduler().snapshot("cashier_rollups", timeout) is None:
+        return None
+    return get_cashier_rollups()
+
+
+def quantile_sketches(timeout: float = 5.0):
+    """Sale-amount sketches, or None if the first load has not finished yet."""
+    if get_scheduler().snapshot("quantile_sketches", timeout) is None:
+        return None
+    return get_sketches()
+
+
+def heavy_hitters(timeout: float = 5.0):
+    """Hourly top-item summaries, or None if the first load has not finished."""
+    if get_scheduler().snapshot("heavy_hitters", timeout) is None:
+        return None
+    return get_heavy_hitters()
+
+
+def heatmap_pyramid(timeout: float = 10.0):
+    """Heatmap aggregates, or None if the first load has not finished yet."""
+    if get_scheduler().snapshot("heatmap_pyramid", timeout) is None:
+        return None
+    return get_pyramid()
@@ -1,9 +1,20 @@
 import streamlit as st
-import psycopg2
 from psycopg2 import OperationalError          # reconnect check
+from psycopg2 import errors as pg_errors
+from psycopg2.extensions import connection as _PgConnection
 import pandas as pd
+import threading
+import time
+import json
+import re
 import uuid
 
+from db_resilience import (PAGE_CONNECT_TIMEOUT, DatabaseUnavailable, WarmPool, breaker,
+                           guarded_connect, metrics as conn_metrics, resilience_metrics)
+from item_cost import get_cost_index
+from query_control import rerun_watch, set_timeout
+from query_plans import plan_sampler
+
 # ───────────────────────────────────────────────────────────────
 # 1. One cached connection per user session
 # ───────────────────────────────────────────────────────────────
@@ -14,76 +25,292 @@ def _session_key() -> str:
     return st.session_state["_session_key"]
 
 
+class PreparingConnection(_PgConnection):
+    """psycopg2 connection that remembers its server-side prepared statements."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: set[str] = set()
+        self.timeout_ms: int | None = None   # session statement_timeout we last SET
+        self.cancel_lock = threading.Lock()     # see query_control.RerunWatch
+
+    def rollback(self):
+        super().rollback()
+        self.timeout_ms = None               # an uncommitted SET was undone too
+
+
 @st.cache_resource(show_spinner=False)
-def get_conn(dsn: str, key: str):
-    """Create (once per session) and return a PostgreSQL connection."""
-    conn = psycopg2.connect(dsn)
-    try:
-        st.on_session_end(conn.close)
-    except Exception:
-        pass
+def get_warm_pool(dsn: str) -> WarmPool:
+    """Process-wide spare connections, pinged during store hours."""
+    return WarmPool(dsn, PreparingConnection).start()
+
+
+@st.cache_resource(show_spinner=False)
+def get_conn(dsn: str, key: str, per_session: bool = True):
+    """Create (once per key) and return a PostgreSQL connection.
+
+    Only per-session connections are closed when their session ends.
+    Callers are waiting (pages, single-flight loads, jobs that retry on
+    their own), so this makes one short attempt; the warm pool retries
+    with backoff in the background.
+    """
+    pool = get_warm_pool(dsn)
+    conn = pool.take()
+    if conn is None:
+        try:
+            conn = guarded_connect(dsn, PreparingConnection, attempts=1,
+                                   timeout=PAGE_CONNECT_TIMEOUT)
+        except DatabaseUnavailable:
+            pool.refill()
+            raise
+    if per_session:
+        try:
+            st.on_session_end(conn.close)
+        except Exception:
+            pass
     return conn
 
+
+@st.cache_resource(show_spinner=False)
+def conn_lock(key: str) -> threading.RLock:
+    """One statement at a time on the connection of ``key``.
+
+    Process-level connections are shared by single-flight loads for
+    different keys and their refresh threads; psycopg2 would interleave
+    their transactions, and one thread's rollback would abort the other's.
+    """
+    return threading.RLock()
+
 # ───────────────────────────────────────────────────────────────
-# 2. Database manager with auto-reconnect logic
+# 2. Hot recurring statements, prepared once per connection
+# ───────────────────────────────────────────────────────────────
+# name → (parameter types, SQL). Id lists are passed as one array
+# parameter (= ANY($1)) so every statement keeps a single stable plan.
+PREPARED_STATEMENTS = {
+    "recent_sales": (
+        "int",
+        "SELECT saleid, saletime, totalamount, cashier "
+        "FROM sales ORDER BY saleid DESC LIMIT $1",
+    ),
+    "salesitems_by_sale": (
+        "bigint[]",
+        "SELECT saleid, itemid, quantity, totalprice, unitprice "
+        "FROM salesitems WHERE saleid = ANY($1)",
+    ),
+    "items_by_id": (
+        "bigint[]",
+        "SELECT itemid, itemnameenglish, familycat, sectioncat, "
+        "departmentcat, classcat, sellingprice "
+        "FROM item WHERE itemid = ANY($1)",
+    ),
+}
+
+_stats_lock = threading.Lock()
+_prepared_stats: dict[str, dict] = {}
+
+
+def _record_prepared(name: str, elapsed_ms: float, prepared_now: bool):
+    with _stats_lock:
+        st_ = _prepared_stats.setdefault(
+            name, {"statement": name, "prepares": 0, "calls": 0, "total_ms": 0.0}
+        )
+        st_["prepares"] += int(prepared_now)
+        st_["calls"]    += 1
+        st_["total_ms"] += elapsed_ms
+
+
+def _explain_analyze(sql: str, params):
+    """EXPLAIN (ANALYZE, BUFFERS) on the sampler's own connection."""
+    plan = DatabaseManager(key="plan-sampler", query_class="background").fetch_data(
+        f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params).iat[0, 0]
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+@st.cache_resource(show_spinner=False)
+def get_plan_sampler():
+    """Start (once per process) the background EXPLAIN worker."""
+    return plan_sampler.start(_explain_analyze)
+
+
+def connection_metrics() -> dict:
+    """Breaker state, connect latency / cold starts and warm-pool size."""
+    return resilience_metrics(get_warm_pool(st.secrets["neon"]["dsn"]))
+
+
+def prepared_stats() -> pd.DataFrame:
+    """Process-wide call counts and mean latency per prepared statement."""
+    with _stats_lock:
+        rows = [dict(v) for v in _prepared_stats.values()]
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df["mean_ms"] = df["total_ms"] / df["calls"]
+    return df
+
+class _TrackedWriter:
+    """File wrapper noting whether COPY has written anything yet."""
+
+    def __init__(self, out):
+        self.out, self.started = out, False
+
+    def write(self, data):
+        self.started = True
+        return self.out.write(data)
+
+# ───────────────────────────────────────────────────────────────
+# 3. Database manager with auto-reconnect logic
 # ───────────────────────────────────────────────────────────────
 class DatabaseManager:
     """General DB interactions using a cached connection."""
 
-    def __init__(self):
+    def __init__(self, key: str | None = None, query_class: str | None = None):
         self.dsn   = st.secrets["neon"]["dsn"]
-        self._key  = _session_key()
-        self.conn  = get_conn(self.dsn, self._key)  # reuse within this session
+        self._key  = key or _session_key()   # explicit key → process-level conn
+        self._conn = None                    # opened on first use
+        # statement_timeout budget (see query_control.QUERY_TIMEOUTS_MS)
+        self.query_class = query_class or ("background" if key else "interactive")
+        # a process-level connection serves many sessions: no one rerun cancels it
+        self.per_session = key is None
+        self._lock = conn_lock(self._key)
+        get_plan_sampler()
+
+    @property
+    def conn(self):
+        """This session's connection (reused across reruns)."""
+        if self._conn is None:
+            self._conn = get_conn(self.dsn, self._key, self.per_session)
+        return self._conn
+
+    @conn.setter
+    def conn(self, value):
+        self._conn = value
 
     # ────────── internal helpers ──────────
+    def _reconnect(self):
+        get_conn.clear()
+        self.conn = get_conn(self.dsn, self._key, self.per_session)
+
     def _ensure_live_conn(self):
-        """Reconnect if the cached connection was closed by Neon."""
+        """Fail fast unless the breaker admits us; reconnect if Neon closed us.
+
+        Callers ``breaker.release()`` when done, so a half-open probe that
+        ended in a SQL error does not hold the breaker half-open.
+        """
+        if not breaker.allow():
+            conn_metrics.add(short_circuited=1)
+            raise DatabaseUnavailable("database unavailable (circuit open)")
         if self.conn.closed:                  # 0 = open, >0 = closed
-            get_conn.clear()
-            self.conn = get_conn(self.dsn, self._key)
+            self._reconnect()
 
-    def _fetch_df(self, query: str, params=None) -> pd.DataFrame:
-        self._ensure_live_conn()
-        try:  # first attempt
-            with self.conn.cursor() as cur:
+    def _prepare(self, cur, name: str) -> bool:
+        """PREPARE ``name`` on this connection unless it already exists.
+
+        Called with ``self._lock`` held, so the check and the add are atomic.
+        """
+        if name in self.conn.prepared:
+            return False
+        types, sql = PREPARED_STATEMENTS[name]
+        cur.execute(f"PREPARE {name} ({types}) AS {sql}")
+        self.conn.prepared.add(name)
+        return True
+
+    def _select(self, query: str, params=None, prepared: str | None = None,
+                query_class: str | None = None):
+        query_class = query_class or ("lookup" if prepared else self.query_class)
+        with self.conn.cursor() as cur:
+            set_timeout(self.conn, cur, query_class)
+            prepared_now = self._prepare(cur, prepared) if prepared else False
+            t0 = time.perf_counter()
+            with rerun_watch.watch(self.conn, query_class, cancellable=self.per_session):
                 cur.execute(query, params or ())
                 rows = cur.fetchall()
-                cols = [c[0] for c in cur.description]
+            cols = [c[0] for c in cur.description]
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        if prepared:
+            _record_prepared(prepared, elapsed_ms, prepared_now)
+            # EXPLAIN EXECUTE only works on this connection: sample the ad hoc form
+            query = re.sub(r"\$\d+", "%s", PREPARED_STATEMENTS[prepared][1])
+        if not query.lstrip().upper().startswith("EXPLAIN"):
+            plan_sampler.observe(query, params, elapsed_ms)
+        return rows, cols
+
+    def _fetch_df(self, query: str, params=None, prepared: str | None = None,
+                  query_class: str | None = None) -> pd.DataFrame:
+        with self._lock:
+            try:
+                rows, cols = self._select_retrying(query, params, prepared, query_class)
+            finally:
+                breaker.release()
+            if breaker.failures:
+                breaker.success()     # the database answered: no reason to stay open
+            return pd.DataFrame(rows, columns=cols) if rows else pd.DataFrame()
+
+    def _select_retrying(self, query, params, prepared, query_class):
+        self._ensure_live_conn()
+        try:  # first attempt
+            return self._select(query, params, prepared, query_class)
+        except pg_errors.QueryCanceled:
+            raise                         # statement_timeout: not a dead connection
         except OperationalError:
-            get_conn.clear()
-            self.conn = get_conn(self.dsn, self._key)
-            with self.conn.cursor() as cur:
-                cur.execute(query, params or ())
-                rows = cur.fetchall()
-                cols = [c[0] for c in cur.description]
+            # dropped connection (e.g. Neon suspend) → one reconnect attempt
+            self._reconnect()
+            try:
+                return self._select(query, params, prepared, query_class)
+            except pg_errors.QueryCanceled:
+                raise
+            except OperationalError:
+                breaker.failure()
+                raise
+        except pg_errors.InvalidSqlStatementName:
+            # statement vanished server-side (e.g. DISCARD ALL) → re-prepare
+            self.conn.rollback()
+            self.conn.prepared.discard(prepared)
+            return self._select(query, params, prepared, query_class)
         except Exception:
             self.conn.rollback()  # ← NEW: recover from broken transaction
             raise
-        return pd.DataFrame(rows, columns=cols) if rows else pd.DataFrame()
 
-    def _execute(self, query: str, params=None, returning=False):
-        self._ensure_live_conn()
-        try:
-            with self.conn.cursor() as cur:
+    def _write(self, query: str, params=None, returning=False):
+        with self.conn.cursor() as cur:
+            set_timeout(self.conn, cur, "write")
+            # a submitted form must not be lost to a rerun, so writes only time out
+            with rerun_watch.watch(self.conn, "write", cancellable=False):
                 cur.execute(query, params or ())
                 res = cur.fetchone() if returning else None
-            self.conn.commit()
+        self.conn.commit()
+        return res
+
+    def _execute(self, query: str, params=None, returning=False):
+        with self._lock:
+            try:
+                res = self._write_retrying(query, params, returning)
+            finally:
+                breaker.release()
+            if breaker.failures:
+                breaker.success()
             return res
+
+    def _write_retrying(self, query, params, returning):
+        self._ensure_live_conn()
+        try:
+            return self._write(query, params, returning)
+        except pg_errors.QueryCanceled:
+            raise
         except OperationalError:
-            get_conn.clear()
-            self.conn = get_conn(self.dsn, self._key)
-            with self.conn.cursor() as cur:
-                cur.execute(query, params or ())
-                res = cur.fetchone() if returning else None
-            self.conn.commit()
+            self._reconnect()
+            try:
+                res = self._write(query, params, returning)
+            except OperationalError:
+                breaker.failure()
+                raise
             return res
         except Exception:
             self.conn.rollback()  # ← NEW: reset failed transaction
             raise
 
     # ────────── public API ──────────
-    def fetch_data(self, query, params=None):
-        return self._fetch_df(query, params)
+    def fetch_data(self, query, params=None, query_class: str | None = None):
+        """``query_class`` overrides this manager's statement_timeout budget."""
+        return self._fetch_df(query, params, query_class=query_class)
 
     def execute_command(self, query, params=None):
         self._execute(query, params)
@@ -91,6 +318,121 @@ class DatabaseManager:
     def execute_command_returning(self, query, params=None):
         return self._execute(query, params, returning=True)
 
+    def fetch_prepared(self, name: str, *params):
+        """Run a statement from ``PREPARED_STATEMENTS`` by name.
+
+        Sequences are sent as a single array parameter, so pass id lists
+        as ``list`` (not unpacked).
+        """
+        args = tuple(list(p) if isinstance(p, (tuple, set)) else p for p in params)
+        ph   = ", ".join(["%s"] * len(args))
+        return self._fetch_df(f"EXECUTE {name} ({ph})", args, prepared=name)
+
+    def measure_planning(self, name: str, *params) -> dict:
+        """Planning time (ms) of ``name`` ad hoc vs. through its prepared form."""
+        args = tuple(list(p) if isinstance(p, (tuple, set)) else p for p in params)
+        ph   = ", ".join(["%s"] * len(args))
+        adhoc_sql = re.sub(r"\$\d+", "%s", PREPARED_STATEMENTS[name][1])
+
+        def planning_ms(query, prepared=None):
+            plan = self._fetch_df(
+                f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {query}", args, prepared
+            ).iat[0, 0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            return float(plan[0]["Planning Time"])
+
+        return {
+            "statement":   name,
+            "adhoc_ms":    planning_ms(adhoc_sql),
+            "prepared_ms": planning_ms(f"EXECUTE {name} ({ph})", prepared=name),
+        }
+
+    # ────────── streaming reads (exports) ──────────
+    def _export_retrying(self, run, started=lambda: False):
+        """``run()`` on a live connection, once more if the first one drops.
+
+        A dropped connection is retried only while ``started()`` is false,
+        since output already handed out cannot be taken back.
+        """
+        self._ensure_live_conn()
+        try:
+            return run()
+        except pg_errors.QueryCanceled:
+            raise                             # statement_timeout or a superseded rerun
+        except OperationalError:
+            if started():
+                raise
+            self._reconnect()
+            try:
+                return run()
+            except pg_errors.QueryCanceled:
+                raise
+            except OperationalError:
+                breaker.failure()
+                raise
+
+    def _open_stream(self, query: str, params, chunk_rows: int):
+        """Server-side cursor on ``query`` and its first chunk of rows."""
+        with self.conn.cursor() as cur:
+            set_timeout(self.conn, cur, "export")
+        cur = self.conn.cursor(name=f"stream_{uuid.uuid4().hex[:12]}")
+        cur.itersize = chunk_rows
+        try:
+            with rerun_watch.watch(self.conn, "export"):
+                cur.execute(query, params or ())
+                rows = cur.fetchmany(chunk_rows)
+        except BaseException:
+            try:
+                cur.close()
+            except Exception:
+                pass                          # the connection is gone with it
+            raise
+        return cur, rows
+
+    def stream_rows(self, query: str, params=None, chunk_rows: int = 50_000):
+        """Yield (rows, cursor.description) chunks from a server-side cursor.
+
+        Only ``chunk_rows`` rows are held client-side at a time. The
+        connection is held for the cursor's lifetime, and the read
+        transaction is rolled back when the generator finishes or is closed.
+        """
+        with self._lock:
+            try:
+                cur, rows = self._export_retrying(
+                    lambda: self._open_stream(query, params, chunk_rows))
+                with cur:
+                    while rows:
+                        yield rows, cur.description
+                        with rerun_watch.watch(self.conn, "export"):
+                            rows = cur.fetchmany(chunk_rows)
+            finally:
+                breaker.release()
+                if self._conn is not None and not self._conn.closed:
+                    self._conn.rollback()
+
+    def copy_out(self, query: str, params, out, fmt: str = "CSV HEADER") -> int:
+        """``COPY (query) TO STDOUT`` straight into the file object ``out``.
+
+        Returns the row count from the COPY command tag (-1 if unknown).
+        """
+        out = _TrackedWriter(out)
+
+        def copy():
+            with self.conn.cursor() as cur:
+                set_timeout(self.conn, cur, "export")
+                sql = cur.mogrify(query, params or ()).decode()
+                with rerun_watch.watch(self.conn, "export"):
+                    cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH {fmt}", out)
+                return cur.rowcount
+
+        with self._lock:
+            try:
+                return self._export_retrying(copy, lambda: out.started)
+            finally:
+                breaker.release()
+                if self._conn is not None and not self._conn.closed:
+                    self._conn.rollback()
+
     # ─────────── Dropdown Management ───────────
     def get_all_sections(self):
         df = self.fetch_data("SELECT DISTINCT section FROM dropdowns")
@@ -113,6 +455,7 @@ class DatabaseManager:
         ph   = ", ".join(["%s"] * len(data))
         q = f"INSERT INTO inventory ({cols}) VALUES ({ph})"
         self.execute_command(q, list(data.values()))
+        get_cost_index().record(data)          # keep profit costs current
 
     # ─────────── foreign_key Management ───────────
     def check_foreign_key_references(
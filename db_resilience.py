@@ -0,0 +1,279 @@
+import os
+import random
+import threading
+import time
+
+import pandas as pd
+import psycopg2
+from psycopg2 import OperationalError
+
+# ───────────────────────────────────────────────────────────────
+# 1. Errors, backoff and metrics
+# ───────────────────────────────────────────────────────────────
+class DatabaseUnavailable(OperationalError):
+    """The breaker is open or every reconnect attempt failed."""
+
+
+CONNECT_ATTEMPTS = 5
+BACKOFF_BASE_S   = 0.25
+BACKOFF_CAP_S    = 8.0
+CONNECT_TIMEOUT  = 10           # seconds, passed to libpq
+PAGE_CONNECT_TIMEOUT = 5        # seconds; one attempt while a page waits
+COLD_START_MS    = 1000.0       # connects slower than this count as cold starts
+
+
+def backoff_delays(attempts: int = CONNECT_ATTEMPTS, base: float = BACKOFF_BASE_S,
+                   cap: float = BACKOFF_CAP_S):
+    """Exponential backoff with full jitter: uniform(0, min(cap, base·2ⁿ))."""
+    for n in range(attempts - 1):
+        yield random.uniform(0, min(cap, base * 2 ** n))
+
+
+class ConnectionMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {
+            "connects": 0, "connect_failures": 0, "cold_starts": 0,
+            "last_connect_ms": 0.0, "max_connect_ms": 0.0, "total_connect_ms": 0.0,
+            "short_circuited": 0, "stale_served": 0,
+            "pings": 0, "ping_failures": 0, "warm_taken": 0,
+        }
+
+    def add(self, **counts) -> None:
+        with self._lock:
+            for k, v in counts.items():
+                self.stats[k] += v
+
+    def connected(self, ms: float) -> None:
+        with self._lock:
+            s = self.stats
+            s["connects"] += 1
+            s["last_connect_ms"] = ms
+            s["max_connect_ms"]  = max(s["max_connect_ms"], ms)
+            s["total_connect_ms"] += ms
+            if ms >= COLD_START_MS:
+                s["cold_starts"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            s = dict(self.stats)
+        s["mean_connect_ms"] = s.pop("total_connect_ms") / s["connects"] if s["connects"] else 0.0
+        return s
+
+
+metrics = ConnectionMetrics()
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Circuit breaker shared by every session of the process
+# ───────────────────────────────────────────────────────────────
+class CircuitBreaker:
+    """closed → (``threshold`` failures) → open → (``reset_s``) → half-open.
+
+    While open every caller fails fast instead of reconnecting; half-open
+    lets exactly one probe through, whose outcome closes or re-opens it.
+    The probe belongs to the thread that was let through, so its own
+    reconnect is not refused; ``release`` frees it if it ended without a
+    verdict.
+    """
+
+    def __init__(self, threshold: int = 3, reset_s: float = 15.0):
+        self.threshold = threshold
+        self.reset_s   = reset_s
+        self._lock     = threading.Lock()
+        self._state    = "closed"
+        self.failures  = 0
+        self.opened_at = 0.0
+        self.opens     = 0
+        self._probing  = None       # thread ident of the half-open probe
+
+    def _current(self) -> str:
+        # lock held; an open breaker turns half-open once it has cooled down
+        if self._state == "open" and time.monotonic() - self.opened_at >= self.reset_s:
+            self._state = "half_open"
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current()
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current()
+            if state == "closed":
+                return True
+            if state == "half_open" and self._probing in (None, threading.get_ident()):
+                self._probing = threading.get_ident()
+                return True
+            return False
+
+    def success(self) -> None:
+        """A connect or a statement went through: close the breaker."""
+        with self._lock:
+            self._state, self.failures, self._probing = "closed", 0, None
+
+    def release(self) -> None:
+        """This thread's probe ended without a verdict: let another through."""
+        with self._lock:
+            if self._probing == threading.get_ident():
+                self._probing = None
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = None
+            state = self._current()
+            if state == "half_open" or self.failures >= self.threshold:
+                if state != "open":
+                    self.opens += 1
+                self._state, self.opened_at = "open", time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current()
+            open_for = time.monotonic() - self.opened_at if state != "closed" else 0.0
+            return {"breaker_state": state, "breaker_failures": self.failures,
+                    "breaker_opens": self.opens, "breaker_open_s": round(open_for, 1)}
+
+
+breaker = CircuitBreaker()
+
+
+def guarded_connect(dsn: str, factory, attempts: int = CONNECT_ATTEMPTS,
+                    timeout: int = CONNECT_TIMEOUT):
+    """Connect through the breaker, retrying with jittered backoff.
+
+    Up to ``attempts`` × ``timeout`` plus backoff: pass ``attempts=1`` and
+    a short ``timeout`` where a page is waiting.
+    """
+    if not breaker.allow():
+        metrics.add(short_circuited=1)
+        raise DatabaseUnavailable("database unavailable (circuit open)")
+    last = None
+    for delay in [*backoff_delays(attempts), None]:
+        t0 = time.perf_counter()
+        try:
+            conn = psycopg2.connect(dsn, connection_factory=factory,
+                                    connect_timeout=timeout)
+        except OperationalError as exc:
+            last = exc
+            metrics.add(connect_failures=1)
+            if delay is not None:
+                time.sleep(delay)
+            continue
+        metrics.connected((time.perf_counter() - t0) * 1000)
+        breaker.success()
+        return conn
+    breaker.failure()
+    raise DatabaseUnavailable(f"database unavailable: {last}") from last
+
+
+# ───────────────────────────────────────────────────────────────
+# 3. Warm pool: ready connections + keepalive pings in store hours
+# ───────────────────────────────────────────────────────────────
+MIN_READY   = int(os.environ.get("VIZ_MIN_READY", "2"))
+PING_EVERY  = float(os.environ.get("VIZ_PING_S", "240"))     # < Neon's 5 min idle suspend
+STORE_HOURS = tuple(int(h) for h in os.environ.get("VIZ_STORE_HOURS", "7-23").split("-"))
+
+
+def in_store_hours(now: pd.Timestamp | None = None) -> bool:
+    hour = (now or pd.Timestamp.now()).hour
+    open_h, close_h = STORE_HOURS
+    return open_h <= hour < close_h if open_h <= close_h else hour >= open_h or hour < close_h
+
+
+class WarmPool:
+    """Keeps ``min_ready`` spare connections open and pinged.
+
+    New sessions ``take()`` a ready connection instead of paying a cold
+    connect; the pinger tops the pool back up and its ``SELECT 1`` keeps
+    a scale-to-zero database awake during store hours. Outside them the
+    spare connections are closed so the database may suspend.
+    """
+
+    def __init__(self, dsn: str, factory, min_ready: int = MIN_READY,
+                 interval: float = PING_EVERY):
+        self.dsn, self.factory = dsn, factory
+        self.min_ready = min_ready
+        self.interval  = interval
+        self._ready: list = []
+        self._lock   = threading.Lock()
+        self._wake   = threading.Event()
+        self._thread = None
+
+    def start(self) -> "WarmPool":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="db-warm-pool",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def refill(self) -> None:
+        """Top the pool up now instead of at the next ping."""
+        self._wake.set()
+
+    def take(self):
+        """A live spare connection, or None if none is ready."""
+        with self._lock:
+            while self._ready:
+                conn = self._ready.pop()
+                if not conn.closed:
+                    metrics.add(warm_taken=1)
+                    self._wake.set()                     # refill soon
+                    return conn
+        return None
+
+    def _ping(self, conn) -> bool:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            metrics.add(pings=1)
+            return True
+        except Exception:
+            metrics.add(ping_failures=1)
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return False
+
+    def tick(self) -> None:
+        # check the spares out while pinging so take() never hands one out
+        with self._lock:
+            spare, self._ready = self._ready, []
+        if not in_store_hours():
+            for conn in spare:
+                conn.close()
+            return
+        alive = [c for c in spare if self._ping(c)]
+        while len(alive) < self.min_ready:
+            try:
+                alive.append(guarded_connect(self.dsn, self.factory))
+            except OperationalError:
+                break
+        with self._lock:
+            self._ready.extend(alive)
+            extra, self._ready = self._ready[self.min_ready:], self._ready[:self.min_ready]
+        for conn in extra:
+            conn.close()
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self.tick()
+            except Exception:
+                pass
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def ready(self) -> int:
+        with self._lock:
+            return len(self._ready)
+
+
+def resilience_metrics(pool: WarmPool | None = None) -> dict:
+    return {**breaker.snapshot(), **metrics.snapshot(),
+            "warm_ready": pool.ready() if pool is not None else 0,
+            "store_hours": in_store_hours()}
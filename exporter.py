@@ -0,0 +1,167 @@
+import json
+import os
+import tempfile
+import time
+from contextlib import closing
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:                 # Parquet export is offered only with pyarrow
+    pa = pq = None
+
+# ───────────────────────────────────────────────────────────────
+# 1. Chunked exports: COPY → CSV, server-side cursor → Parquet
+# ───────────────────────────────────────────────────────────────
+EXPORT_CHUNK_ROWS = int(os.environ.get("VIZ_EXPORT_CHUNK_ROWS", "50000"))
+EXPORT_DIR        = os.environ.get("VIZ_EXPORT_DIR", tempfile.gettempdir())
+EXPORT_MAX_AGE_S  = float(os.environ.get("VIZ_EXPORT_MAX_AGE_S", "3600"))  # never downloaded
+_PREFIX           = "viz-export-"
+
+FORMATS = {"CSV": ("csv", "text/csv")}
+if pq is not None:
+    FORMATS["Parquet"] = ("parquet", "application/vnd.apache.parquet")
+
+# Postgres type OID → Arrow type; one fixed schema for every row group
+_ARROW_TYPES = {
+    16: "bool_", 20: "int64", 21: "int16", 23: "int32",
+    700: "float32", 701: "float64", 1700: "float64",        # numeric → float
+    1082: "date32", 1114: "timestamp", 1184: "timestamptz",
+}
+
+
+def _arrow_field(name: str, oid: int):
+    kind = _ARROW_TYPES.get(oid)
+    if kind == "timestamp":
+        return pa.field(name, pa.timestamp("us"))
+    if kind == "timestamptz":
+        return pa.field(name, pa.timestamp("us", tz="UTC"))
+    return pa.field(name, getattr(pa, kind)() if kind else pa.string())
+
+
+def estimate_rows(db, query: str, params=None) -> int:
+    """Planner row estimate (no scan) used to scale the progress bar."""
+    plan = db.fetch_data(f"EXPLAIN (FORMAT JSON) {query}", params).iat[0, 0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class _CountingWriter:
+    """File wrapper counting the CSV records COPY writes through it.
+
+    A newline inside a quoted value (free-text names, notes) is not a
+    record end: quotes toggle the state and an escaped ``""`` toggles it
+    twice, so only newlines outside quotes are counted.
+    """
+
+    def __init__(self, out, on_write):
+        self.out, self.on_write = out, on_write
+        self.lines  = 0
+        self.quoted = False               # inside a quoted value at chunk end
+
+    def write(self, data):
+        data = data if isinstance(data, bytes) else data.encode()
+        self.out.write(data)
+        parts = data.split(b'"')
+        for i, part in enumerate(parts):
+            if self.quoted == (i % 2 == 0) or not part:
+                continue
+            self.lines += part.count(b"\n")
+        self.quoted ^= (len(parts) - 1) % 2 == 1
+        self.on_write(max(self.lines - 1, 0))           # minus the header
+
+
+def _to_csv(db, query, params, out, report) -> int:
+    writer = _CountingWriter(out, report)
+    copied = db.copy_out(query, params, writer)
+    # the COPY command tag is exact; the writer's count is for progress
+    return copied if copied is not None and copied >= 0 else max(writer.lines - 1, 0)
+
+
+def _to_parquet(db, query, params, out, report, chunk_rows) -> int:
+    writer, schema, rows = None, None, 0
+    try:
+        # closing() ends the cursor and frees the connection as soon as we stop
+        with closing(db.stream_rows(query, params, chunk_rows)) as chunks:
+            for chunk, desc in chunks:
+                df = pd.DataFrame(chunk, columns=[c.name for c in desc])
+                if writer is None:
+                    schema = pa.schema([_arrow_field(c.name, c.type_code) for c in desc])
+                    writer = pq.ParquetWriter(out, schema, compression="zstd")
+                for field in schema:
+                    col = df[field.name]
+                    if pa.types.is_string(field.type):
+                        df[field.name] = col.map(lambda v: None if v is None else str(v))
+                    elif pa.types.is_floating(field.type):
+                        df[field.name] = pd.to_numeric(col, errors="coerce")
+                # one row group per chunk keeps writer memory at chunk size
+                writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+                rows += len(df)
+                report(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def sweep_exports(max_age_s: float = EXPORT_MAX_AGE_S) -> int:
+    """Remove export files older than ``max_age_s`` that were never downloaded."""
+    removed, cutoff = 0, time.time() - max_age_s
+    try:
+        names = os.listdir(EXPORT_DIR)
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if name.startswith(_PREFIX) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass                          # another session removed it first
+    return removed
+
+
+def read_once(path: str) -> bytes:
+    """Bytes of an export file, which is removed once read (one download)."""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def export_query(db, query: str, params=None, fmt: str = "CSV", name: str = "export",
+                 progress=None, chunk_rows: int = EXPORT_CHUNK_ROWS) -> dict:
+    """Stream ``query`` into a temp file; returns path / rows / bytes / rows_per_s.
+
+    ``progress(rows, estimated_rows, elapsed_s)`` is called as chunks arrive.
+    """
+    ext, mime = FORMATS[fmt]
+    est = estimate_rows(db, query, params)
+    sweep_exports()
+    fd, path = tempfile.mkstemp(prefix=f"{_PREFIX}{name}_", suffix=f".{ext}", dir=EXPORT_DIR)
+    t0 = time.perf_counter()
+
+    def report(rows: int) -> None:
+        if progress is not None:
+            progress(rows, est, time.perf_counter() - t0)
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if fmt == "CSV":
+                rows = _to_csv(db, query, params, out, report)
+            else:
+                rows = _to_parquet(db, query, params, out, report, chunk_rows)
+    except BaseException:
+        os.remove(path)
+        raise
+    seconds = time.perf_counter() - t0
+    return {"path": path, "file_name": f"{name}.{ext}", "mime": mime, "rows": rows,
+            "bytes": os.path.getsize(path), "seconds": seconds,
+            "rows_per_s": rows / seconds if seconds > 0 else 0.0}
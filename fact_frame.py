@@ -0,0 +1,139 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from datasets import RECENT_SALES_MAX, _blocks_token, get_scheduler, item_costs, slice_blocks
+from db_handler import DatabaseManager
+from item_cost import COSTING_METHODS, get_cost_index
+from item_dim import enrich_items, get_item_dim
+from sales_buckets import GROUP_COLS
+
+# ───────────────────────────────────────────────────────────────
+# 1. Enriched sales lines, built once per data version
+# ───────────────────────────────────────────────────────────────
+FACT_LEVELS = [col for col, _ in GROUP_COLS]
+
+
+def _normalised(values: pd.Series) -> pd.Series:
+    """Category codes with missing and empty names folded into "Unknown"."""
+    s = values.copy()
+    if "Unknown" not in s.cat.categories:
+        s = s.cat.add_categories("Unknown")
+    s = s.fillna("Unknown")
+    if "" in s.cat.categories:
+        s[s == ""] = "Unknown"
+    return s
+
+
+def data_version(blocks: dict) -> tuple:
+    """Recent-blocks content, item-dimension state and cost contents.
+
+    The recent-blocks and item-cost jobs rerun on a timer whether or not
+    anything changed, so their snapshot times would rebuild the frame
+    needlessly; the content tokens move only when the data does.
+    """
+    dim = get_item_dim()
+    return (*_blocks_token(blocks), len(dim), dim.max_xmin,
+            get_cost_index().content_hash())
+
+
+def build_facts(db, sales: pd.DataFrame, salesitems: pd.DataFrame) -> pd.DataFrame:
+    """One row per sale line with all ``FACT_LEVELS``, minute bucket and profit.
+
+    ``profit_<method>`` is (unit price − unit cost) × quantity for every
+    costing method, with unknown costs counted as zero.
+    """
+    if sales.empty or salesitems.empty:
+        return pd.DataFrame()
+    df = (enrich_items(db, salesitems, FACT_LEVELS)
+          .merge(sales[["saleid", "saletime"]], on="saleid", how="left"))
+    for col in FACT_LEVELS:
+        df[col] = _normalised(df[col])
+    df["saletime"] = pd.to_datetime(df["saletime"])
+    df["t_min"]    = df["saletime"].dt.floor("min")
+    costs = item_costs()
+    unitprice = pd.to_numeric(df["unitprice"], errors="coerce").to_numpy(dtype="float64") \
+        if "unitprice" in df else np.full(len(df), np.nan)
+    quantity = pd.to_numeric(df["quantity"], errors="coerce").to_numpy(dtype="float64")
+    for method in COSTING_METHODS:
+        unit_cost = costs.lookup(df["itemid"], method) if len(costs) else np.full(len(df), np.nan)
+        df[f"profit_{method}"] = (unitprice - np.nan_to_num(unit_cost)) * quantity
+    return df.sort_values("saleid", ascending=False, ignore_index=True)
+
+
+@st.cache_resource(show_spinner=False)
+def facts_db() -> DatabaseManager:
+    """Process-level connection for item lookups while building the frame."""
+    return DatabaseManager(key="fact-frame", query_class="interactive")
+
+
+class FactFrames:
+    """The fact frame of the latest recent-sales snapshot, shared by every
+    tab, category choice and session until ``data_version`` moves.
+
+    Built over all ``RECENT_SALES_MAX`` sales by one session at a time,
+    outside the lock so readers of the current version never wait on it;
+    ``get(n)`` hands out the last ``n`` sales' lines, memoised per version.
+    """
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._build   = threading.Lock()    # one build at a time
+        self.version  = None
+        self.frame    = pd.DataFrame()
+        self._slices: dict[int, pd.DataFrame] = {}
+        self.stats = {"builds": 0, "hits": 0, "slice_builds": 0, "fallback_builds": 0}
+
+    def get(self, n_sales: int, fallback=None) -> pd.DataFrame:
+        """Lines of the last ``n_sales`` sales; treat the frame as read-only.
+
+        Until the scheduler has loaded the recent blocks, ``fallback(n)``
+        (returning ``(sales, salesitems)``) is enriched uncached.
+        """
+        blocks = get_scheduler().snapshot("recent_blocks", timeout=5.0)
+        if blocks is None:
+            with self._lock:
+                self.stats["fallback_builds"] += 1
+            return build_facts(facts_db(), *fallback(n_sales)) if fallback else pd.DataFrame()
+        version = data_version(blocks)
+        with self._lock:
+            current = version == self.version
+            if current:
+                self.stats["hits"] += 1
+        if not current:
+            with self._build:
+                with self._lock:
+                    current = version == self.version
+                if not current:
+                    frame = build_facts(facts_db(), *slice_blocks(blocks, RECENT_SALES_MAX))
+                    with self._lock:
+                        self.frame, self.version, self._slices = frame, version, {}
+                        self.stats["builds"] += 1
+                else:
+                    with self._lock:
+                        self.stats["hits"] += 1
+        with self._lock:
+            part = self._slices.get(n_sales)
+            if part is None:
+                part = self.frame
+                if not part.empty:
+                    last = part["saleid"].drop_duplicates().head(n_sales)
+                    part = part[part["saleid"] >= last.min()]
+                self._slices[n_sales] = part
+                self.stats["slice_builds"] += 1
+            return part
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.stats["builds"] + self.stats["hits"]
+            return {"rows": len(self.frame), "version": str(self.version),
+                    "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0,
+                    **self.stats}
+
+
+@st.cache_resource(show_spinner=False)
+def get_fact_frames() -> FactFrames:
+    """Process-wide fact frame shared by the family and profit pages."""
+    return FactFrames()
@@ -0,0 +1,172 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sale_watermark import SaleWatermark, sale_batch
+
+# ───────────────────────────────────────────────────────────────
+# 1. Sales totals at hour / day / month grain
+# ───────────────────────────────────────────────────────────────
+LEVELS = {
+    "year_month":   "Year × Month",
+    "month_day":    "Month × Day",
+    "day_hour":     "Day × Hour",
+}
+NEXT_LEVEL = {"year_month": "month_day", "month_day": "day_hour"}
+WEEKDAYS   = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+_HOURLY_SQL = f"""
+    SELECT date_trunc('hour', saletime) AS hour, SUM(totalamount) AS total
+      FROM sales
+     WHERE {sale_batch()}
+     GROUP BY 1
+"""
+
+
+def auto_level(start: pd.Timestamp, end: pd.Timestamp) -> str:
+    """Coarsest grid that still shows the span with a readable row count."""
+    days = (end - start) / pd.Timedelta(days=1)
+    if days <= 92:
+        return "day_hour"
+    if days <= 3 * 366:
+        return "month_day"
+    return "year_month"
+
+
+def row_bounds(level: str, row) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """[start, end) covered by one row of a ``level`` pivot."""
+    if level == "year_month":
+        start = pd.Timestamp(year=int(row), month=1, day=1)
+        return start, start + pd.DateOffset(years=1)
+    if level == "month_day":
+        start = pd.Timestamp(row)
+        return start, start + pd.offsets.MonthBegin()
+    start = pd.Timestamp(row)
+    return start, start + pd.Timedelta(days=1)
+
+
+def _empty_series() -> pd.Series:
+    return pd.Series(dtype="float64", index=pd.DatetimeIndex([], dtype="datetime64[ns]"))
+
+
+def _merge(series: pd.Series, new: pd.Series) -> pd.Series:
+    """Add ``new`` totals into a time-sorted series, touching only its tail."""
+    if new.empty:
+        return series
+    cut  = series.index.searchsorted(new.index.min())
+    tail = pd.concat([series.iloc[cut:], new])
+    tail = tail.groupby(level=0).sum()
+    return pd.concat([series.iloc[:cut], tail])
+
+
+class HeatmapPyramid:
+    """Hourly, daily and monthly sales totals for the whole history.
+
+    The first refresh loads every hour once; later refreshes read only
+    sales not folded yet (see ``SaleWatermark``) and add them to the affected hour, day and
+    month. Each heatmap grid is a reshape of one of the three series, so
+    years of history cost about as much as a week.
+    """
+
+    def __init__(self):
+        self.hourly      = _empty_series()
+        self.daily       = _empty_series()
+        self.monthly     = _empty_series()
+        self.watermark   = SaleWatermark()
+        self.now         = pd.Timestamp.now().floor("min")
+        self._lock       = threading.Lock()
+
+    @property
+    def last_saleid(self) -> int:
+        return self.watermark.last_saleid
+
+    # ────────── maintenance ──────────
+    def add_hourly(self, rows: pd.DataFrame) -> None:
+        """Fold (hour, total) rows into all three levels."""
+        if rows.empty:
+            return
+        new = (pd.Series(pd.to_numeric(rows["total"], errors="coerce").fillna(0).to_numpy(float),
+                         index=pd.DatetimeIndex(pd.to_datetime(rows["hour"])).astype("datetime64[ns]"))
+                 .groupby(level=0).sum())
+        self.hourly  = _merge(self.hourly, new)
+        self.daily   = _merge(self.daily, new.groupby(new.index.normalize()).sum())
+        months = new.index.to_period("M").to_timestamp()
+        self.monthly = _merge(self.monthly, new.groupby(months).sum())
+
+    def refresh(self, db) -> int:
+        with self._lock:
+            top = db.fetch_data("SELECT COALESCE(MAX(saleid), 0) AS m, "
+                                "LOCALTIMESTAMP AS now FROM sales")
+            self.now = pd.Timestamp(top["now"].iat[0]).floor("min")
+            batch = self.watermark.batch(db, int(top["m"].iat[0]))
+            if batch is not None:
+                self.add_hourly(db.fetch_data(_HOURLY_SQL, batch))
+            self.watermark.advance()
+            return self.last_saleid
+
+    def install(self, hourly: pd.Series, daily: pd.Series, monthly: pd.Series,
+                now: pd.Timestamp, last_saleid: int) -> None:
+        """Adopt series published by another process (see shared_hot)."""
+        with self._lock:
+            self.hourly, self.daily, self.monthly = hourly, daily, monthly
+            self.now, self.watermark = now, SaleWatermark(last_saleid)
+
+    # ────────── grids ──────────
+    @property
+    def first(self):
+        return self.hourly.index[0] if len(self.hourly) else None
+
+    @staticmethod
+    def _slice(series: pd.Series, start, end) -> pd.Series:
+        lo, hi = series.index.searchsorted([pd.Timestamp(start), pd.Timestamp(end)])
+        return series.iloc[lo:hi]
+
+    def pivot(self, level: str, start, end) -> pd.DataFrame:
+        """Sales totals over [start, end) as a ``level`` grid."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if level == "year_month":
+            s = self._slice(self.monthly, start.to_period("M").to_timestamp(), end)
+            grid = pd.DataFrame({"row": s.index.year, "col": s.index.month, "v": s.to_numpy()})
+            rows, cols = range(start.year, (end - pd.Timedelta(1)).year + 1), range(1, 13)
+        elif level == "month_day":
+            s = self._slice(self.daily, start.normalize(), end)
+            grid = pd.DataFrame({"row": s.index.to_period("M").to_timestamp(),
+                                 "col": s.index.day, "v": s.to_numpy()})
+            rows = pd.date_range(start.to_period("M").to_timestamp(), end - pd.Timedelta(1),
+                                 freq="MS")
+            cols = range(1, 32)
+        else:
+            s = self._slice(self.hourly, start.floor("h"), end)
+            grid = pd.DataFrame({"row": s.index.normalize(), "col": s.index.hour,
+                                 "v": s.to_numpy()})
+            rows = pd.date_range(start.normalize(), end - pd.Timedelta(1), freq="D")
+            cols = range(24)
+        out = (grid.pivot_table(index="row", columns="col", values="v", aggfunc="sum")
+               .reindex(index=rows, columns=cols).fillna(0.0)
+               if not grid.empty else
+               pd.DataFrame(0.0, index=rows, columns=cols))
+        if level == "month_day":
+            # blank out days that do not exist (e.g. 30 February)
+            lengths = np.array([m.days_in_month for m in out.index])
+            out = out.where(np.arange(1, 32)[None, :] <= lengths[:, None])
+        out.index.name, out.columns.name = None, None
+        return out
+
+    def weekday_hour(self, start, end) -> pd.DataFrame:
+        """Average sales per weekday × hour over the whole days in [start, end)."""
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end)
+        s = self._slice(self.hourly, start, end)
+        days = pd.date_range(start, end - pd.Timedelta(1), freq="D")
+        n_days = pd.Series(days.weekday).value_counts().reindex(range(7), fill_value=0)
+        totals = (s.groupby([s.index.weekday, s.index.hour]).sum()
+                   .unstack().reindex(index=range(7), columns=range(24)).fillna(0.0))
+        avg = totals.div(n_days.replace(0, np.nan), axis=0)
+        avg.index = WEEKDAYS
+        return avg
+
+
+@st.cache_resource(show_spinner=False)
+def get_pyramid() -> HeatmapPyramid:
+    return HeatmapPyramid()
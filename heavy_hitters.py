@@ -0,0 +1,214 @@
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from sale_watermark import SaleWatermark, sale_batch
+
+# ───────────────────────────────────────────────────────────────
+# 1. Hourly Space-Saving summaries of item quantity and revenue
+# ───────────────────────────────────────────────────────────────
+CAPACITY     = 200          # counters kept per hour and measure
+HORIZON_DAYS = 35
+MEASURES     = {"quantity": "quantity", "revenue": "totalprice"}
+
+LONG_WINDOWS = {
+    "Last 24 h":  pd.Timedelta(hours=24),
+    "Last 7 d":   pd.Timedelta(days=7),
+    "This month": None,                      # since the 1st, local time
+    "Last 30 d":  pd.Timedelta(days=30),
+}
+
+_NEW_LINES_SQL = f"""
+    SELECT date_trunc('hour', s.saletime) AS hour, si.itemid,
+           SUM(si.quantity)   AS quantity,
+           SUM(si.totalprice) AS totalprice
+      FROM sales s
+      JOIN salesitems si ON si.saleid = s.saleid
+     WHERE {sale_batch("s.saleid")}
+       AND s.saletime >= LOCALTIMESTAMP - INTERVAL '%s days'
+     GROUP BY 1, 2
+"""
+
+_EXACT_SQL = """
+    SELECT si.itemid,
+           SUM(si.quantity)   AS quantity,
+           SUM(si.totalprice) AS totalprice,
+           COUNT(*)           AS lines
+      FROM sales s
+      JOIN salesitems si ON si.saleid = s.saleid
+     WHERE s.saletime >= %s AND s.saletime < %s
+       AND si.itemid = ANY(%s)
+     GROUP BY si.itemid
+"""
+
+
+def _empty_counters() -> pd.DataFrame:
+    return pd.DataFrame({"hour":   pd.Series(dtype="datetime64[ns]"),
+                         "itemid": pd.Series(dtype="int64"),
+                         "count":  pd.Series(dtype="float64"),
+                         "error":  pd.Series(dtype="float64")})
+
+
+def _empty_floors() -> pd.Series:
+    return pd.Series(dtype="float64", index=pd.DatetimeIndex([], name="hour"))
+
+
+def merge_summaries(counters: pd.DataFrame, floors: pd.Series, key: str = "hour",
+                    capacity: int = CAPACITY) -> tuple[pd.DataFrame, float]:
+    """Merge Space-Saving summaries into one with ``capacity`` counters.
+
+    ``counters`` holds (key, itemid, count, error) rows of several
+    summaries and ``floors`` maps each ``key`` to that summary's floor: the
+    most an item it does not list can have. An item's merged count adds
+    its own count where listed and the floor where not, so it never
+    underestimates; ``count - error`` never overestimates.
+    Returns (itemid / count / error frame, merged floor).
+    """
+    total_floor = float(floors.sum())
+    if counters.empty:
+        return pd.DataFrame(columns=["itemid", "count", "error"]), total_floor
+    own = floors.reindex(counters[key]).fillna(0).to_numpy()
+    merged = (counters.assign(count=counters["count"] - own,
+                              error=counters["error"] - own)
+                      .groupby("itemid")[["count", "error"]].sum() + total_floor)
+    merged = merged.sort_values("count", ascending=False)
+    floor = total_floor
+    if len(merged) > capacity:
+        floor = max(floor, float(merged["count"].iat[capacity]))
+        merged = merged.iloc[:capacity]
+    return merged.reset_index(), floor
+
+
+class HeavyHitters:
+    """Top items per hour by quantity and revenue, mergeable over any range.
+
+    Each (hour, measure) keeps at most ``CAPACITY`` Space-Saving counters;
+    new sales are folded into their hour by merging, so a month's top-K
+    is one merge of ~700 small summaries instead of a scan of salesitems.
+    """
+
+    def __init__(self):
+        self.counters    = {m: _empty_counters() for m in MEASURES}
+        self.floors      = {m: _empty_floors() for m in MEASURES}
+        self.watermark   = SaleWatermark()
+        self.now         = pd.Timestamp.now().floor("min")
+        self._lock       = threading.Lock()
+
+    @property
+    def last_saleid(self) -> int:
+        return self.watermark.last_saleid
+
+    # ────────── maintenance ──────────
+    def _fold(self, measure: str, new: pd.DataFrame) -> None:
+        """Merge exact per-(hour, item) sums into the stored hourly summaries."""
+        counters, floors = self.counters[measure], self.floors[measure]
+        start = new["hour"].min()
+        cut = counters["hour"].searchsorted(start) if len(counters) else 0
+        head, tail = counters.iloc[:cut], counters.iloc[cut:]
+        batch = new.assign(count=new[MEASURES[measure]].astype(float), error=0.0)
+        new_floors = floors[floors.index < start].to_dict()
+
+        # hours seen for the first time: exact sums, just keep the top CAPACITY
+        fresh = batch[~batch["hour"].isin(tail["hour"])]
+        rank = fresh.groupby("hour")["count"].rank(method="first", ascending=False)
+        for hour, floor in fresh.loc[rank == CAPACITY + 1, ["hour", "count"]].itertuples(index=False):
+            new_floors[hour] = floor
+        parts = [head, fresh[rank <= CAPACITY]]
+
+        # hours that already have a summary: two-way merge
+        stored = batch[batch["hour"].isin(tail["hour"])]
+        for hour, old in tail.groupby("hour"):
+            rows = pd.concat([old.assign(src=0),
+                              stored[stored["hour"] == hour].assign(src=1)],
+                             ignore_index=True)
+            # the new sums are exact, so only the stored summary has a floor
+            merged, floor = merge_summaries(
+                rows, pd.Series({0: floors.get(hour, 0.0), 1: 0.0}), key="src")
+            parts.append(merged.assign(hour=hour))
+            new_floors[hour] = floor
+
+        self.counters[measure] = (pd.concat(parts, ignore_index=True)
+                                  [["hour", "itemid", "count", "error"]]
+                                  .astype({"itemid": "int64", "count": "float64",
+                                           "error": "float64"})
+                                  .sort_values("hour", kind="stable", ignore_index=True))
+        self.floors[measure] = pd.Series(new_floors, dtype="float64").sort_index()
+
+    def refresh(self, db) -> int:
+        with self._lock:
+            top = db.fetch_data("SELECT COALESCE(MAX(saleid), 0) AS m, "
+                                "LOCALTIMESTAMP AS now FROM sales")
+            self.now = pd.Timestamp(top["now"].iat[0]).floor("min")
+            batch = self.watermark.batch(db, int(top["m"].iat[0]))
+            if batch is not None:
+                new = db.fetch_data(_NEW_LINES_SQL, (*batch, HORIZON_DAYS))
+                if not new.empty:
+                    new["hour"]   = pd.to_datetime(new["hour"]).astype("datetime64[ns]")
+                    new["itemid"] = new["itemid"].astype("int64")
+                    for measure in MEASURES:
+                        self._fold(measure, new)
+            self.watermark.advance()
+            oldest = self.now.floor("h") - pd.Timedelta(days=HORIZON_DAYS)
+            for m in MEASURES:
+                c = self.counters[m]
+                self.counters[m] = c.iloc[c["hour"].searchsorted(oldest):].reset_index(drop=True)
+                self.floors[m] = self.floors[m][self.floors[m].index >= oldest]
+            return self.last_saleid
+
+    def install(self, counters: dict, floors: dict, now: pd.Timestamp,
+                last_saleid: int) -> None:
+        """Adopt summaries published by another process (see shared_hot)."""
+        with self._lock:
+            self.counters, self.floors = counters, floors
+            self.now, self.watermark = now, SaleWatermark(last_saleid)
+
+    # ────────── queries ──────────
+    def window_start(self, window: str) -> pd.Timestamp:
+        span = LONG_WINDOWS[window]
+        if span is None:
+            return self.now.normalize().replace(day=1)
+        return self.now - span
+
+    def top(self, measure: str, start, end, k: int = 10) -> pd.DataFrame:
+        """Top ``k`` items by ``measure`` over [start, end) with error bounds.
+
+        ``upper`` / ``lower`` bracket the true total; ``guaranteed`` marks
+        items whose lower bound beats every item outside the top ``k``.
+        """
+        counters, floors = self.counters[measure], self.floors[measure]
+        lo, hi = counters["hour"].searchsorted([pd.Timestamp(start).floor("h"),
+                                                pd.Timestamp(end)])
+        rows = counters.iloc[lo:hi]
+        span = floors[(floors.index >= pd.Timestamp(start).floor("h"))
+                      & (floors.index < pd.Timestamp(end))]
+        merged, floor = merge_summaries(rows, span, capacity=len(rows) or 1)
+        if merged.empty:
+            return pd.DataFrame(columns=["itemid", "upper", "lower", "guaranteed"])
+        merged = merged.rename(columns={"count": "upper"})
+        merged["lower"] = merged["upper"] - merged["error"]
+        # anything below rank k (listed or not) can reach at most this
+        cutoff = max(floor, float(merged["upper"].iat[k])) if len(merged) > k else floor
+        out = merged.head(k).copy()
+        out["guaranteed"] = out["lower"] >= cutoff
+        return out[["itemid", "upper", "lower", "guaranteed"]].reset_index(drop=True)
+
+
+def exact_recount(db, itemids, start, end) -> pd.DataFrame:
+    """Exact quantity / revenue / line totals for a few candidate items.
+
+    ``start`` is floored to the hour like in ``HeavyHitters.top``, so the
+    recount covers the same hours the candidates were ranked over.
+    """
+    ids = [int(i) for i in itemids]
+    cols = ["itemid", "quantity", "totalprice", "lines"]
+    if not ids:
+        return pd.DataFrame(columns=cols)
+    rows = db.fetch_data(_EXACT_SQL, (pd.Timestamp(start).floor("h").to_pydatetime(),
+                                      pd.Timestamp(end).to_pydatetime(), ids))
+    return rows.reindex(columns=cols)
+
+
+@st.cache_resource(show_spinner=False)
+def get_heavy_hitters() -> HeavyHitters:
+    return HeavyHitters()
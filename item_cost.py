@@ -0,0 +1,135 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# ───────────────────────────────────────────────────────────────
+# 1. Per-item cost state, aggregated in the database
+# ───────────────────────────────────────────────────────────────
+COSTING_METHODS = {
+    "min":    "Lowest cost",
+    "latest": "Latest receipt",
+    "wavg":   "Weighted average",
+    "fifo":   "FIFO (oldest batch in stock)",
+}
+STATE_COLS = ["min_cost", "latest_cost", "cost_x_qty", "qty", "fifo_cost"]
+
+# the serial inventoryid orders receipts by arrival, so no date column is needed
+_COST_STATE_SQL = """
+    SELECT itemid,
+           MIN(cost_per_unit)                                        AS min_cost,
+           (array_agg(cost_per_unit ORDER BY inventoryid DESC))[1]
+                                                                     AS latest_cost,
+           SUM(cost_per_unit * GREATEST(quantity, 0))                AS cost_x_qty,
+           SUM(GREATEST(quantity, 0))                                AS qty,
+           (array_agg(cost_per_unit ORDER BY inventoryid)
+                FILTER (WHERE quantity > 0))[1]                      AS fifo_cost
+      FROM inventory
+     GROUP BY itemid
+"""
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Item cost index: bulk rebuild + incremental receipts
+# ───────────────────────────────────────────────────────────────
+class ItemCostIndex:
+    """Unit cost per itemid under each costing method.
+
+    ``state`` keeps one row of running aggregates per item; ``rebuild``
+    reloads it with a single GROUP BY and ``record`` folds in a receipt
+    written through ``DatabaseManager.add_inventory`` without touching
+    the database. Costs are derived once per change, so profit is a
+    vectorised reindex.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = pd.DataFrame(columns=STATE_COLS, dtype="float64",
+                                  index=pd.Index([], dtype="int64", name="itemid"))
+        self.costs = self._derive(self.state)
+        self.stats = {"rebuilds": 0, "recorded": 0}
+        self._hashed = (None, 0)          # (state hashed, its hash)
+
+    def __len__(self) -> int:
+        return len(self.state)
+
+    @staticmethod
+    def _derive(state: pd.DataFrame) -> pd.DataFrame:
+        wavg = state["cost_x_qty"] / state["qty"].where(state["qty"] > 0)
+        return pd.DataFrame({
+            "min":    state["min_cost"],
+            "latest": state["latest_cost"],
+            "wavg":   wavg.fillna(state["latest_cost"]),
+            # nothing left in stock → FIFO falls back to the latest receipt
+            "fifo":   state["fifo_cost"].fillna(state["latest_cost"]),
+        }, index=state.index)
+
+    # ────────── maintenance ──────────
+    def install(self, state: pd.DataFrame) -> None:
+        """Adopt a full state frame (from ``rebuild`` or another process)."""
+        if "itemid" in state:
+            state = state.set_index("itemid")
+        state = state[STATE_COLS].apply(pd.to_numeric, errors="coerce").astype("float64")
+        state.index = state.index.astype("int64")
+        costs = self._derive(state)
+        with self._lock:
+            self.state, self.costs = state, costs
+
+    def rebuild(self, db) -> int:
+        rows = db.fetch_data(_COST_STATE_SQL)
+        if rows.empty:                    # no receipts yet: an empty index, not an error
+            rows = pd.DataFrame(columns=["itemid", *STATE_COLS])
+        self.install(rows.set_index("itemid").reindex(columns=STATE_COLS))
+        self.stats["rebuilds"] += 1
+        return len(self)
+
+    def record(self, row: dict) -> None:
+        """Apply one inventory receipt (the dict passed to ``add_inventory``).
+
+        The state frame is copied and swapped, not edited in place, so a
+        receipt costs O(items); readers keep a consistent frame meanwhile.
+        """
+        if row.get("itemid") is None or row.get("cost_per_unit") is None:
+            return
+        item = int(row["itemid"])
+        cost = float(row["cost_per_unit"])
+        qty  = max(float(row.get("quantity") or 0), 0.0)
+        with self._lock:
+            if item in self.state.index:
+                old = self.state.loc[item]
+                new = [np.fmin(old["min_cost"], cost), cost,
+                       old["cost_x_qty"] + cost * qty, old["qty"] + qty,
+                       old["fifo_cost"] if pd.notna(old["fifo_cost"])
+                       else (cost if qty > 0 else np.nan)]
+            else:
+                new = [cost, cost, cost * qty, qty, cost if qty > 0 else np.nan]
+            state = self.state.copy()
+            state.loc[item] = new
+            self.state, self.costs = state, self._derive(state)
+            self.stats["recorded"] += 1
+
+    # ────────── lookups ──────────
+    def lookup(self, itemids, method: str = "min") -> np.ndarray:
+        """Unit cost of each itemid (NaN where the item has no inventory)."""
+        return (self.costs[method].reindex(np.asarray(itemids, dtype=np.int64))
+                                  .to_numpy(dtype="float64"))
+
+    def frame(self) -> pd.DataFrame:
+        return self.state.reset_index()
+
+    def content_hash(self) -> int:
+        """Changes with any cost state; decides whether to republish."""
+        with self._lock:
+            state = self.state
+            if self._hashed[0] is state:  # frames are swapped, never edited
+                return self._hashed[1]
+        digest = int(pd.util.hash_pandas_object(state).sum()) if len(state) else 0
+        with self._lock:
+            self._hashed = (state, digest)
+        return digest
+
+
+@st.cache_resource(show_spinner=False)
+def get_cost_index() -> ItemCostIndex:
+    return ItemCostIndex()
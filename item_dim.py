@@ -0,0 +1,155 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from compact import shared_categories
+
+# ───────────────────────────────────────────────────────────────
+# 1. Item dimension as dense itemid-indexed column arrays
+# ───────────────────────────────────────────────────────────────
+STRING_COLS = ["itemnameenglish", "familycat", "sectioncat",
+               "departmentcat", "classcat"]
+DIM_COLS    = [*STRING_COLS, "sellingprice"]
+
+FULL_RELOAD_S = 3600        # safety net for changes xmin cannot see
+
+# xmin changes whenever a row is inserted or updated, so "xmin > last seen"
+# picks up new and edited items without an updated_at column
+_DIM_SQL = f"""
+    SELECT itemid, {", ".join(DIM_COLS)}, xmin::text::bigint AS row_xmin
+      FROM item
+"""
+
+
+class ItemDimension:
+    """Process-wide item attributes looked up by position, not by merge.
+
+    ``pos[itemid]`` gives the row of an item (-1 if unknown); string
+    attributes are stored as codes into ``compact.shared_categories`` and
+    prices as float32, so enrichment is a couple of numpy ``take``s.
+    """
+
+    def __init__(self):
+        self._lock     = threading.Lock()
+        self.pos       = np.full(0, -1, dtype=np.int32)
+        self.itemids   = np.empty(0, dtype=np.int64)
+        self.codes     = {c: np.empty(0, dtype=np.int32) for c in STRING_COLS}
+        self.price     = np.empty(0, dtype=np.float32)
+        self.max_xmin  = 0
+        self._full_at  = None
+        self.stats = {"full_loads": 0, "incremental_rows": 0,
+                      "targeted_fetches": 0, "targeted_rows": 0}
+
+    def __len__(self) -> int:
+        return len(self.itemids)
+
+    # ────────── maintenance ──────────
+    def upsert(self, rows: pd.DataFrame) -> None:
+        """Insert new items and overwrite changed ones."""
+        if rows.empty:
+            return
+        ids = rows["itemid"].to_numpy(dtype=np.int64)
+        with self._lock:
+            pos = self.pos
+            if ids.max() >= len(pos):
+                pos = np.concatenate([pos, np.full(ids.max() + 1 - len(pos), -1, np.int32)])
+            else:
+                pos = pos.copy()
+            row = pos[ids]
+            new = row < 0
+            n_old, n_new = len(self.itemids), int(new.sum())
+            row[new] = np.arange(n_old, n_old + n_new, dtype=np.int32)
+            pos[ids[new]] = row[new]
+
+            itemids = np.concatenate([self.itemids, ids[new]])
+            codes = {}
+            for col in STRING_COLS:
+                arr = np.concatenate([self.codes[col], np.full(n_new, -1, np.int32)])
+                arr[row] = shared_categories.encode(col, rows[col]).codes
+                codes[col] = arr
+            price = np.concatenate([self.price, np.full(n_new, np.nan, np.float32)])
+            price[row] = pd.to_numeric(rows["sellingprice"], errors="coerce").to_numpy(np.float32)
+
+            # swap whole arrays so lock-free readers see a consistent version
+            self.itemids, self.codes, self.price, self.pos = itemids, codes, price, pos
+            if "row_xmin" in rows:
+                self.max_xmin = max(self.max_xmin, int(rows["row_xmin"].max()))
+
+    def refresh(self, db) -> int:
+        """Full load once an hour, otherwise only rows with a newer xmin."""
+        if self._full_at is None or time.monotonic() - self._full_at > FULL_RELOAD_S:
+            rows = db.fetch_data(_DIM_SQL)
+            self.stats["full_loads"] += 1
+            self._full_at = time.monotonic()
+        else:
+            rows = db.fetch_data(_DIM_SQL + " WHERE xmin::text::bigint > %s",
+                                 (self.max_xmin,))
+            self.stats["incremental_rows"] += len(rows)
+        self.upsert(rows)
+        return len(self)
+
+    def missing(self, itemids) -> np.ndarray:
+        ids = np.unique(np.asarray(itemids, dtype=np.int64))
+        pos = self.pos
+        known = ids < len(pos)
+        known[known] = pos[ids[known]] >= 0
+        return ids[~known]
+
+    def ensure(self, db, itemids) -> None:
+        """Targeted fetch of any itemid the dimension has not seen yet."""
+        unknown = self.missing(itemids)
+        if len(unknown):
+            rows = db.fetch_prepared("items_by_id", unknown.tolist())
+            self.stats["targeted_fetches"] += 1
+            self.stats["targeted_rows"]    += len(rows)
+            self.upsert(rows)
+
+    # ────────── lookups ──────────
+    def _rows(self, itemids) -> np.ndarray:
+        ids = np.asarray(itemids, dtype=np.int64)
+        pos = self.pos
+        rows = np.full(len(ids), -1, dtype=np.int32)
+        inside = (ids >= 0) & (ids < len(pos))
+        rows[inside] = pos[ids[inside]]
+        return rows
+
+    def take(self, itemids, col: str):
+        """Values of ``col`` for ``itemids`` (NaN for unknown items)."""
+        rows = self._rows(itemids)
+        known = rows >= 0
+        if col == "sellingprice":
+            out = np.full(len(rows), np.nan, dtype=np.float32)
+            out[known] = self.price[rows[known]]
+            return out
+        codes = np.full(len(rows), -1, dtype=np.int32)
+        codes[known] = self.codes[col][rows[known]]
+        return pd.Categorical.from_codes(codes, categories=shared_categories.categories(col))
+
+    def enrich(self, df: pd.DataFrame, cols=DIM_COLS) -> pd.DataFrame:
+        """``df`` (with an ``itemid`` column) plus the requested item columns."""
+        itemids = df["itemid"].to_numpy()
+        return df.assign(**{c: self.take(itemids, c) for c in cols})
+
+    # ────────── sharing ──────────
+    def frame(self) -> pd.DataFrame:
+        """The whole dimension as a frame (for publishing to other processes)."""
+        ids = self.itemids
+        return pd.DataFrame({"itemid": ids,
+                             **{c: self.take(ids, c) for c in DIM_COLS},
+                             "row_xmin": self.max_xmin})
+
+
+@st.cache_resource(show_spinner=False)
+def get_item_dim() -> ItemDimension:
+    return ItemDimension()
+
+
+def enrich_items(db, df: pd.DataFrame, cols=DIM_COLS) -> pd.DataFrame:
+    """Fetch unknown items (if any), then add ``cols`` to ``df`` by itemid."""
+    dim = get_item_dim()
+    if not df.empty:
+        dim.ensure(db, df["itemid"])
+    return dim.enrich(df, cols)
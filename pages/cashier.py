@@ -2,7 +2,14 @@ import streamlit as st
 import pandas as pd
 import time
 import json
+import datetime as dt
 from db_handler import DatabaseManager
+from caching import single_flight
+from compact import compact_frame
+from cashier_rollups import series_freq
+from d3_charts import line_chart_html, renderer_picker
+from datasets import cashier_rollups, quantile_sketches, recent_blocks
+from quantiles import QUANTILES
 import streamlit.components.v1 as components
 
 try:
@@ -15,154 +22,121 @@ st.title("🧑‍💼 Cashier Sales Visualization")
 
 REFRESH = st.sidebar.slider("Refresh interval (seconds)", 2, 30, 5)
 NUM_SALES = st.sidebar.slider("Number of Recent Sales to Show", 5, 100, 30)
+PERIOD = st.sidebar.radio("Summarise", ["Recent sales", "Shift", "Date range"])
+RENDERER = renderer_picker()
+
+today = dt.date.today()
+if PERIOD == "Shift":
+    shift_day   = st.sidebar.date_input("Shift date", today)
+    shift_start = st.sidebar.time_input("Shift start", dt.time(8, 0))
+    shift_end   = st.sidebar.time_input("Shift end", dt.time(16, 0))
+    START = pd.Timestamp(dt.datetime.combine(shift_day, shift_start))
+    END   = pd.Timestamp(dt.datetime.combine(shift_day, shift_end))
+    if END <= START:                                   # overnight shift
+        END += pd.Timedelta(days=1)
+elif PERIOD == "Date range":
+    picked = st.sidebar.date_input("Date range", (today - dt.timedelta(days=6), today))
+    first, last = (picked[0], picked[-1]) if isinstance(picked, (tuple, list)) else (picked, picked)
+    START = pd.Timestamp(first)
+    END   = pd.Timestamp(last) + pd.Timedelta(days=1)
 
 if st_autorefresh:
     st_autorefresh(interval=REFRESH * 1000, key="cashier_refresh")
 
 db = DatabaseManager()
 
-@st.cache_data(ttl=2)
-def get_recent_sales(n=30):
-    return db.fetch_data(
-        f"SELECT saleid, saletime, totalamount, cashier FROM sales ORDER BY saleid DESC LIMIT {n}"
-    )
-
-sales_df = get_recent_sales(NUM_SALES)
-if sales_df.empty:
-    st.info("No sales yet.")
+@single_flight(ttl=2)
+def get_recent_sales(db, n=30):
+    return compact_frame(db.fetch_prepared("recent_sales", n), "cashier:sales")
+
+rollups = cashier_rollups()
+sketches = quantile_sketches()
+if PERIOD == "Recent sales":
+    blocks = recent_blocks(NUM_SALES)
+    sales_df = blocks[0] if blocks is not None else get_recent_sales(NUM_SALES)
+    if sales_df.empty:
+        st.info("No sales yet.")
+        st.stop()
+
+    sales_df = sales_df.sort_values("saletime")
+    sales_df['saletime'] = pd.to_datetime(sales_df['saletime'])
+    START = sales_df['saletime'].min().floor("min")
+    END   = sales_df['saletime'].max().floor("min") + pd.Timedelta(minutes=1)
+elif rollups is None:
+    st.info("Cashier rollups are still loading.")
     st.stop()
 
-sales_df = sales_df.sort_values("saletime")
-sales_df['saletime'] = pd.to_datetime(sales_df['saletime'])
+# Per-cashier series: from the rollups, or raw recent sales until they load
+if rollups is not None:
+    FREQ = series_freq(END - START)
+    points = (rollups.series(START, END, FREQ)
+              .rename(columns={"t": "date", "total": "value"}))
+    y_label = "↑ Sales per " + {"min": "minute", "15min": "15 min",
+                                "h": "hour", "D": "day"}[FREQ]
+else:
+    points = sales_df.rename(columns={"saletime": "date", "totalamount": "value"})
+    y_label = "↑ Sale Amount"
 
-tab1, tab2 = st.tabs(["Cashier Sales Chart", "Cashier Summary"])
+tab1, tab2, tab3 = st.tabs(["Cashier Sales Chart", "Cashier Summary",
+                            "Basket Distribution"])
 
 with tab1:
     st.write("Last refreshed at", time.strftime("%H:%M:%S"))
-
-    # Group by cashier for D3
-    chart_data = []
-    for cashier, group in sales_df.groupby("cashier"):
-        for _, row in group.iterrows():
-            chart_data.append({
-                "date": row['saletime'].strftime("%Y-%m-%dT%H:%M:%S"),
-                "value": float(row['totalamount']),
-                "cashier": cashier
-            })
-
-    chart_json = json.dumps(chart_data)
-
-    d3_code = """
-    <script src="https://d3js.org/d3.v7.min.js"></script>
-    <div id="chart"></div>
-    <script>
-    const data = """ + chart_json + """;
-
-    data.forEach(d => d.date = new Date(d.date));
-
-    const dataByCashier = Array.from(d3.group(data, d => d.cashier), ([key, values]) => ({key, values}));
-
-    const width = 928;
-    const height = 600;
-    const marginTop = 20;
-    const marginRight = 30;
-    const marginBottom = 30;
-    const marginLeft = 60;
-
-    const x = d3.scaleUtc(
-        d3.extent(data, d => d.date),
-        [marginLeft, width - marginRight]
-    );
-    const y = d3.scaleLinear(
-        [0, d3.max(data, d => d.value)],
-        [height - marginBottom, marginTop]
-    );
-    const z = d3.scaleOrdinal(d3.schemeCategory10);
-
-    const line = d3.line()
-        .defined(d => !isNaN(d.value))
-        .x(d => x(d.date))
-        .y(d => y(d.value));
-
-    const svg = d3.select("#chart").append("svg")
-        .attr("width", width)
-        .attr("height", height)
-        .attr("viewBox", [0, 0, width, height])
-        .attr("style", "max-width: 100%; height: auto; background: #fff; border-radius: 12px;");
-
-    svg.append("g")
-        .attr("transform", `translate(0,${height - marginBottom})`)
-        .call(d3.axisBottom(x).ticks(width / 100).tickSizeOuter(0));
-
-    svg.append("g")
-        .attr("transform", `translate(${marginLeft},0)`)
-        .call(d3.axisLeft(y).ticks(height / 40))
-        .call(g => g.select(".domain").remove())
-        .call(g => g.selectAll(".tick line").clone()
-            .attr("x2", width - marginLeft - marginRight)
-            .attr("stroke-opacity", 0.1))
-        .call(g => g.append("text")
-            .attr("x", -marginLeft + 5)
-            .attr("y", 10)
-            .attr("fill", "currentColor")
-            .attr("text-anchor", "start")
-            .text("↑ Sale Amount"));
-
-    const g = svg.append("g")
-        .attr("font-family", "sans-serif")
-        .attr("font-size", 12)
-        .attr("fill", "none")
-        .attr("stroke-width", 2);
-
-    dataByCashier.forEach((series, i) => {
-        g.append("path")
-            .datum(series.values)
-            .attr("d", line)
-            .attr("stroke", z(series.key))
-            .attr("id", "line-" + i);
-
-        // Label at the end of each line
-        const last = series.values[series.values.length - 1];
-        if (last) {
-            g.append("text")
-                .attr("paint-order", "stroke")
-                .attr("stroke", "#fff")
-                .attr("stroke-width", 4)
-                .attr("fill", z(series.key))
-                .attr("dx", 8)
-                .attr("dy", "0.32em")
-                .attr("x", x(last.date))
-                .attr("y", y(last.value))
-                .text(series.key);
-        }
-    });
-    </script>
-    """
-
-    components.html(d3_code, height=650)
+    if points.empty:
+        st.info("No sales in this period.")
+    else:
+        d3_code = line_chart_html(points, group="cashier", renderer=RENDERER,
+                                  height=600, y_label=y_label)
+        components.html(d3_code, height=670)
 
 with tab2:
     st.subheader("Total Sales Summary by Cashier")
-
-    summary = (
-        sales_df
-        .groupby("cashier")
-        .agg(
-            total_sales=('totalamount', 'sum'),
-            num_sales=('saleid', 'count'),
-            avg_sale=('totalamount', 'mean'),
-            max_sale=('totalamount', 'max'),
-            min_sale=('totalamount', 'min'),
-            last_sale=('saletime', 'max')
+    st.caption(f"{START:%Y-%m-%d %H:%M} → {END:%Y-%m-%d %H:%M}")
+
+    if PERIOD == "Recent sales":
+        summary = (
+            sales_df
+            .groupby("cashier", observed=True)
+            .agg(
+                total_sales=('totalamount', 'sum'),
+                num_sales=('saleid', 'count'),
+                avg_sale=('totalamount', 'mean'),
+                max_sale=('totalamount', 'max'),
+                min_sale=('totalamount', 'min'),
+                last_sale=('saletime', 'max')
+            )
+            .sort_values("total_sales", ascending=False)
+            .reset_index()
         )
-        .sort_values("total_sales", ascending=False)
-        .reset_index()
-    )
+    else:
+        summary = rollups.summary(START, END)
+        if summary.empty:
+            st.info("No sales in this period.")
+        span = rollups.span(START, END)
+        if span != (START, END):
+            st.caption(f"Older than the minute rollup: totals cover whole days "
+                       f"{span[0]:%Y-%m-%d} → {span[1]:%Y-%m-%d}")
+
+    # Basket-value percentiles: exact for recent sales, sketched for periods
+    PCT_COLS = ["p50", "p90", "p99"]
+    if PERIOD == "Recent sales":
+        pcts = (sales_df.groupby("cashier", observed=True)["totalamount"]
+                .quantile(QUANTILES).unstack())
+        pcts.columns = PCT_COLS
+    elif sketches is not None:
+        pcts = sketches.quantiles("cashier", START, END).set_index("cashier")[PCT_COLS]
+    else:
+        pcts = pd.DataFrame(columns=PCT_COLS)
+    summary = summary.merge(pcts.astype(float), left_on="cashier",
+                            right_index=True, how="left")
+
     # Format numbers for card display
     summary['total_sales'] = summary['total_sales'].map('{:,.2f}'.format)
     summary['avg_sale'] = summary['avg_sale'].map('{:,.2f}'.format)
     summary['max_sale'] = summary['max_sale'].map('{:,.2f}'.format)
     summary['min_sale'] = summary['min_sale'].map('{:,.2f}'.format)
+    for c in PCT_COLS:
+        summary[c] = summary[c].map(lambda v: f"{v:,.2f}" if pd.notna(v) else "–")
     summary['last_sale'] = pd.to_datetime(summary['last_sale']).dt.strftime("%Y-%m-%d %H:%M:%S")
 
     # Show as cards (3 per row)
@@ -178,10 +152,70 @@ with tab2:
     <span style="font-weight:500;color:#059669;">{row['num_sales']}</span> sales<br/>
     <span style="color:#2563eb;">Avg: {row['avg_sale']}</span> &nbsp;|&nbsp; 
     <span style="color:#64748b;">Max: {row['max_sale']}</span> &nbsp;|&nbsp;
-    <span style="color:#64748b;">Min: {row['min_sale']}</span>
+    <span style="color:#64748b;">Min: {row['min_sale']}</span><br/>
+    <span style="color:#7c3aed;">p50: {row['p50']}</span> &nbsp;|&nbsp;
+    <span style="color:#7c3aed;">p90: {row['p90']}</span> &nbsp;|&nbsp;
+    <span style="color:#7c3aed;">p99: {row['p99']}</span>
   </div>
   <div style="font-size:0.9rem;color:#64748b;margin-top:10px;">
     Last sale: {row['last_sale']}
   </div>
 </div>
 """, unsafe_allow_html=True)
+
+with tab3:
+    st.subheader("Basket Value Distribution by Cashier")
+    st.caption(f"{START:%Y-%m-%d %H} h → {END:%Y-%m-%d %H:%M} · hourly sketches, ±1 % on values")
+
+    dist = (sketches.distribution("cashier", START, END, merge_keys=10)
+            if sketches is not None else pd.DataFrame())
+    if sketches is None:
+        st.info("Sale-amount sketches are still loading.")
+    elif dist.empty:
+        st.info("No sales in this period.")
+    else:
+        st.dataframe(sketches.quantiles("cashier", START, END),
+                     hide_index=True, use_container_width=True)
+        dist = dist[dist["value"] > 0]
+        dist = dist.assign(share=dist["count"] / dist.groupby("cashier")["count"].transform("sum"))
+        dist_json = json.dumps([{"cashier": str(r.cashier), "value": float(r.value),
+                                 "share": float(r.share)}
+                                for r in dist.sort_values("value").itertuples()])
+
+        d3_dist = f"""
+<script src="https://d3js.org/d3.v7.min.js"></script>
+<div id="dist_chart"></div>
+<script>
+const data={dist_json};
+const byCashier=Array.from(d3.group(data,d=>d.cashier),([key,values])=>({{key,values}}));
+const width=900,height=420,margin={{top:30,right:90,bottom:40,left:60}};
+const x=d3.scaleLog(d3.extent(data,d=>d.value),[margin.left,width-margin.right]);
+const y=d3.scaleLinear([0,d3.max(data,d=>d.share)*1.1],[height-margin.bottom,margin.top]);
+const z=d3.scaleOrdinal(d3.schemeCategory10);
+const line=d3.line().curve(d3.curveMonotoneX).x(d=>x(d.value)).y(d=>y(d.share));
+const svg=d3.select("#dist_chart").append("svg")
+    .attr("width",width).attr("height",height)
+    .attr("viewBox",[0,0,width,height])
+    .attr("style","max-width:100%;height:auto;background:#fff;border-radius:12px;");
+svg.append("g")
+    .attr("transform",`translate(0,${{height-margin.bottom}})`)
+    .call(d3.axisBottom(x).ticks(width/100,"~s"));
+svg.append("g")
+    .attr("transform",`translate(${{margin.left}},0)`)
+    .call(d3.axisLeft(y).ticks(height/50,"%"))
+    .call(g=>g.select(".domain").remove())
+    .call(g=>g.append("text").attr("x",-margin.left+5).attr("y",12)
+        .attr("fill","currentColor").attr("text-anchor","start")
+        .text("↑ Share of sales"));
+const g=svg.append("g").attr("fill","none").attr("stroke-width",2);
+byCashier.forEach(series=>{{
+    g.append("path").datum(series.values).attr("d",line).attr("stroke",z(series.key));
+    const peak=series.values.reduce((a,b)=>b.share>a.share?b:a);
+    g.append("text").text(series.key).attr("font-size","0.85rem")
+      .attr("x",x(peak.value)).attr("y",y(peak.share)-6)
+      .attr("text-anchor","middle").attr("fill",z(series.key))
+      .attr("paint-order","stroke").attr("stroke","#fff").attr("stroke-width",4);
+}});
+</script>
+"""
+        components.html(d3_dist, height=460)
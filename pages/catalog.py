@@ -4,7 +4,9 @@
 import streamlit as st
 import pandas as pd
 import json
+from caching import budget_cache
 from db_handler import DatabaseManager
+from sales_buckets import GROUP_COLS
 import streamlit.components.v1 as components
 
 st.set_page_config(page_title="Catalog Structure", page_icon="📚")
@@ -12,19 +14,12 @@ st.title("📚 Catalog Structure (Item Table)")
 
 db = DatabaseManager()
 
-@st.cache_data(ttl=600)
+@budget_cache(ttl=600)
 def fetch_item_cats():
     return db.fetch_data(
         "SELECT familycat, sectioncat, departmentcat, classcat FROM item"
     )
 
-GROUP_COLS = [
-    ("familycat",     "Family"),
-    ("sectioncat",    "Section"),
-    ("departmentcat", "Department"),
-    ("classcat",      "Class"),
-]
-
 items_df = fetch_item_cats()
 
 for col, label in GROUP_COLS:
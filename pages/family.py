@@ -5,6 +5,13 @@ import streamlit as st
 import pandas as pd
 import json
 from db_handler import DatabaseManager
+from caching import single_flight
+from compact import compact_frame
+from d3_charts import line_chart_html, renderer_picker
+from datasets import category_leaderboard, quantile_sketches, window_buckets
+from fact_frame import get_fact_frames
+from quantiles import PERIODS
+from sales_buckets import GROUP_COLS, WINDOW_MODE, window_picker
 import streamlit.components.v1 as components
 
 try:
@@ -18,46 +25,28 @@ st.title("🗃️ Realtime Family / Section / Dept / Class Visuals")
 REFRESH  = st.sidebar.slider("Realtime refresh (s)", 2, 30, 5)
 NUM_SALE = st.sidebar.slider("Analyse last # sales", 5, 200, 50)
 TOP_N    = st.sidebar.slider("Leaderboard: top N groups", 5, 30, 10)
+MODE, WINDOW = window_picker()
+RENDERER = renderer_picker()
+SCOPE    = WINDOW.lower() if MODE == WINDOW_MODE else f"last {NUM_SALE} sales"
 
-GROUP_COLS = [
-    ("familycat",     "Family"),
-    ("sectioncat",    "Section"),
-    ("departmentcat", "Department"),
-    ("classcat",      "Class"),
-]
-
-tab_lb, tab_ts = st.tabs(["Realtime Leaderboard", "Realtime Time‑series"])
+tab_lb, tab_ts, tab_q = st.tabs(["Realtime Leaderboard", "Realtime Time‑series",
+                                 "Line‑value Percentiles"])
 db = DatabaseManager()
 
 # ------------- shared helper (cached) -------------
-@st.cache_data(ttl=2)
-def fetch_blocks(n_sales: int):
-    sales = db.fetch_data(
-        "SELECT saleid, saletime FROM sales ORDER BY saleid DESC LIMIT %s",
-        (n_sales,),
-    )
+@single_flight(ttl=2)
+def fetch_blocks(db, n_sales: int):
+    sales = db.fetch_prepared("recent_sales", n_sales)
     if sales.empty:
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+        return pd.DataFrame(), pd.DataFrame()
+    sales = sales[["saleid", "saletime"]]
 
-    saleids = tuple(int(x) for x in sales.saleid.tolist())
-    placeholders = ",".join(["%s"] * len(saleids))
-    salesitems = db.fetch_data(
-        f"SELECT saleid,itemid,quantity,totalprice "
-        f"FROM salesitems WHERE saleid IN ({placeholders})",
-        saleids,
-    )
+    salesitems = db.fetch_prepared("salesitems_by_sale", sales.saleid.tolist())
     if salesitems.empty:
-        return sales, salesitems, pd.DataFrame()
-
-    itemids = tuple(int(x) for x in salesitems.itemid.unique())
-    item_place = ",".join(["%s"] * len(itemids))
-    items = db.fetch_data(
-        f"""SELECT itemid,familycat,sectioncat,
-                   departmentcat,classcat
-              FROM item WHERE itemid IN ({item_place})""",
-        itemids,
-    )
-    return sales, salesitems, items
+        return sales, salesitems
+    salesitems = salesitems[["saleid", "itemid", "quantity", "totalprice"]]
+    return (compact_frame(sales, "family:sales"),
+            compact_frame(salesitems, "family:salesitems"))
 
 # ────────────────── Leaderboard tab ──────────────────
 with tab_lb:
@@ -67,17 +56,20 @@ with tab_lb:
     if st_autorefresh:
         st_autorefresh(interval=REFRESH * 1000, key="lb_refresh")
 
-    sales, salesitems, items = fetch_blocks(NUM_SALE)
-    if sales.empty or salesitems.empty or items.empty:
+    if MODE == WINDOW_MODE:
+        top_groups = (category_leaderboard(sel_col, WINDOW)["totalprice"]
+                        .sort_values(ascending=False).head(TOP_N).reset_index())
+    else:
+        facts = get_fact_frames().get(NUM_SALE, fetch_blocks)
+        if facts.empty:
+            top_groups = pd.DataFrame()
+        else:
+            top_groups = (facts.groupby(sel_col, observed=True)["totalprice"].sum()
+                            .sort_values(ascending=False).head(TOP_N).reset_index())
+
+    if top_groups.empty:
         st.info("No recent sales data.")
     else:
-        df = (salesitems.merge(items, on="itemid", how="left")
-                        .merge(sales[["saleid","saletime"]], on="saleid", how="left"))
-        df[sel_col] = df[sel_col].fillna("Unknown").replace("", "Unknown")
-
-        top_groups = (df.groupby(sel_col)["totalprice"].sum()
-                        .sort_values(ascending=False).head(TOP_N).reset_index())
-
         rt_json = json.dumps([{"group": str(r[sel_col]),
                                "total_sales": float(r.totalprice)}
                                for _, r in top_groups.iterrows()])
@@ -118,7 +110,7 @@ svg.selectAll("text.val").data(data).join("text")
     .attr("fill","#1e293b").attr("font-size","1.1rem");
 </script>
 """
-        st.write(f"### Top {TOP_N} {sel_label}s — last {NUM_SALE} sales")
+        st.write(f"### Top {TOP_N} {sel_label}s — {SCOPE}")
         components.html(d3_rt, height=450)
 
 # ────────────────── Time‑series tab ──────────────────
@@ -130,80 +122,44 @@ with tab_ts:
     if st_autorefresh:
         st_autorefresh(interval=REFRESH * 1000, key="ts_refresh")
 
-    sales, salesitems, items = fetch_blocks(NUM_SALE)
-    if sales.empty or salesitems.empty or items.empty:
+    if MODE == WINDOW_MODE:
+        ts_agg = window_buckets().window_series(WINDOW, by=ts_col)
+    else:
+        facts = get_fact_frames().get(NUM_SALE, fetch_blocks)
+        if facts.empty:
+            ts_agg = pd.DataFrame()
+        else:
+            ts_agg = (facts.groupby([ts_col, "t_min"], observed=True)["totalprice"]
+                        .sum().reset_index())
+
+    if ts_agg.empty:
         st.info("No recent sales data.")
     else:
-        df = (salesitems.merge(items,on="itemid",how="left")
-                        .merge(sales[["saleid","saletime"]],on="saleid",how="left"))
-        df[ts_col] = df[ts_col].fillna("Unknown").replace("", "Unknown")
-        df["saletime"] = pd.to_datetime(df["saletime"])
-        df["t_min"]    = df["saletime"].dt.floor("T")
-
-        ts_agg = (df.groupby([ts_col,"t_min"])["totalprice"]
-                    .sum().reset_index())
-
-        ts_data = [{"group": str(r[ts_col]),
-                    "date":  r["t_min"].strftime("%Y-%m-%dT%H:%M:%S"),
-                    "value": float(r["totalprice"])}
-                   for _, r in ts_agg.iterrows()]
-        ts_json = json.dumps(ts_data)
-
-        d3_ts = f"""
-<script src="https://d3js.org/d3.v7.min.js"></script>
-<div id="ts_chart"></div>
-<script>
-const data={ts_json};
-data.forEach(d=>d.date=new Date(d.date));
-const dataByCat=Array.from(d3.group(data,d=>d.group),
-                           ([key,values])=>({{key:key,values:values}}));
-
-const width=900,height=500,margin={{top:40,right:40,bottom:40,left:80}};
-const x=d3.scaleUtc(d3.extent(data,d=>d.date),
-                    [margin.left,width-margin.right]);
-const y=d3.scaleLinear([0,d3.max(data,d=>d.value)*1.1],
-                       [height-margin.bottom,margin.top]);
-const color=d3.scaleOrdinal(d3.schemeTableau10);
-const line=d3.line().x(d=>x(d.date)).y(d=>y(d.value));
-
-const svg=d3.select("#ts_chart").append("svg")
-    .attr("width",width).attr("height",height)
-    .attr("viewBox",[0,0,width,height])
-    .attr("style","max-width:100%;height:auto;background:#fff;border-radius:14px;");
-
-// axes
-svg.append("g")
-    .attr("transform",`translate(0,${{height-margin.bottom}})`)
-    .call(d3.axisBottom(x).ticks(width/80).tickSizeOuter(0));
-
-svg.append("g")
-    .attr("transform",`translate(${{margin.left}},0)`)
-    .call(d3.axisLeft(y).ticks(height/50))
-    .call(g=>g.select(".domain").remove())
-    .call(g=>g.selectAll(".tick line").clone()
-        .attr("x2",width-margin.left-margin.right)
-        .attr("stroke-opacity",0.1))
-    .call(g=>g.append("text")
-        .attr("x",-margin.left+5).attr("y",10)
-        .attr("fill","currentColor")
-        .attr("text-anchor","start").text("Sales"));
-
-// lines + labels
-const g=svg.append("g").attr("fill","none").attr("stroke-width",2);
+        d3_ts = line_chart_html(ts_agg, x="t_min", y="totalprice", group=ts_col,
+                                renderer=RENDERER, chart_id="ts_chart", width=900,
+                                height=500, margin=(40, 40, 40, 80), y_label="Sales",
+                                scheme="schemeTableau10", x_tick_px=80, y_tick_px=50,
+                                y_headroom=1.1, label_size="0.9rem", label_dx=5, radius=14)
+        st.write(f"### Realtime time‑series ({ts_label}s) — {SCOPE}")
+        components.html(d3_ts, height=560)
+
+# ────────────────── Percentiles tab ──────────────────
+with tab_q:
+    q_col, q_label = st.selectbox(
+        "Percentile category:", GROUP_COLS,
+        format_func=lambda x: x[1], key="q_sel"
+    )
+    q_period = st.selectbox("Period:", list(PERIODS), index=2, key="q_period")
 
-dataByCat.forEach((series,i)=>{{
-    g.append("path").datum(series.values)
-      .attr("d",line).attr("stroke",color(i));
-    const last=series.values.at(-1);
-    if(last){{
-        g.append("text").text(series.key).attr("font-size","0.9rem")
-          .attr("x",x(last.date)+5).attr("y",y(last.value))
-          .attr("dy","0.32em").attr("fill",color(i))
-          .attr("paint-order","stroke")
-          .attr("stroke","#fff").attr("stroke-width",4);
-    }}
-}});
-</script>
-"""
-        st.write(f"### Realtime time‑series ({ts_label}s) — last {NUM_SALE} sales")
-        components.html(d3_ts, height=540)
+    sketches = quantile_sketches()
+    if sketches is None:
+        st.info("Sale-amount sketches are still loading.")
+    else:
+        pcts = sketches.quantiles(q_col, sketches.period_start(q_period), sketches.now)
+        if pcts.empty:
+            st.info("No sales in this period.")
+        else:
+            st.write(f"### Sales-line value percentiles by {q_label}s — {q_period.lower()}")
+            st.caption("From hourly quantile sketches; values are within ±1 %.")
+            st.dataframe(pcts.head(TOP_N).rename(columns={q_col: q_label, "count": "lines"}),
+                         hide_index=True, use_container_width=True)
@@ -1,70 +1,130 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
+from caching import budget_cache
 from db_handler import DatabaseManager
-import matplotlib.pyplot as plt
-import seaborn as sns
+from datasets import heatmap_pyramid
+from heatmap_pyramid import LEVELS, NEXT_LEVEL, HeatmapPyramid, auto_level, row_bounds
 
 st.set_page_config(page_title="Sales Calendar Heatmap", page_icon="📆")
 st.title("📆 Sales Calendar Heatmap (Year/Month/Hour)")
 
-NUM_DAYS = st.sidebar.slider("Days to show", 7, 90, 30)
+SPANS = {
+    "Last 7 days":   7,
+    "Last 30 days":  30,
+    "Last 90 days":  90,
+    "Last year":     365,
+    "Last 3 years":  3 * 365,
+    "All history":   None,
+}
+SPAN = st.sidebar.selectbox("Span", list(SPANS), index=1)
+RES  = st.sidebar.selectbox("Resolution", ["auto", *LEVELS],
+                            format_func=lambda k: LEVELS.get(k, "Auto"))
 db = DatabaseManager()
 
-@st.cache_data(ttl=60)
-def fetch_sales_days(num_days):
-    sales = db.fetch_data(
-        "SELECT saleid, saletime, totalamount FROM sales WHERE saletime >= NOW() - INTERVAL '%s days' ORDER BY saletime ASC",
+@budget_cache(ttl=60)
+def fetch_hourly(num_days):
+    return db.fetch_data(
+        "SELECT date_trunc('hour', saletime) AS hour, SUM(totalamount) AS total FROM sales WHERE saletime >= NOW() - INTERVAL '%s days' GROUP BY 1",
         (num_days,)
     )
-    return sales
 
-sales = fetch_sales_days(NUM_DAYS)
-if sales.empty:
+pyramid = heatmap_pyramid()
+if pyramid is None:
+    # aggregates still loading → one-off pyramid over (at most) 90 days
+    pyramid = HeatmapPyramid()
+    pyramid.add_hourly(fetch_hourly(min(SPANS[SPAN] or 90, 90)))
+if pyramid.first is None:
     st.info("No sales found.")
     st.stop()
 
-sales["saletime"] = pd.to_datetime(sales["saletime"])
-sales["Day"] = sales["saletime"].dt.date
-sales["Month"] = sales["saletime"].dt.strftime("%b")
-sales["Hour"] = sales["saletime"].dt.hour
+end   = pyramid.now.floor("h") + pd.Timedelta(hours=1)
+start = pyramid.first.normalize()
+if SPANS[SPAN] is not None:
+    start = max(start, end.normalize() - pd.Timedelta(days=SPANS[SPAN] - 1))
 
-all_days = pd.date_range(sales["saletime"].min().date(), sales["saletime"].max().date(), freq="D")
-all_hours = np.arange(24)
-grid = pd.MultiIndex.from_product([all_days, all_hours], names=["Day", "Hour"])
-sales_pivot = (
-    sales.groupby(["Day", "Hour"])["totalamount"].sum()
-    .reindex(grid, fill_value=0)
-    .unstack()
-)
-sales_pivot = sales_pivot.astype(float).fillna(0.0)
-sales_pivot.index = [f"{d.strftime('%b')}-{d.day:02d}" for d in sales_pivot.index]
+def row_label(level, row):
+    if level == "year_month":
+        return str(row)
+    if level == "month_day":
+        return row.strftime("%Y-%b")
+    return row.strftime("%b-%d" if start.year == end.year else "%Y-%b-%d")
 
-# Bigger/clearer bar height: min 0.5 inch per day, up to 1 inch per row
-per_day_height = 0.65  # try 0.65-1 for chunkier rows
-fig_height = max(4, per_day_height * len(sales_pivot))
-fig, ax = plt.subplots(figsize=(18, fig_height))
+# ------------- drill in: year → month → day -------------
+level  = auto_level(start, end) if RES == "auto" else RES
+crumbs = [SPAN]
+while level in NEXT_LEVEL:
+    labels = {row_label(level, r): r for r in pyramid.pivot(level, start, end).index}
+    pick = st.sidebar.selectbox(f"Drill into ({LEVELS[level]})", ["—", *labels],
+                                key=f"drill_{level}")
+    if pick == "—":
+        break
+    start, end = row_bounds(level, labels[pick])
+    level = NEXT_LEVEL[level]
+    crumbs.append(pick)
 
-sns.heatmap(
-    sales_pivot,
-    ax=ax,
-    cmap="RdBu_r",
-    linewidths=0.3,
-    linecolor="#ddd",
-    cbar_kws={"label": "Total Sales"},
-    xticklabels=[f"{h}:00" for h in sales_pivot.columns],
-    yticklabels=sales_pivot.index if len(sales_pivot) < 60 else 10
-)
-plt.xlabel("Hour of Day")
-plt.ylabel("Date (Month-Day)")
-plt.title(f"Sales by Day and Hour (last {NUM_DAYS} days)")
-plt.tight_layout()
+AXES = {
+    "year_month": ("Month", "Year",
+                   lambda c: pd.Timestamp(2000, c, 1).strftime("%b")),
+    "month_day":  ("Day of Month", "Month", str),
+    "day_hour":   ("Hour of Day", "Date (Month-Day)", lambda c: f"{c}:00"),
+}
 
-st.pyplot(fig)
-st.caption(
-    f"Each cell shows the total sales for that day and hour. Blue = low, Red = high. "
-    f"(Row height automatically adjusts for the number of days.)"
-)
+def draw(pivot, xlabel, ylabel, xtick, title, cbar_label):
+    # imported here so the page (and the server start) does not pay for them
+    # until a heatmap is actually drawn; warmup.py preloads them
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-with st.expander("Show sales data as table"):
-    st.dataframe(sales_pivot)
+    # Bigger/clearer bar height: min 0.5 inch per row, up to 1 inch per row
+    per_row_height = 0.65  # try 0.65-1 for chunkier rows
+    fig, ax = plt.subplots(figsize=(18, max(4, per_row_height * len(pivot))))
+    sns.heatmap(
+        pivot,
+        ax=ax,
+        cmap="RdBu_r",
+        linewidths=0.3,
+        linecolor="#ddd",
+        cbar_kws={"label": cbar_label},
+        xticklabels=[xtick(c) for c in pivot.columns],
+        yticklabels=pivot.index if len(pivot) < 60 else 10
+    )
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.tight_layout()
+    st.pyplot(fig)
+    plt.close(fig)
+
+tab_grid, tab_week = st.tabs(["Calendar Heatmap", "Weekday × Hour Averages"])
+
+with tab_grid:
+    sales_pivot = pyramid.pivot(level, start, end)
+    if level == "day_hour":
+        # keep the span from the first to the last day with sales
+        active = sales_pivot.sum(axis=1) > 0
+        sales_pivot = sales_pivot[active.cummax() & active[::-1].cummax()[::-1]]
+    if sales_pivot.empty or not sales_pivot.fillna(0).to_numpy().any():
+        st.info("No sales found.")
+    else:
+        sales_pivot.index = [row_label(level, r) for r in sales_pivot.index]
+        xlabel, ylabel, xtick = AXES[level]
+        draw(sales_pivot, xlabel, ylabel, xtick,
+             f"Sales by {LEVELS[level]} ({' › '.join(crumbs)})", "Total Sales")
+        st.caption(
+            f"Each cell shows the total sales for that {ylabel.split()[0].lower()} and "
+            f"{xlabel.split()[0].lower()}. Blue = low, Red = high. Resolution follows "
+            f"the span; use the sidebar to drill in."
+        )
+
+        with st.expander("Show sales data as table"):
+            st.dataframe(sales_pivot)
+
+with tab_week:
+    week = pyramid.weekday_hour(start, end)
+    if not week.fillna(0).to_numpy().any():
+        st.info("No sales found.")
+    else:
+        draw(week, "Hour of Day", "Weekday", lambda c: f"{c}:00",
+             f"Average sales per weekday and hour ({' › '.join(crumbs)})", "Average Sales")
+        with st.expander("Show averages as table"):
+            st.dataframe(week)
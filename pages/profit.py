@@ -1,7 +1,14 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import json
 from db_handler import DatabaseManager
+from caching import single_flight
+from compact import compact_frame
+from datasets import category_leaderboard, item_costs, window_buckets
+from fact_frame import get_fact_frames
+from item_cost import COSTING_METHODS
+from sales_buckets import GROUP_COLS, WINDOW_MODE, window_picker
 import streamlit.components.v1 as components
 
 try:
@@ -15,50 +22,26 @@ st.title("💰 Top N Categories by Net Profit")
 REFRESH  = st.sidebar.slider("Refresh interval (s)", 2, 30, 5)
 NUM_SALE = st.sidebar.slider("Analyse last # sales", 5, 200, 50)
 TOP_N    = st.sidebar.slider("Top N groups", 5, 30, 10)
-
-GROUP_COLS = [
-    ("familycat",     "Family"),
-    ("sectioncat",    "Section"),
-    ("departmentcat", "Department"),
-    ("classcat",      "Class"),
-]
+COSTING  = st.sidebar.selectbox("Costing", list(COSTING_METHODS),
+                                format_func=COSTING_METHODS.get)
+MODE, WINDOW = window_picker()
+SCOPE    = WINDOW.lower() if MODE == WINDOW_MODE else f"last {NUM_SALE} sales"
 
 tab1, tab2 = st.tabs(["Net Profit Leaderboard", "Gross Sales Leaderboard"])
 
 db = DatabaseManager()
 
-@st.cache_data(ttl=2)
-def fetch_blocks(n_sales: int):
-    sales = db.fetch_data(
-        "SELECT saleid, saletime FROM sales ORDER BY saleid DESC LIMIT %s",
-        (n_sales,),
-    )
+@single_flight(ttl=2)
+def fetch_blocks(db, n_sales: int):
+    sales = db.fetch_prepared("recent_sales", n_sales)
     if sales.empty:
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-    saleids = tuple(int(x) for x in sales.saleid.tolist())
-    placeholders = ",".join(["%s"] * len(saleids))
-    salesitems = db.fetch_data(
-        f"SELECT saleid,itemid,quantity,totalprice,unitprice "
-        f"FROM salesitems WHERE saleid IN ({placeholders})",
-        saleids,
-    )
+        return pd.DataFrame(), pd.DataFrame()
+    sales = sales[["saleid", "saletime"]]
+    salesitems = db.fetch_prepared("salesitems_by_sale", sales.saleid.tolist())
     if salesitems.empty:
-        return sales, salesitems, pd.DataFrame(), pd.DataFrame()
-    itemids = tuple(int(x) for x in salesitems.itemid.unique())
-    item_place = ",".join(["%s"] * len(itemids))
-    items = db.fetch_data(
-        f"""SELECT itemid,itemnameenglish,familycat,sectioncat,
-                   departmentcat,classcat,sellingprice
-            FROM item WHERE itemid IN ({item_place})""",
-        itemids,
-    )
-    inventory = db.fetch_data(
-        f"""SELECT itemid, cost_per_unit
-            FROM inventory
-            WHERE itemid IN ({item_place})""",
-        itemids,
-    )
-    return sales, salesitems, items, inventory
+        return sales, salesitems
+    return (compact_frame(sales, "profit:sales"),
+            compact_frame(salesitems, "profit:salesitems"))
 
 with tab1:
     group_col, group_label = st.selectbox(
@@ -68,22 +51,29 @@ with tab1:
     if st_autorefresh:
         st_autorefresh(interval=REFRESH * 1000, key="profit_leader_refresh")
 
-    sales, salesitems, items, inventory = fetch_blocks(NUM_SALE)
-    if sales.empty or salesitems.empty or items.empty or inventory.empty:
+    costs = item_costs()
+    if MODE == WINDOW_MODE:
+        buckets = window_buckets()
+        df = buckets.window_totals(WINDOW).reset_index()
+        if not df.empty and len(costs):
+            unit_cost = costs.lookup(df["itemid"], COSTING)
+            df["profit"] = df["revenue"] - np.nan_to_num(unit_cost) * df["quantity"]
+            df = buckets.with_group(df, group_col)
+        else:
+            df = pd.DataFrame()
+    else:
+        facts = get_fact_frames().get(NUM_SALE, fetch_blocks)
+        if facts.empty or not len(costs):
+            df = pd.DataFrame()
+        else:
+            df = facts[[group_col, f"profit_{COSTING}"]].rename(
+                columns={f"profit_{COSTING}": "profit"})
+
+    if df.empty:
         st.info("Not enough sales/inventory data.")
     else:
-        # Merge all
-        df = (
-            salesitems
-            .merge(items, on="itemid", how="left")
-            .merge(inventory.groupby("itemid")["cost_per_unit"].min().reset_index(), on="itemid", how="left")
-            .merge(sales[["saleid","saletime"]], on="saleid", how="left")
-        )
-        df[group_col] = df[group_col].fillna("Unknown").replace("", "Unknown")
-        df["profit"] = (df["unitprice"] - df["cost_per_unit"].fillna(0)) * df["quantity"]
-
         top_groups = (
-            df.groupby(group_col, dropna=False)["profit"]
+            df.groupby(group_col, dropna=False, observed=True)["profit"]
             .sum()
             .sort_values(ascending=False)
             .head(TOP_N)
@@ -132,7 +122,7 @@ svg.selectAll("text.val").data(data).join("text")
     .attr("fill","#1e293b").attr("font-size","1.1rem");
 </script>
 """
-        st.write(f"### Top {TOP_N} {group_label}s by **Net Profit** — last {NUM_SALE} sales")
+        st.write(f"### Top {TOP_N} {group_label}s by **Net Profit** — {SCOPE}")
         components.html(d3_profit, height=450)
 
 with tab2:
@@ -143,25 +133,29 @@ with tab2:
     if st_autorefresh:
         st_autorefresh(interval=REFRESH * 1000, key="gross_leader_refresh")
 
-    sales, salesitems, items, inventory = fetch_blocks(NUM_SALE)
-    if sales.empty or salesitems.empty or items.empty:
-        st.info("Not enough sales data.")
-    else:
-        df = (
-            salesitems
-            .merge(items, on="itemid", how="left")
-            .merge(sales[["saleid","saletime"]], on="saleid", how="left")
-        )
-        df[group_col] = df[group_col].fillna("Unknown").replace("", "Unknown")
-
+    if MODE == WINDOW_MODE:
         top_groups = (
-            df.groupby(group_col, dropna=False)["totalprice"]
-            .sum()
+            category_leaderboard(group_col, WINDOW)["totalprice"]
             .sort_values(ascending=False)
             .head(TOP_N)
             .reset_index()
         )
-
+    else:
+        facts = get_fact_frames().get(NUM_SALE, fetch_blocks)
+        if facts.empty:
+            top_groups = pd.DataFrame()
+        else:
+            top_groups = (
+                facts.groupby(group_col, dropna=False, observed=True)["totalprice"]
+                .sum()
+                .sort_values(ascending=False)
+                .head(TOP_N)
+                .reset_index()
+            )
+
+    if top_groups.empty:
+        st.info("Not enough sales data.")
+    else:
         rt_json = json.dumps([
             {"group": str(r[group_col]), "total_sales": float(r.totalprice)}
             for _, r in top_groups.iterrows()
@@ -203,5 +197,5 @@ svg.selectAll("text.val").data(data).join("text")
     .attr("fill","#1e293b").attr("font-size","1.1rem");
 </script>
 """
-        st.write(f"### Top {TOP_N} {group_label}s by **Gross Sales** — last {NUM_SALE} sales")
+        st.write(f"### Top {TOP_N} {group_label}s by **Gross Sales** — {SCOPE}")
         components.html(d3_rt, height=450)
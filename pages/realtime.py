@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
 import time
-import json
 from db_handler import DatabaseManager
+from caching import single_flight
+from compact import compact_frame
+from d3_charts import line_chart_html, renderer_picker
+from datasets import recent_blocks
 import streamlit.components.v1 as components
 
 try:
@@ -15,88 +18,31 @@ st.title("📈 Realtime Sales D3 Chart")
 
 REFRESH = st.sidebar.slider("Refresh interval (seconds)", 2, 30, 5)
 NUM_SALES = st.sidebar.slider("Number of Recent Sales to Show", 5, 50, 10)
+RENDERER = renderer_picker()
 
 if st_autorefresh:
     st_autorefresh(interval=REFRESH * 1000, key="datarefresh")
 
 db = DatabaseManager()
 
-@st.cache_data(ttl=2)
-def get_recent_sales(n=10):
-    return db.fetch_data(
-        f"SELECT saleid, saletime, totalamount FROM sales ORDER BY saleid DESC LIMIT {n}"
-    )
+@single_flight(ttl=2)
+def get_recent_sales(db, n=10):
+    sales = db.fetch_prepared("recent_sales", n)
+    if sales.empty:
+        return sales
+    return compact_frame(sales[["saleid", "saletime", "totalamount"]], "realtime:sales")
 
 st.write("Last refreshed at", time.strftime("%H:%M:%S"))
 
-sales_df = get_recent_sales(NUM_SALES)
+blocks = recent_blocks(NUM_SALES)
+sales_df = blocks[0] if blocks is not None else get_recent_sales(NUM_SALES)
 if sales_df.empty:
     st.info("No sales yet.")
     st.stop()
 
 sales_df = sales_df.sort_values("saleid")
 sales_df['saletime'] = pd.to_datetime(sales_df['saletime'])
-chart_data = [
-    {
-        "date": d.strftime("%Y-%m-%dT%H:%M:%S"),
-        "totalamount": float(v)
-    }
-    for d, v in zip(sales_df['saletime'], sales_df['totalamount'])
-]
-chart_json = json.dumps(chart_data)
 
-d3_code = """
-<script src="https://d3js.org/d3.v7.min.js"></script>
-<div id="chart"></div>
-<script>
-const sales = """ + chart_json + """;
-const width = 928, height = 400;
-const marginTop = 20, marginRight = 30, marginBottom = 30, marginLeft = 60;
-
-sales.forEach(d => d.date = new Date(d.date));
-
-const x = d3.scaleUtc(
-    d3.extent(sales, d => d.date),
-    [marginLeft, width - marginRight]
-);
-const y = d3.scaleLinear(
-    [0, d3.max(sales, d => d.totalamount)],
-    [height - marginBottom, marginTop]
-);
-const line = d3.line()
-    .x(d => x(d.date))
-    .y(d => y(d.totalamount));
-
-const svg = d3.select("#chart").append("svg")
-    .attr("width", width)
-    .attr("height", height)
-    .attr("viewBox", [0, 0, width, height])
-    .attr("style", "max-width: 100%; height: auto; height: intrinsic; background: #fff; border-radius: 12px;");
-
-svg.append("g")
-    .attr("transform", `translate(0,${height - marginBottom})`)
-    .call(d3.axisBottom(x).ticks(width / 100).tickSizeOuter(0));
-
-svg.append("g")
-    .attr("transform", `translate(${marginLeft},0)`)
-    .call(d3.axisLeft(y).ticks(height / 40))
-    .call(g => g.select(".domain").remove())
-    .call(g => g.selectAll(".tick line").clone()
-        .attr("x2", width - marginLeft - marginRight)
-        .attr("stroke-opacity", 0.1))
-    .call(g => g.append("text")
-        .attr("x", -marginLeft + 5)
-        .attr("y", 10)
-        .attr("fill", "currentColor")
-        .attr("text-anchor", "start")
-        .text("↑ Sale Amount"));
-
-svg.append("path")
-    .attr("fill", "none")
-    .attr("stroke", "steelblue")
-    .attr("stroke-width", 2)
-    .attr("d", line(sales));
-</script>
-"""
-
-components.html(d3_code, height=420)
+d3_code = line_chart_html(sales_df, x="saletime", y="totalamount", renderer=RENDERER,
+                          y_label="↑ Sale Amount")
+components.html(d3_code, height=440)
@@ -2,6 +2,12 @@ import streamlit as st
 import pandas as pd
 import json
 from db_handler import DatabaseManager
+from item_dim import enrich_items
+from caching import budget_cache, single_flight
+from compact import compact_frame
+from datasets import heavy_hitters, recent_blocks, top_items
+from heavy_hitters import LONG_WINDOWS, MEASURES, exact_recount
+from sales_buckets import SALES_MODE, WINDOW_MODE, window_picker
 import streamlit.components.v1 as components
 
 try:
@@ -14,62 +20,122 @@ st.title("🏆 Top 10 Fastest Moving Items")
 
 REFRESH  = st.sidebar.slider("Refresh interval (seconds)", 2, 30, 5)
 NUM_SALE = st.sidebar.slider("Number of Recent Sales", 10, 300, 50, step=10)
+LONG_MODE = "Long horizon"
+MODE, WINDOW = window_picker(extra_modes=(LONG_MODE,))
+RANK_BY  = "quantity"
+if MODE == LONG_MODE:
+    WINDOW  = st.sidebar.selectbox("Horizon", list(LONG_WINDOWS), index=2)
+    RANK_BY = st.sidebar.radio("Rank by", list(MEASURES), format_func=str.title)
+    RECOUNT = st.sidebar.checkbox("Exact recount of top candidates", value=True)
+SCOPE    = WINDOW if MODE != SALES_MODE else f"Last {NUM_SALE} Sales"
+VALUE_COL = "total_revenue" if RANK_BY == "revenue" else "quantity_sold"
 
 if st_autorefresh:
     st_autorefresh(interval=REFRESH * 1000, key="topitems_refresh")
 
 db = DatabaseManager()
 
-@st.cache_data(ttl=2)
-def fetch_blocks(n_sales: int):
-    sales = db.fetch_data(
-        "SELECT saleid, saletime FROM sales ORDER BY saleid DESC LIMIT %s",
-        (n_sales,),
-    )
+@single_flight(ttl=2)
+def fetch_blocks(db, n_sales: int):
+    sales = db.fetch_prepared("recent_sales", n_sales)
     if sales.empty:
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+        return pd.DataFrame(), pd.DataFrame()
+    sales = sales[["saleid", "saletime"]]
 
-    saleids = tuple(int(x) for x in sales.saleid.tolist())
-    placeholders = ",".join(["%s"] * len(saleids))
-    salesitems = db.fetch_data(
-        f"SELECT saleid,itemid,quantity,totalprice FROM salesitems WHERE saleid IN ({placeholders})",
-        saleids,
-    )
+    salesitems = db.fetch_prepared("salesitems_by_sale", sales.saleid.tolist())
     if salesitems.empty:
-        return sales, salesitems, pd.DataFrame()
+        return sales, salesitems
+    salesitems = salesitems[["saleid", "itemid", "quantity", "totalprice"]]
+    return (compact_frame(sales, "topitems:sales"),
+            compact_frame(salesitems, "topitems:salesitems"))
+
+@budget_cache(ttl=30)
+def fetch_exact(itemids: tuple, start, end):
+    return exact_recount(db, itemids, start, end)
+
+if MODE == LONG_MODE:
+    hh = heavy_hitters()
+    if hh is None:
+        st.info("Top-item summaries are still loading.")
+        st.stop()
+    start, end = hh.window_start(WINDOW), hh.now + pd.Timedelta(minutes=1)
+    cand = hh.top(RANK_BY, start, end, k=10)
+    if cand.empty:
+        st.info("No sales found.")
+        st.stop()
+
+    if RECOUNT:
+        exact = fetch_exact(tuple(int(i) for i in cand["itemid"]), start, end)
+        agg = exact.assign(avg_price=exact["totalprice"] / exact["lines"],
+                           quantity=exact["quantity"].astype(float),
+                           totalprice=exact["totalprice"].astype(float))
+    else:
+        agg = cand.assign(**{MEASURES[RANK_BY]: cand["upper"]})
+        agg = agg.reindex(columns=["itemid", "quantity", "totalprice", "avg_price"])
+    agg = (
+        enrich_items(db, agg.astype({"itemid": "int64"}), ["itemnameenglish"])
+        .rename(columns={"quantity": "quantity_sold", "totalprice": "total_revenue"})
+        [["itemid", "itemnameenglish", "quantity_sold", "total_revenue", "avg_price"]]
+        .sort_values(VALUE_COL, ascending=False)
+        .reset_index(drop=True)
+    )
 
-    itemids = tuple(int(x) for x in salesitems.itemid.unique())
-    item_place = ",".join(["%s"] * len(itemids))
-    items = db.fetch_data(
-        f"SELECT itemid,itemnameenglish FROM item WHERE itemid IN ({item_place})",
-        itemids,
+    sure = int(cand["guaranteed"].sum())
+    rel_err = (cand["upper"] - cand["lower"]) / cand["upper"].where(cand["upper"] > 0)
+    worst = float(rel_err.fillna(0).max())
+    st.caption(
+        f"Candidates from hourly Space‑Saving summaries: {sure} of {len(cand)} are "
+        f"guaranteed top‑10, estimates are within {worst:.1%}"
+        + (" · values below are exact recounts." if RECOUNT else " · values below are upper bounds.")
+    )
+    with st.expander("Show estimate error bounds"):
+        st.dataframe(
+            enrich_items(db, cand, ["itemnameenglish"])
+            [["itemnameenglish", "lower", "upper", "guaranteed"]]
+            .rename(columns={"itemnameenglish": "Item Name", "lower": "Lower bound",
+                             "upper": "Upper bound", "guaranteed": "Surely top 10"}),
+            use_container_width=True, hide_index=True,
+        )
+elif MODE == WINDOW_MODE:
+    totals = top_items(WINDOW)
+    if totals.empty:
+        st.info("No sales found.")
+        st.stop()
+
+    agg = (
+        totals.assign(avg_price=totals["totalprice"] / totals["lines"])
+              .rename(columns={"quantity": "quantity_sold",
+                               "totalprice": "total_revenue"})
+              [["itemnameenglish", "quantity_sold", "total_revenue", "avg_price"]]
+              .sort_values("quantity_sold", ascending=False)
+              .head(10)
+              .reset_index()
+    )
+else:
+    blocks = recent_blocks(NUM_SALE)
+    sales, salesitems = (blocks if blocks is not None
+                         else fetch_blocks(NUM_SALE))
+    if sales.empty or salesitems.empty:
+        st.info("No sales found.")
+        st.stop()
+
+    df = enrich_items(db, salesitems, ["itemnameenglish"])
+
+    agg = (
+        df.groupby(["itemid", "itemnameenglish"], dropna=False, observed=True)
+          .agg(quantity_sold=('quantity', 'sum'),
+               total_revenue=('totalprice', 'sum'),
+               avg_price=('totalprice', 'mean'))
+          .sort_values("quantity_sold", ascending=False)
+          .head(10)
+          .reset_index()
     )
-    return sales, salesitems, items
-
-sales, salesitems, items = fetch_blocks(NUM_SALE)
-if sales.empty or salesitems.empty or items.empty:
-    st.info("No sales found.")
-    st.stop()
-
-df = (
-    salesitems.merge(items, on="itemid", how="left")
-)
-
-agg = (
-    df.groupby(["itemid", "itemnameenglish"], dropna=False)
-      .agg(quantity_sold=('quantity', 'sum'),
-           total_revenue=('totalprice', 'sum'),
-           avg_price=('totalprice', 'mean'))
-      .sort_values("quantity_sold", ascending=False)
-      .head(10)
-      .reset_index()
-)
 
 # ------------- D3 Horizontal Bar Chart -------------
 chart_data = [
     {
         "item": row["itemnameenglish"] if pd.notna(row["itemnameenglish"]) else "Unknown",
-        "quantity": int(row["quantity_sold"])
+        "quantity": int(row[VALUE_COL])
     }
     for _, row in agg.iterrows()
 ]
@@ -117,7 +183,7 @@ svg.selectAll("text.val").data(data).join("text")
     .attr("font-size","1.12rem");
 </script>
 """
-st.write(f"### Top 10 Items by Quantity Sold (Last {NUM_SALE} Sales)")
+st.write(f"### Top 10 Items by {'Revenue' if RANK_BY == 'revenue' else 'Quantity Sold'} ({SCOPE})")
 components.html(d3_code, height=chart_height + 50)
 
 # ------------- Summary Table -------------
@@ -128,6 +194,6 @@ with st.expander("Show details as table"):
         "total_revenue": "Total Revenue",
         "avg_price": "Average Sale Price"
     })
-    agg_disp["Total Revenue"] = agg_disp["Total Revenue"].map('{:,.2f}'.format)
-    agg_disp["Average Sale Price"] = agg_disp["Average Sale Price"].map('{:,.2f}'.format)
+    for col in ["Total Revenue", "Average Sale Price"]:
+        agg_disp[col] = agg_disp[col].map(lambda v: f"{v:,.2f}" if pd.notna(v) else "–")
     st.dataframe(agg_disp, use_container_width=True)
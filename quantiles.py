@@ -0,0 +1,255 @@
+import math
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from item_dim import get_item_dim
+from sale_watermark import SaleWatermark, sale_batch
+
+try:
+    import pyarrow  # noqa: F401  (needed by DataFrame.to_feather)
+except ImportError:
+    pyarrow = None
+
+# ───────────────────────────────────────────────────────────────
+# 1. Log-bucketed quantile sketch (DDSketch)
+# ───────────────────────────────────────────────────────────────
+# A value v > 0 falls in bucket ceil(log_gamma v); every value in a bucket
+# is within ALPHA of the bucket's representative, so quantiles carry a
+# relative error ≤ ALPHA. Sketches merge by adding counts per bucket.
+ALPHA      = 0.01
+GAMMA      = (1 + ALPHA) / (1 - ALPHA)
+LOG_GAMMA  = math.log(GAMMA)
+ZERO_KEY   = -32768         # zero / negative amounts (refunds, voids)
+
+QUANTILES      = [0.5, 0.9, 0.99]
+HORIZON_DAYS   = 90
+PERSIST_EVERY  = 300.0      # seconds between snapshots on disk
+SKETCH_PATH    = os.environ.get(
+    "VIZ_SKETCH_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "viz", "quantile_sketches"),
+)
+
+PERIODS = {
+    "Last 1 h":  pd.Timedelta(hours=1),
+    "Today":     None,                       # since local midnight
+    "Last 7 d":  pd.Timedelta(days=7),
+    "Last 30 d": pd.Timedelta(days=30),
+    "Last 90 d": pd.Timedelta(days=90),
+}
+
+
+def bucket_keys(values) -> np.ndarray:
+    v = np.asarray(values, dtype="float64")
+    keys = np.full(len(v), ZERO_KEY, dtype=np.int64)
+    pos = v > 0
+    keys[pos] = np.ceil(np.log(v[pos]) / LOG_GAMMA)
+    return keys
+
+
+def bucket_values(keys) -> np.ndarray:
+    """Representative value of each bucket (0 for the zero bucket)."""
+    k = np.asarray(keys, dtype="float64")
+    return np.where(k == ZERO_KEY, 0.0, 2 * GAMMA ** k / (GAMMA + 1))
+
+
+def sketch_quantiles(keys, counts, qs=QUANTILES) -> np.ndarray:
+    """Quantiles ``qs`` of one sketch given as parallel key / count arrays."""
+    keys, counts = np.asarray(keys), np.asarray(counts, dtype="float64")
+    if not len(keys) or counts.sum() <= 0:
+        return np.full(len(qs), np.nan)
+    order = np.argsort(keys, kind="stable")
+    cum = np.cumsum(counts[order])
+    ranks = np.asarray(qs) * (cum[-1] - 1)
+    return bucket_values(keys[order][np.searchsorted(cum, ranks, side="right")])
+
+
+# key computed in SQL so only (hour, group, bucket, count) rows travel
+_KEY_SQL = f"CASE WHEN {{col}} > 0 THEN CEIL(LN({{col}}) / {LOG_GAMMA!r})::int ELSE {ZERO_KEY} END"
+
+_CASHIER_SQL = f"""
+    SELECT date_trunc('hour', saletime) AS hour, cashier,
+           {_KEY_SQL.format(col="totalamount")} AS key, COUNT(*) AS count
+      FROM sales
+     WHERE {sale_batch()}
+       AND saletime >= LOCALTIMESTAMP - INTERVAL '%s days'
+     GROUP BY 1, 2, 3
+"""
+
+_ITEM_SQL = f"""
+    SELECT date_trunc('hour', s.saletime) AS hour, si.itemid,
+           {_KEY_SQL.format(col="si.totalprice")} AS key, COUNT(*) AS count
+      FROM sales s
+      JOIN salesitems si ON si.saleid = s.saleid
+     WHERE {sale_batch("s.saleid")}
+       AND s.saletime >= LOCALTIMESTAMP - INTERVAL '%s days'
+     GROUP BY 1, 2, 3
+"""
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Hourly sketches per cashier (basket value) and per item (line value)
+# ───────────────────────────────────────────────────────────────
+def _empty(group: str, dtype: str) -> pd.DataFrame:
+    return pd.DataFrame({"hour":  pd.Series(dtype="datetime64[ns]"),
+                         group:   pd.Series(dtype=dtype),
+                         "key":   pd.Series(dtype="int16"),
+                         "count": pd.Series(dtype="int64")})
+
+
+def _normalise(rows: pd.DataFrame, group: str) -> pd.DataFrame:
+    rows = rows.copy()
+    rows["hour"]  = pd.to_datetime(rows["hour"]).astype("datetime64[ns]")
+    rows["key"]   = rows["key"].astype("int16")
+    rows["count"] = rows["count"].astype("int64")
+    rows[group]   = (rows[group].fillna("Unknown").astype(str) if group == "cashier"
+                     else rows[group].astype("int64"))
+    return rows
+
+
+def _merge(sketch: pd.DataFrame, new: pd.DataFrame, group: str) -> pd.DataFrame:
+    if new.empty:
+        return sketch
+    cut  = sketch["hour"].searchsorted(new["hour"].min()) if len(sketch) else 0
+    tail = pd.concat([sketch.iloc[cut:], new], ignore_index=True)
+    tail = (tail.groupby(["hour", group, "key"], as_index=False)["count"].sum()
+                .sort_values("hour", kind="stable"))
+    return pd.concat([sketch.iloc[:cut], tail], ignore_index=True)
+
+
+class QuantileSketches:
+    """Hourly DDSketches of sale amounts, extended by saleid.
+
+    ``cashier`` holds basket values (``sales.totalamount``) per cashier,
+    ``items`` line values (``salesitems.totalprice``) per itemid, mapped to
+    any category level at query time. A period's distribution is the sum
+    of its hourly sketches, so cost depends on hours, not on sales.
+    """
+
+    def __init__(self, path: str | None = SKETCH_PATH):
+        self.path        = path
+        self.cashier     = _empty("cashier", "object")
+        self.items       = _empty("itemid", "int64")
+        self.watermark   = SaleWatermark()
+        self.now         = pd.Timestamp.now().floor("min")
+        self._saved      = time.monotonic()
+        self._lock       = threading.Lock()
+        self._restore()
+
+    @property
+    def last_saleid(self) -> int:
+        return self.watermark.last_saleid
+
+    # ────────── maintenance ──────────
+    def refresh(self, db) -> int:
+        with self._lock:
+            top = db.fetch_data("SELECT COALESCE(MAX(saleid), 0) AS m, "
+                                "LOCALTIMESTAMP AS now FROM sales")
+            self.now = pd.Timestamp(top["now"].iat[0]).floor("min")
+            batch = self.watermark.batch(db, int(top["m"].iat[0]))
+            if batch is not None:
+                for attr, sql, group in (("cashier", _CASHIER_SQL, "cashier"),
+                                         ("items", _ITEM_SQL, "itemid")):
+                    new = db.fetch_data(sql, (*batch, HORIZON_DAYS))
+                    if not new.empty:
+                        setattr(self, attr, _merge(getattr(self, attr),
+                                                   _normalise(new, group), group))
+            self.watermark.advance()
+            oldest = self.now.floor("h") - pd.Timedelta(days=HORIZON_DAYS)
+            for attr in ("cashier", "items"):
+                df = getattr(self, attr)
+                if len(df) and df["hour"].iat[0] < oldest:
+                    setattr(self, attr, df.iloc[df["hour"].searchsorted(oldest):]
+                                          .reset_index(drop=True))
+            if time.monotonic() - self._saved > PERSIST_EVERY:
+                self.persist()
+            return self.last_saleid
+
+    def install(self, cashier: pd.DataFrame, items: pd.DataFrame,
+                now: pd.Timestamp, last_saleid: int) -> None:
+        """Adopt sketches published by another process (see shared_hot)."""
+        with self._lock:
+            self.cashier, self.items = cashier, items
+            self.now, self.watermark = now, SaleWatermark(last_saleid)
+
+    # ────────── persistence ──────────
+    def persist(self) -> None:
+        """Snapshot the sketches so a restart only reads newer sales."""
+        self._saved = time.monotonic()
+        if pyarrow is None or not self.path:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        meta = pd.DataFrame({"last_saleid": [self.last_saleid], "now": [self.now]})
+        for name, df in (("cashier", self.cashier), ("items", self.items), ("meta", meta)):
+            tmp = os.path.join(self.path, f"{name}.feather.tmp")
+            df.reset_index(drop=True).to_feather(tmp)
+            os.replace(tmp, os.path.join(self.path, f"{name}.feather"))
+
+    def _restore(self) -> None:
+        if pyarrow is None or not self.path:
+            return
+        try:
+            meta    = pd.read_feather(os.path.join(self.path, "meta.feather"))
+            cashier = pd.read_feather(os.path.join(self.path, "cashier.feather"))
+            items   = pd.read_feather(os.path.join(self.path, "items.feather"))
+        except (OSError, ValueError):
+            return
+        self.cashier, self.items = cashier, items
+        self.watermark = SaleWatermark(int(meta["last_saleid"].iat[0]))
+        self.now = pd.Timestamp(meta["now"].iat[0])
+
+    # ────────── queries ──────────
+    def period_start(self, period: str) -> pd.Timestamp:
+        span = PERIODS[period]
+        return self.now.normalize() if span is None else self.now - span
+
+    @staticmethod
+    def _between(sketch: pd.DataFrame, start, end) -> pd.DataFrame:
+        # hourly resolution: an hour counts if it starts inside the period
+        lo, hi = sketch["hour"].searchsorted([pd.Timestamp(start).floor("h"),
+                                              pd.Timestamp(end)])
+        return sketch.iloc[lo:hi]
+
+    def _rows(self, by: str, start, end) -> pd.DataFrame:
+        if by == "cashier":
+            return self._between(self.cashier, start, end)
+        rows = self._between(self.items, start, end)
+        return rows.assign(**{by: pd.Series(get_item_dim().take(rows["itemid"], by),
+                                            index=rows.index)
+                                   .fillna("Unknown").replace("", "Unknown")})
+
+    def distribution(self, by: str, start, end, merge_keys: int = 1) -> pd.DataFrame:
+        """Merged sketch per ``by`` group: (group, key, value, count).
+
+        ``merge_keys`` > 1 coarsens the buckets for plotting (10 ≈ 20 % wide).
+        """
+        rows = self._rows(by, start, end)
+        if rows.empty:
+            return pd.DataFrame(columns=[by, "key", "value", "count"])
+        if merge_keys > 1:
+            keys = rows["key"].astype("int64")
+            rows = rows.assign(key=keys.where(keys == ZERO_KEY,
+                                              keys // merge_keys * merge_keys + merge_keys // 2))
+        dist = rows.groupby([by, "key"], observed=True, as_index=False)["count"].sum()
+        dist["value"] = bucket_values(dist["key"])
+        return dist
+
+    def quantiles(self, by: str, start, end, qs=QUANTILES) -> pd.DataFrame:
+        """count + one column per quantile (``p50`` …) for each ``by`` group."""
+        cols = [f"p{round(q * 100):g}" for q in qs]
+        dist = self.distribution(by, start, end)
+        rows = []
+        for group, d in dist.groupby(by, observed=True):
+            rows.append([group, int(d["count"].sum()),
+                         *sketch_quantiles(d["key"], d["count"], qs)])
+        return (pd.DataFrame(rows, columns=[by, "count", *cols])
+                  .sort_values("count", ascending=False, ignore_index=True))
+
+
+@st.cache_resource(show_spinner=False)
+def get_sketches() -> QuantileSketches:
+    return QuantileSketches()
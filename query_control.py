@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+from psycopg2 import errors as pg_errors
+from streamlit.runtime.scriptrunner import StopException, get_script_run_ctx
+
+try:    # private: the watch polls its state to see a pending rerun early
+    from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequests
+    CANCEL_ON_RERUN = hasattr(ScriptRequests(), "_state")
+except (ImportError, TypeError):       # layout changed: only timeouts apply
+    CANCEL_ON_RERUN = False
+
+# ───────────────────────────────────────────────────────────────
+# 1. statement_timeout budget per query class
+# ───────────────────────────────────────────────────────────────
+QUERY_TIMEOUTS_MS = {
+    "lookup":      int(os.environ.get("VIZ_TIMEOUT_LOOKUP_MS", "5000")),      # prepared point reads
+    "interactive": int(os.environ.get("VIZ_TIMEOUT_INTERACTIVE_MS", "30000")),  # page queries
+    "background":  int(os.environ.get("VIZ_TIMEOUT_BACKGROUND_MS", "120000")),  # precompute jobs
+    "write":       int(os.environ.get("VIZ_TIMEOUT_WRITE_MS", "15000")),
+    "export":      int(os.environ.get("VIZ_TIMEOUT_EXPORT_MS", "300000")),   # per COPY / FETCH
+}
+
+WATCH_POLL_S = 0.05
+
+
+class QuerySuperseded(StopException):
+    """The statement was cancelled because a newer rerun of the session is pending.
+
+    Subclassing StopException ends the stale run silently; Streamlit then
+    starts the pending rerun.
+    """
+
+
+class QueryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows: dict[str, dict] = {}
+
+    def add(self, query_class: str, **counts) -> None:
+        with self._lock:
+            row = self.rows.setdefault(query_class, {
+                "class": query_class, "timeout_ms": QUERY_TIMEOUTS_MS.get(query_class),
+                "queries": 0, "cancelled": 0, "timed_out": 0, "total_ms": 0.0,
+            })
+            for k, v in counts.items():
+                row[k] += v
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            df = pd.DataFrame([dict(r) for r in self.rows.values()])
+        if not df.empty:
+            df["mean_ms"] = df["total_ms"] / df["queries"].clip(lower=1)
+        return df
+
+
+stats = QueryStats()
+
+
+def set_timeout(conn, cur, query_class: str) -> None:
+    """SET statement_timeout for ``query_class`` unless the session already has it.
+
+    ``conn.timeout_ms`` mirrors the session value; PreparingConnection
+    forgets it on rollback, which also undoes an uncommitted SET.
+    """
+    ms = QUERY_TIMEOUTS_MS.get(query_class, QUERY_TIMEOUTS_MS["interactive"])
+    if getattr(conn, "timeout_ms", None) != ms:
+        cur.execute("SET statement_timeout = %s", (ms,))
+        conn.timeout_ms = ms
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Cancel a session's in-flight statement once a rerun supersedes it
+# ───────────────────────────────────────────────────────────────
+def _superseded(requests) -> bool:
+    # Streamlit flips this from CONTINUE to RERUN / STOP as soon as the
+    # browser sends new widget values, while the script thread still
+    # blocks inside cur.execute().
+    state = getattr(requests, "_state", None)
+    return state is not None and getattr(state, "name", "CONTINUE") != "CONTINUE"
+
+
+class _Flight:
+    __slots__ = ("conn", "requests", "lock", "active", "cancelled")
+
+    def __init__(self, conn, requests):
+        self.conn      = conn
+        self.requests  = requests
+        # per connection, so a cancel never overlaps the statement that follows
+        self.lock      = getattr(conn, "cancel_lock", None) or threading.Lock()
+        self.active    = True
+        self.cancelled = False
+
+
+class RerunWatch:
+    """One daemon thread polling the script-run requests of in-flight queries."""
+
+    def __init__(self, poll_s: float = WATCH_POLL_S):
+        self.poll_s   = poll_s
+        self._lock    = threading.Lock()
+        self._flights: set[_Flight] = set()
+        self._thread  = None
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="query-rerun-watch",
+                                            daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.poll_s)
+            with self._lock:
+                stale = [f for f in self._flights
+                         if not f.cancelled and _superseded(f.requests)]
+            for flight in stale:
+                # the statement ends under the same lock, so a cancel either
+                # hits it or is not sent; it cannot reach the next SET/PREPARE
+                with flight.lock:
+                    if flight.active:
+                        flight.cancelled = True
+                        try:
+                            flight.conn.cancel()
+                        except Exception:
+                            pass
+
+    def _land(self, flight: _Flight) -> None:
+        with flight.lock:
+            flight.active = False
+            with self._lock:
+                self._flights.discard(flight)
+
+    @contextmanager
+    def watch(self, conn, query_class: str, cancellable: bool = True):
+        """Run one statement; translate cancellation into QuerySuperseded.
+
+        ``cancellable=False`` (writes) only applies the timeout accounting.
+        """
+        cancellable = cancellable and CANCEL_ON_RERUN
+        ctx = get_script_run_ctx(suppress_warning=True) if cancellable else None
+        flight = _Flight(conn, getattr(ctx, "script_requests", None))
+        if flight.requests is not None:           # background jobs have no run
+            with self._lock:
+                self._flights.add(flight)
+                self._start()
+        t0 = time.perf_counter()
+        try:
+            yield flight
+        except pg_errors.QueryCanceled:
+            self._land(flight)
+            conn.rollback()
+            if flight.cancelled:
+                stats.add(query_class, queries=1, cancelled=1)
+                raise QuerySuperseded() from None
+            stats.add(query_class, queries=1, timed_out=1,
+                      total_ms=(time.perf_counter() - t0) * 1000)
+            raise
+        else:
+            stats.add(query_class, queries=1, total_ms=(time.perf_counter() - t0) * 1000)
+        finally:
+            self._land(flight)
+
+
+rerun_watch = RerunWatch()
+
+
+def query_stats() -> pd.DataFrame:
+    """Per query class: timeout budget, query count, cancelled / timed-out counts."""
+    return stats.frame()
@@ -0,0 +1,237 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+import pandas as pd
+
+# ───────────────────────────────────────────────────────────────
+# 1. Per-statement timings and sampled EXPLAIN (ANALYZE, BUFFERS)
+# ───────────────────────────────────────────────────────────────
+EXPLAIN_OVER_MS  = float(os.environ.get("VIZ_EXPLAIN_MS", "500"))     # slow-query threshold
+EXPLAIN_EVERY_S  = float(os.environ.get("VIZ_EXPLAIN_EVERY_S", "600"))  # per statement shape
+PLAN_LOG         = os.environ.get(
+    "VIZ_PLAN_LOG",
+    os.path.join(os.path.expanduser("~"), ".cache", "viz", "query_plans.jsonl"),
+)
+LARGE_TABLE_ROWS = 10_000
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\$\d+")
+_SPACES   = re.compile(r"\s+")
+
+
+def statement_shape(sql: str) -> str:
+    """SQL with literals / placeholders replaced by ``?`` (one key per shape)."""
+    return _SPACES.sub(" ", _LITERALS.sub("?", sql)).strip()
+
+
+def explainable(sql: str) -> bool:
+    # EXPLAIN ANALYZE executes the statement, so only plain reads qualify
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    return head in ("SELECT", "WITH") and not re.search(
+        r"\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+UPDATE)\b", sql, re.I)
+
+
+class PlanSampler:
+    """Times every statement by shape; EXPLAINs slow ones in the background.
+
+    A shape is explained at most once per ``every_s`` and only when a
+    run exceeded ``over_ms``. The EXPLAIN runs on its own connection in
+    one worker thread, so the page never waits for it. Captured plans go
+    to memory and to ``PLAN_LOG`` (JSON lines) for tools/explain_report.py.
+    """
+
+    def __init__(self, over_ms: float = EXPLAIN_OVER_MS, every_s: float = EXPLAIN_EVERY_S,
+                 log_path: str | None = PLAN_LOG):
+        self.over_ms  = over_ms
+        self.every_s  = every_s
+        self.log_path = log_path
+        self.timings: dict[str, dict] = {}
+        self.plans:   dict[str, dict] = {}
+        self._lock    = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=32)
+        self._thread  = None
+        self._explain = None        # callable(sql, params) -> plan JSON
+
+    def start(self, explain) -> "PlanSampler":
+        """``explain(sql, params)`` runs EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)."""
+        self._explain = explain
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="plan-sampler",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def observe(self, sql: str, params, elapsed_ms: float) -> None:
+        shape = statement_shape(sql)
+        now = time.monotonic()
+        with self._lock:
+            t = self.timings.setdefault(shape, {
+                "shape": shape, "calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "slow_calls": 0, "explained_at": -self.every_s,
+            })
+            t["calls"]    += 1
+            t["total_ms"] += elapsed_ms
+            t["max_ms"]    = max(t["max_ms"], elapsed_ms)
+            if elapsed_ms < self.over_ms:
+                return
+            t["slow_calls"] += 1
+            if self._thread is None or not explainable(sql) \
+                    or now - t["explained_at"] < self.every_s:
+                return
+            t["explained_at"] = now
+        try:
+            self._queue.put_nowait((shape, sql, params, elapsed_ms))
+        except queue.Full:
+            pass
+
+    def _loop(self) -> None:
+        while True:
+            shape, sql, params, elapsed_ms = self._queue.get()
+            try:
+                plan = self._explain(sql, params)
+            except Exception as exc:
+                plan, error = None, str(exc)
+            else:
+                error = None
+            record = {
+                "shape": shape, "sql": sql, "elapsed_ms": round(elapsed_ms, 1),
+                "captured_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+                "plan": plan, "error": error,
+            }
+            if plan is not None:
+                record.update(plan_summary(plan))
+            with self._lock:
+                self.plans[shape] = record
+            self._append(record)
+
+    def _append(self, record: dict) -> None:
+        if not self.log_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except OSError:
+            pass
+
+    def report(self) -> pd.DataFrame:
+        """One row per statement shape: timings plus the last captured plan summary."""
+        with self._lock:
+            rows = []
+            for shape, t in self.timings.items():
+                p = self.plans.get(shape, {})
+                rows.append({
+                    "shape": shape, "calls": t["calls"], "slow_calls": t["slow_calls"],
+                    "mean_ms": t["total_ms"] / t["calls"], "max_ms": t["max_ms"],
+                    "plan_ms": p.get("execution_ms"), "seq_scans": ", ".join(
+                        s["relation"] for s in p.get("seq_scans", [])),
+                    "shared_read": p.get("shared_read"), "captured_at": p.get("captured_at"),
+                })
+        df = pd.DataFrame(rows)
+        return df.sort_values("max_ms", ascending=False, ignore_index=True) if not df.empty else df
+
+
+plan_sampler = PlanSampler()
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Plan analysis: sequential scans and index suggestions
+# ───────────────────────────────────────────────────────────────
+def _nodes(node: dict, parents=()):
+    yield node, parents
+    for child in node.get("Plans", []):
+        yield from _nodes(child, (*parents, node))
+
+
+_COLUMN_CMP = re.compile(r"\(?\(?(?:\w+\.)?\"?(\w+)\"?\)?(?:::\w+(?: \w+)*)?\)?\s*"
+                         r"(=|>=|<=|>|<|= ANY)\s")
+
+
+def _filter_columns(cond: str | None) -> list[str]:
+    if not cond:
+        return []
+    return list(dict.fromkeys(m.group(1) for m in _COLUMN_CMP.finditer(cond)))
+
+
+def _sort_columns(keys) -> list[str]:
+    cols = []
+    for key in keys or []:
+        m = re.match(r"(?:\w+\.)?\"?(\w+)\"?", key)
+        if m:
+            cols.append(m.group(1))
+    return cols
+
+
+def plan_summary(plan) -> dict:
+    """Execution time, buffer totals and every Seq Scan of an EXPLAIN JSON plan."""
+    root = plan[0] if isinstance(plan, list) else plan
+    top = root["Plan"]
+    scans = []
+    for node, parents in _nodes(top):
+        if node.get("Node Type") != "Seq Scan":
+            continue
+        rows = node.get("Actual Rows", node.get("Plan Rows", 0)) * node.get("Actual Loops", 1)
+        removed = node.get("Rows Removed by Filter", 0) * node.get("Actual Loops", 1)
+        sort_keys, limited, join_cols = [], False, []
+        for p in reversed(parents):
+            if p.get("Node Type") == "Sort" and not sort_keys:
+                sort_keys = _sort_columns(p.get("Sort Key"))
+            if p.get("Node Type") == "Limit":
+                limited = True
+            cond = p.get("Hash Cond") or p.get("Merge Cond")
+            if cond and not join_cols:
+                # the join column on this scan's side of the condition
+                join_cols = [c for a, c in re.findall(r'"?(\w+)"?\."?(\w+)"?', cond)
+                             if a == node.get("Alias")]
+        scans.append({
+            "relation": node.get("Relation Name"), "alias": node.get("Alias"),
+            "rows": rows, "rows_removed": removed, "scanned": rows + removed,
+            "filter": node.get("Filter"), "filter_columns": _filter_columns(node.get("Filter")),
+            "sort_columns": sort_keys if limited else [], "join_columns": join_cols,
+        })
+    return {
+        "execution_ms": root.get("Execution Time"),
+        "planning_ms":  root.get("Planning Time"),
+        "shared_hit":   top.get("Shared Hit Blocks"),
+        "shared_read":  top.get("Shared Read Blocks"),
+        "seq_scans":    scans,
+    }
+
+
+def suggest_indexes(scans, table_rows: dict, existing: dict | None = None,
+                    min_rows: int = LARGE_TABLE_ROWS) -> list[dict]:
+    """CREATE INDEX suggestions for seq scans of tables with ≥ ``min_rows`` rows.
+
+    A filtered scan suggests its filter columns; a scan feeding a
+    Sort + Limit suggests the sort key (top-N by index order); a scan on
+    the probe side of a hash join suggests the join column. Columns that
+    already lead an index (``existing``: table → list of column lists)
+    are skipped.
+    """
+    existing = existing or {}
+    out, seen = [], set()
+    for scan in scans:
+        rel = scan["relation"]
+        size = table_rows.get(rel, scan.get("scanned", 0))
+        if not rel or size < min_rows:
+            continue
+        for reason, cols in (("filter", scan["filter_columns"]),
+                             ("order by … limit", scan["sort_columns"]),
+                             ("join", scan["join_columns"])):
+            leading = {idx[0] for idx in existing.get(rel, []) if idx}
+            cols = [c for c in cols if c not in leading][:2]
+            if not cols:
+                continue
+            key = (rel, tuple(cols))
+            if key in seen:
+                continue
+            seen.add(key)
+            out.append({
+                "table": rel, "columns": cols, "reason": reason, "table_rows": int(size),
+                "sql": f"CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                       f"{rel}_{'_'.join(cols)}_idx ON {rel} ({', '.join(cols)});",
+            })
+    return out
@@ -0,0 +1,180 @@
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from item_dim import get_item_dim
+from sale_watermark import SaleWatermark, sale_batch
+
+# ───────────────────────────────────────────────────────────────
+# 1. Time windows offered by the realtime leaderboards
+# ───────────────────────────────────────────────────────────────
+WINDOW_MODE = "Time window"
+SALES_MODE  = "Last N sales"
+
+TIME_WINDOWS = {
+    "Last 15 min": pd.Timedelta(minutes=15),
+    "Last 1 h":    pd.Timedelta(hours=1),
+    "Today":       None,                     # since local midnight
+    "Last 7 d":    pd.Timedelta(days=7),
+}
+
+# resolution of the time‑series curves per window (keeps point counts flat)
+SERIES_FREQ = {
+    "Last 15 min": "min",
+    "Last 1 h":    "min",
+    "Today":       "15min",
+    "Last 7 d":    "h",
+}
+
+GROUP_COLS = [
+    ("familycat",     "Family"),
+    ("sectioncat",    "Section"),
+    ("departmentcat", "Department"),
+    ("classcat",      "Class"),
+]
+
+HORIZON_DAYS = 7
+VALUE_COLS   = ["quantity", "totalprice", "revenue", "lines"]
+
+_NEW_BUCKETS_SQL = f"""
+    SELECT date_trunc('minute', s.saletime)  AS minute,
+           si.itemid,
+           SUM(si.quantity)                  AS quantity,
+           SUM(si.totalprice)                AS totalprice,
+           SUM(si.unitprice * si.quantity)   AS revenue,
+           COUNT(*)                          AS lines
+      FROM sales s
+      JOIN salesitems si ON si.saleid = s.saleid
+     WHERE {sale_batch("s.saleid")}
+       AND s.saletime >= LOCALTIMESTAMP - INTERVAL '%s days'
+     GROUP BY 1, 2
+"""
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Per-minute buckets keyed by itemid (categories via item_dim)
+# ───────────────────────────────────────────────────────────────
+class MinuteBuckets:
+    """Salesitems pre-aggregated per (minute, itemid), extended incrementally.
+
+    Only sales not folded yet are read on refresh (see ``SaleWatermark``),
+    so a window total is a sum over buckets instead of over raw sales.
+    """
+
+    def __init__(self, horizon_days: int = HORIZON_DAYS):
+        self.horizon_days = horizon_days
+        self.buckets      = pd.DataFrame({
+            "minute": pd.Series(dtype="datetime64[ns]"),
+            "itemid": pd.Series(dtype="int64"),
+            **{c: pd.Series(dtype="float64") for c in VALUE_COLS},
+        })
+        self.watermark    = SaleWatermark()
+        self.now          = pd.Timestamp.now().floor("min")
+        self._refreshed   = 0.0
+        self._lock        = threading.Lock()
+
+    @property
+    def last_saleid(self) -> int:
+        return self.watermark.last_saleid
+
+    # ────────── maintenance ──────────
+    def refresh(self, db, min_interval: float = 2.0) -> None:
+        """Fold sales not seen yet into the buckets."""
+        with self._lock:
+            if time.monotonic() - self._refreshed < min_interval:
+                return
+            top = db.fetch_data("SELECT COALESCE(MAX(saleid), 0) AS m, "
+                                "LOCALTIMESTAMP AS now FROM sales")
+            self.now = pd.Timestamp(top["now"].iat[0])
+            batch = self.watermark.batch(db, int(top["m"].iat[0]))
+            if batch is not None:
+                new = db.fetch_data(_NEW_BUCKETS_SQL, (*batch, self.horizon_days))
+                if not new.empty:
+                    self._merge(new)
+                    get_item_dim().ensure(db, new["itemid"])
+            self.watermark.advance()
+            self._trim()
+            self._refreshed = time.monotonic()
+
+    def _merge(self, new: pd.DataFrame) -> None:
+        new["minute"] = pd.to_datetime(new["minute"]).astype("datetime64[ns]")
+        new["itemid"] = new["itemid"].astype("int64")
+        new[VALUE_COLS] = new[VALUE_COLS].astype(float)
+        start = new["minute"].min()
+        # only the overlapping tail needs re-aggregating
+        cut  = self.buckets["minute"].searchsorted(start) if len(self.buckets) else 0
+        head = self.buckets.iloc[:cut]
+        tail = pd.concat([self.buckets.iloc[cut:], new], ignore_index=True)
+        tail = (tail.groupby(["minute", "itemid"], as_index=False)[VALUE_COLS]
+                    .sum().sort_values("minute"))
+        self.buckets = pd.concat([head, tail], ignore_index=True)
+
+    def _trim(self) -> None:
+        oldest = self.now - pd.Timedelta(days=self.horizon_days)
+        if len(self.buckets) and self.buckets["minute"].iat[0] < oldest:
+            cut = self.buckets["minute"].searchsorted(oldest)
+            self.buckets = self.buckets.iloc[cut:].reset_index(drop=True)
+
+    def install(self, buckets: pd.DataFrame, now: pd.Timestamp,
+                last_saleid: int) -> None:
+        """Adopt buckets published by another process (see shared_hot)."""
+        with self._lock:
+            self.buckets = buckets
+            self.now, self.watermark = now, SaleWatermark(last_saleid)
+            self._refreshed = time.monotonic()
+
+    # ────────── queries ──────────
+    def window_start(self, window: str) -> pd.Timestamp:
+        span = TIME_WINDOWS[window]
+        return self.now.normalize() if span is None else self.now - span
+
+    def _window_rows(self, window: str) -> pd.DataFrame:
+        buckets = self.buckets
+        cut = buckets["minute"].searchsorted(self.window_start(window))
+        return buckets.iloc[cut:]
+
+    def with_group(self, rows: pd.DataFrame, by: str) -> pd.DataFrame:
+        rows = rows.copy()
+        rows[by] = (pd.Series(get_item_dim().take(rows["itemid"], by), index=rows.index)
+                    .fillna("Unknown").replace("", "Unknown"))
+        return rows
+
+    def window_totals(self, window: str, by: str = "itemid") -> pd.DataFrame:
+        """Quantity / totalprice / revenue / line count per ``by`` over the window."""
+        per_item = (self._window_rows(window)
+                    .groupby("itemid")[VALUE_COLS].sum().reset_index())
+        if by == "itemid":
+            return per_item.set_index("itemid")
+        if per_item.empty:
+            # same shape as a grouped result, so leaderboards work on a cold start
+            return per_item.set_index("itemid").rename_axis(by)
+        return self.with_group(per_item, by).groupby(by, observed=True)[VALUE_COLS].sum()
+
+    def window_series(self, window: str, by: str,
+                      value: str = "totalprice") -> pd.DataFrame:
+        """``value`` per (group, t_min) at the window's series resolution."""
+        rows = self._window_rows(window)
+        if rows.empty:
+            return pd.DataFrame(columns=[by, "t_min", value])
+        rows = self.with_group(rows, by)
+        rows["t_min"] = rows["minute"].dt.floor(SERIES_FREQ[window])
+        return rows.groupby([by, "t_min"], observed=True)[value].sum().reset_index()
+
+
+@st.cache_resource(show_spinner=False)
+def get_buckets() -> MinuteBuckets:
+    """Process-wide bucket store shared by every session."""
+    return MinuteBuckets()
+
+
+def window_picker(extra_modes: tuple = ()) -> tuple[str, str | None]:
+    """Sidebar controls: returns (mode, window label or None).
+
+    ``extra_modes`` are appended to the radio; the page handles those itself.
+    """
+    mode = st.sidebar.radio("Analyse by", [SALES_MODE, WINDOW_MODE, *extra_modes])
+    if mode != WINDOW_MODE:
+        return mode, None
+    return mode, st.sidebar.selectbox("Time window", list(TIME_WINDOWS), index=1)
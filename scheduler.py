@@ -0,0 +1,143 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# ───────────────────────────────────────────────────────────────
+# 1. Registered job + its latest snapshot and timing stats
+# ───────────────────────────────────────────────────────────────
+class NotReady(Exception):
+    """A job's input has not loaded yet; raise it to retry after the backoff."""
+
+
+class Job:
+    """A dataset refreshed every ``interval`` seconds on a worker thread."""
+
+    def __init__(self, name: str, fn, interval: float,
+                 jitter: float = 0.1, max_backoff: float = 300.0):
+        self.name        = name
+        self.fn          = fn
+        self.interval    = interval
+        self.jitter      = jitter
+        self.max_backoff = max_backoff
+
+        self.snapshot    = None
+        self.snapshot_at = None          # wall-clock time of last success
+        self.ready       = threading.Event()
+        self.running     = False
+        self.next_run    = time.monotonic()
+        self.failures    = 0             # consecutive, drives the backoff
+        self.stats = {"runs": 0, "errors": 0, "last_ms": 0.0,
+                      "total_ms": 0.0, "max_ms": 0.0, "last_error": ""}
+
+    def delay(self) -> float:
+        """Seconds until the next run: interval, or backoff after errors."""
+        base = self.interval
+        if self.failures:
+            base = min(self.interval * 2 ** self.failures, self.max_backoff)
+        return base * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Scheduler: one dispatcher thread + a small worker pool
+# ───────────────────────────────────────────────────────────────
+class Scheduler:
+    """Refreshes registered jobs in the background; pages read snapshots."""
+
+    def __init__(self, workers: int = 4):
+        self._jobs: dict[str, Job] = {}
+        self._lock   = threading.Lock()
+        self._wake   = threading.Event()
+        self._pool   = ThreadPoolExecutor(max_workers=workers,
+                                          thread_name_prefix="precompute")
+        self._thread = None
+
+    def register(self, name: str, fn, interval: float, **kwargs) -> Job:
+        with self._lock:
+            job = self._jobs.get(name)
+            if job is None:
+                job = self._jobs[name] = Job(name, fn, interval, **kwargs)
+            else:
+                job.fn, job.interval = fn, interval
+        self._wake.set()
+        return job
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="scheduler",
+                                            daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                due = [j for j in self._jobs.values()
+                       if not j.running and j.next_run <= now]
+                for job in due:
+                    job.running = True
+                pending = [j.next_run for j in self._jobs.values() if not j.running]
+            for job in due:
+                self._pool.submit(self._run, job)
+            timeout = max(0.05, min(pending) - now) if pending else 1.0
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _run(self, job: Job) -> None:
+        t0 = time.perf_counter()
+        try:
+            value = job.fn()
+        except Exception as exc:
+            job.failures += 1
+            job.stats["errors"] += 1
+            job.stats["last_error"] = f"{type(exc).__name__}: {exc}"
+        else:
+            job.snapshot, job.snapshot_at = value, time.time()
+            job.failures = 0
+            job.ready.set()
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            job.stats["runs"]     += 1
+            job.stats["last_ms"]   = ms
+            job.stats["total_ms"] += ms
+            job.stats["max_ms"]    = max(job.stats["max_ms"], ms)
+            with self._lock:
+                job.next_run = time.monotonic() + job.delay()
+                job.running  = False
+            self._wake.set()
+
+    # ────────── readers ──────────
+    def snapshot(self, name: str, timeout: float = 0.0):
+        """Latest value of ``name``; waits up to ``timeout`` for the first run."""
+        job = self._jobs.get(name)
+        if job is None:
+            return None
+        if timeout and not job.ready.is_set():
+            job.ready.wait(timeout)
+        return job.snapshot
+
+    def is_ready(self, name: str) -> bool:
+        """``name`` has published at least once (never waits)."""
+        job = self._jobs.get(name)
+        return job is not None and job.ready.is_set()
+
+    def version(self, *names: str) -> tuple:
+        """Changes whenever any of the jobs publishes a new snapshot."""
+        return tuple(self._jobs[n].snapshot_at if n in self._jobs else None for n in names)
+
+    def stats(self) -> pd.DataFrame:
+        now = time.time()
+        rows = []
+        for job in list(self._jobs.values()):
+            runs = job.stats["runs"]
+            rows.append({
+                "job":        job.name,
+                "interval_s": job.interval,
+                **job.stats,
+                "mean_ms":    job.stats["total_ms"] / runs if runs else 0.0,
+                "failures":   job.failures,
+                "age_s":      now - job.snapshot_at if job.snapshot_at else None,
+            })
+        return pd.DataFrame(rows)
@@ -0,0 +1,188 @@
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+# ───────────────────────────────────────────────────────────────
+# 1. Table / column / index metadata, loaded once per process
+# ───────────────────────────────────────────────────────────────
+SCHEMA         = "public"
+CHECK_EVERY_S  = 30.0       # how often the DDL fingerprint is compared
+
+_COLUMNS_SQL = """
+    SELECT c.table_name, c.column_name, c.data_type, c.is_nullable,
+           c.ordinal_position, s.avg_width
+      FROM information_schema.columns c
+      LEFT JOIN pg_stats s
+        ON s.schemaname = c.table_schema AND s.tablename = c.table_name
+       AND s.attname = c.column_name
+     WHERE c.table_schema = %s
+     ORDER BY c.table_name, c.ordinal_position
+"""
+
+_INDEXES_SQL = """
+    SELECT t.relname AS table_name, i.relname AS index_name,
+           array_agg(a.attname ORDER BY k.ord) AS columns,
+           ix.indisunique AS is_unique, ix.indisprimary AS is_primary
+      FROM pg_index ix
+      JOIN pg_class t      ON t.oid = ix.indrelid
+      JOIN pg_class i      ON i.oid = ix.indexrelid
+      JOIN pg_namespace n  ON n.oid = t.relnamespace
+      CROSS JOIN LATERAL unnest(ix.indkey) WITH ORDINALITY AS k(attnum, ord)
+      JOIN pg_attribute a  ON a.attrelid = t.oid AND a.attnum = k.attnum
+     WHERE n.nspname = %s
+     GROUP BY 1, 2, 4, 5
+"""
+
+# pg_class rows change (new xmin) on CREATE / ALTER / DROP of tables and
+# indexes; RENAME / DROP COLUMN and type changes only touch pg_attribute,
+# so its name / type / dropped flag per column is hashed too
+_FINGERPRINT_SQL = """
+    SELECT md5(
+             COALESCE((SELECT string_agg(c.oid::text || ':' || c.xmin::text, ','
+                                         ORDER BY c.oid)
+                         FROM pg_class c
+                        WHERE c.relnamespace = n.oid
+                          AND c.relkind IN ('r', 'p', 'v', 'm', 'i')), '')
+             || '|' ||
+             COALESCE((SELECT string_agg(a.attrelid::text || '.' || a.attnum::text || ':'
+                                         || a.attname || ':' || a.atttypid::text || ':'
+                                         || a.attisdropped::text, ','
+                                         ORDER BY a.attrelid, a.attnum)
+                         FROM pg_attribute a
+                         JOIN pg_class c ON c.oid = a.attrelid
+                        WHERE c.relnamespace = n.oid AND a.attnum > 0
+                          AND c.relkind IN ('r', 'p', 'v', 'm')), '')
+           ) AS v
+      FROM pg_namespace n
+     WHERE n.nspname = %s
+"""
+
+TEXT_TYPES = {"text", "character varying", "character"}
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SchemaRegistry:
+    """Tables, columns (with pg_stats widths) and indexes of one schema.
+
+    Loaded on first use; afterwards a one-row fingerprint query at most
+    every ``CHECK_EVERY_S`` seconds decides whether DDL happened and the
+    metadata must be reloaded.
+    """
+
+    def __init__(self, schema: str = SCHEMA):
+        self.schema      = schema
+        self.columns_df  = pd.DataFrame()
+        self.indexes_df  = pd.DataFrame()
+        self.fingerprint = None
+        self.loads       = 0
+        self._checked    = 0.0
+        self._lock       = threading.Lock()
+
+    # ────────── maintenance ──────────
+    def _load(self, db, fingerprint) -> None:
+        self.columns_df  = db.fetch_data(_COLUMNS_SQL, (self.schema,))
+        self.indexes_df  = db.fetch_data(_INDEXES_SQL, (self.schema,))
+        self.fingerprint = fingerprint
+        self.loads      += 1
+
+    def ensure(self, db, force: bool = False) -> "SchemaRegistry":
+        """Reload if never loaded, forced, or the DDL fingerprint moved."""
+        with self._lock:
+            if not force and self.fingerprint is not None \
+                    and time.monotonic() - self._checked < CHECK_EVERY_S:
+                return self
+            fp = db.fetch_data(_FINGERPRINT_SQL, (self.schema,))
+            fp = fp["v"].iat[0] if not fp.empty else None
+            self._checked = time.monotonic()
+            if force or fp != self.fingerprint or self.columns_df.empty:
+                self._load(db, fp)
+        return self
+
+    def invalidate(self) -> None:
+        """Call after the app itself runs DDL."""
+        with self._lock:
+            self.fingerprint = None
+
+    # ────────── lookups ──────────
+    def tables(self) -> list[str]:
+        if self.columns_df.empty:
+            return []
+        return sorted(self.columns_df["table_name"].unique())
+
+    def first_existing(self, possibles) -> str | None:
+        names = set(self.tables())
+        return next((n for n in possibles if n in names), None)
+
+    def columns(self, table: str) -> pd.DataFrame:
+        if self.columns_df.empty:
+            return self.columns_df
+        return self.columns_df[self.columns_df["table_name"] == table].reset_index(drop=True)
+
+    def column_names(self, table: str) -> list[str]:
+        return self.columns(table)["column_name"].tolist() if not self.columns_df.empty else []
+
+    def indexes(self, table: str) -> pd.DataFrame:
+        if self.indexes_df.empty:
+            return self.indexes_df
+        return self.indexes_df[self.indexes_df["table_name"] == table].reset_index(drop=True)
+
+    def indexed_columns(self, table: str) -> set[str]:
+        """Leading columns of the table's indexes (good filter candidates)."""
+        idx = self.indexes(table)
+        return {cols[0] for cols in idx["columns"] if cols} if not idx.empty else set()
+
+    def row_width(self, table: str, columns=None) -> float:
+        """Average bytes per row for ``columns`` (all if None) from pg_stats."""
+        cols = self.columns(table)
+        if cols.empty:
+            return 0.0
+        if columns is not None:
+            cols = cols[cols["column_name"].isin(columns)]
+        return float(pd.to_numeric(cols["avg_width"], errors="coerce").fillna(8).sum())
+
+    # ────────── SQL building ──────────
+    def select_sql(self, table: str, columns=None, filters=(), order_by: str | None = None,
+                   descending: bool = True) -> tuple[str, list]:
+        """SELECT with only known ``columns`` and ``filters`` pushed into WHERE.
+
+        ``filters`` are (column, op, value) with op in =, >=, <=, contains.
+        Identifiers are checked against the registry and quoted; values
+        travel as parameters.
+        """
+        known = self.column_names(table)
+        if table not in self.tables():
+            raise KeyError(f"unknown table {table!r}")
+        picked = [c for c in (columns or known) if c in known] or known
+        types = dict(zip(known, self.columns(table)["data_type"]))
+        where, params = [], []
+        for col, op, value in filters:
+            if col not in types or value in (None, ""):
+                continue
+            if op == "contains":
+                where.append(f"{quote_ident(col)}::text ILIKE %s")
+                params.append(f"%{value}%")
+            elif op in ("=", ">=", "<="):
+                where.append(f"{quote_ident(col)} {op} %s")
+                params.append(value)
+        sql = f"SELECT {', '.join(quote_ident(c) for c in picked)} FROM {quote_ident(table)}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if order_by in types:
+            sql += f" ORDER BY {quote_ident(order_by)}{' DESC' if descending else ''}"
+        return sql, params
+
+    def metrics(self) -> dict:
+        return {"tables": len(self.tables()), "columns": len(self.columns_df),
+                "indexes": len(self.indexes_df), "loads": self.loads,
+                "fingerprint": self.fingerprint}
+
+
+@st.cache_resource(show_spinner=False)
+def get_registry() -> SchemaRegistry:
+    """Process-wide schema metadata shared by every session."""
+    return SchemaRegistry()
@@ -0,0 +1,20 @@
+"""Start the dashboard and warm it up before the first session arrives.
+
+    python serve.py --server.port 8501          # any ``streamlit run`` option
+
+``streamlit run app.py`` runs nothing until a browser connects, so the
+first visitor pays for connections, reference data and the first
+scheduler loads. This launcher starts warmup.WarmUp in the server
+process as soon as the runtime exists. The caches it fills are the
+same st.cache_resource singletons the pages use.
+"""
+import sys
+
+from streamlit.web import cli as stcli
+
+from warmup import warmup
+
+if __name__ == "__main__":
+    warmup.start(wait_for_runtime=True)
+    sys.argv = ["streamlit", "run", "app.py", *sys.argv[1:]]
+    sys.exit(stcli.main())
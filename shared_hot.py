@@ -0,0 +1,137 @@
+import fcntl
+import os
+import tempfile
+import threading
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# ───────────────────────────────────────────────────────────────
+# 1. Where the hot datasets live (tmpfs when the host has one)
+# ───────────────────────────────────────────────────────────────
+HOT_DIR = os.environ.get(
+    "VIZ_HOT_DIR",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                 "viz_hot"),
+)
+ENABLED = pa is not None and os.environ.get("VIZ_SHARED_HOT", "1") != "0"
+KEEP_VERSIONS = 3           # older files are unlinked; live mmaps stay valid
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Versioned, mmap-backed Arrow store shared by server processes
+# ───────────────────────────────────────────────────────────────
+class HotStore:
+    """One writer process publishes, every process maps the files read-only.
+
+    A dataset is a dict of DataFrames written as uncompressed Arrow IPC
+    files ``<name>.<version>.<part>.arrow``; ``<name>.version`` is bumped
+    last, so readers only ever see complete versions. The writer is
+    whoever holds ``writer.lock``; if it dies the next caller of
+    ``is_writer()`` takes over.
+    """
+
+    def __init__(self, root: str = HOT_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock_file = None
+        self._mutex = threading.Lock()
+        self._cache: dict[str, tuple[int, dict]] = {}
+
+    # ────────── roles ──────────
+    def is_writer(self) -> bool:
+        with self._mutex:
+            if self._lock_file is not None:
+                return True
+            f = open(os.path.join(self.root, "writer.lock"), "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+            self._lock_file = f            # held for the process lifetime
+            return True
+
+    # ────────── paths ──────────
+    def _version_path(self, name: str) -> str:
+        return os.path.join(self.root, f"{name}.version")
+
+    def _part_path(self, name: str, version: int, part: str) -> str:
+        return os.path.join(self.root, f"{name}.{version}.{part}.arrow")
+
+    def version(self, name: str) -> int:
+        try:
+            with open(self._version_path(name)) as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    # ────────── writer ──────────
+    def publish(self, name: str, parts: dict) -> int:
+        version = self.version(name) + 1
+        for part, df in parts.items():
+            table = pa.Table.from_pandas(df, preserve_index=True)
+            path  = self._part_path(name, version, part)
+            tmp   = path + ".tmp"
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as w:
+                w.write_table(table)
+            os.replace(tmp, path)
+        tmp = self._version_path(name) + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(version))
+        os.replace(tmp, self._version_path(name))
+        self._unlink_old(name, version)
+        return version
+
+    def _unlink_old(self, name: str, version: int) -> None:
+        prefix = f"{name}."
+        for fname in os.listdir(self.root):
+            if not (fname.startswith(prefix) and fname.endswith(".arrow")):
+                continue
+            try:
+                v = int(fname[len(prefix):].split(".", 1)[0])
+            except ValueError:
+                continue
+            if v <= version - KEEP_VERSIONS:
+                try:
+                    os.unlink(os.path.join(self.root, fname))
+                except FileNotFoundError:
+                    pass
+
+    # ────────── readers ──────────
+    def read(self, name: str, parts: list[str]):
+        """Latest published ``parts`` of ``name`` as DataFrames, or None."""
+        version = self.version(name)
+        if not version:
+            return None
+        cached = self._cache.get(name)
+        if cached and cached[0] == version:
+            return cached[1]
+        try:
+            frames = {}
+            for part in parts:
+                source = pa.memory_map(self._part_path(name, version, part), "r")
+                table  = pa.ipc.open_file(source).read_all()      # zero-copy view
+                # split_blocks keeps numeric columns as views on the mapping
+                frames[part] = table.to_pandas(split_blocks=True)
+        except FileNotFoundError:          # raced with a newer publish
+            return cached[1] if cached else None
+        self._cache[name] = (version, frames)
+        return frames
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide HotStore, or None when sharing is disabled/unavailable."""
+    global _store
+    if not ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = HotStore()
+        return _store
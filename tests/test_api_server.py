@@ -0,0 +1,79 @@
+import http.client
+import threading
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+import api_server
+from api_server import ApiHandler, ResponseCache
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.published = 1
+        self.tops = self._tops(5.0)
+
+    @staticmethod
+    def _tops(price):
+        frame = pd.DataFrame({"quantity": [2.0], "totalprice": [price], "revenue": [price],
+                              "lines": [1], "itemnameenglish": ["tea"]},
+                             index=pd.Index([7], name="itemid"))
+        return {"Last 1 h": frame}
+
+    def publish(self, price):
+        self.published += 1
+        self.tops = self._tops(price)
+
+    def version(self, *jobs):
+        return (self.published,)
+
+    def snapshot(self, name, timeout=None):
+        return self.tops
+
+
+@pytest.fixture
+def api(monkeypatch):
+    scheduler = FakeScheduler()
+    monkeypatch.setattr(api_server, "get_scheduler", lambda: scheduler)
+    monkeypatch.setattr(api_server, "responses", ResponseCache())
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def get(headers=None):
+        conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+        conn.request("GET", "/top-items?window=last1h&format=json", headers=headers or {})
+        resp = conn.getresponse()
+        body = resp.read()
+        conn.close()
+        return resp.status, resp.getheader("ETag"), body
+
+    yield scheduler, get
+    server.shutdown()
+    server.server_close()
+
+
+def test_if_none_match_gets_a_304(api):
+    _, get = api
+    status, etag, body = get()
+    assert status == 200 and etag and b"tea" in body
+    status, again, body = get({"If-None-Match": etag})
+    assert (status, again, body) == (304, etag, b"")
+    assert api_server.responses.stats["not_modified"] == 1
+
+
+def test_new_scheduler_version_changes_the_etag(api):
+    scheduler, get = api
+    _, etag, _ = get()
+    scheduler.publish(9.0)
+    status, new_etag, body = get({"If-None-Match": etag})
+    assert status == 200 and new_etag != etag and b"9.0" in body
+    assert api_server.responses.stats["builds"] == 2
+
+
+def test_republished_identical_data_keeps_the_etag(api):
+    scheduler, get = api
+    _, etag, _ = get()
+    scheduler.publish(5.0)
+    assert get({"If-None-Match": etag})[0] == 304
+    assert api_server.responses.stats["unchanged_rebuilds"] == 1
@@ -0,0 +1,118 @@
+import threading
+import time
+
+from streamlit.runtime.scriptrunner import StopException
+
+from caching import SingleFlightCache
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+# ────────── SingleFlightCache ──────────
+def test_concurrent_misses_load_once():
+    cache, calls, gate = SingleFlightCache("t", ttl=60, max_stale=0), [], threading.Event()
+
+    def load():
+        calls.append(1)
+        gate.wait(2)
+        return "v"
+
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(cache.get("k", load)))
+               for _ in range(6)]
+    for t in threads:
+        t.start()
+    assert _wait_for(lambda: cache.stats["coalesced"] == 5)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert out == ["v"] * 6 and len(calls) == 1
+
+
+def test_stale_value_served_while_refreshing():
+    cache, values = SingleFlightCache("t", ttl=0.05, max_stale=60), iter(["old", "new"])
+    refreshing = threading.Event()
+
+    def load():
+        value = next(values)
+        if value == "new":
+            refreshing.wait(2)
+        return value
+
+    assert cache.get("k", load) == "old"
+    time.sleep(0.06)
+    assert cache.get("k", load) == "old"          # stale, refresh started
+    assert cache.get("k", load) == "old"          # still only one refresh
+    assert cache.stats["stale_served"] == 2
+    refreshing.set()
+    assert _wait_for(lambda: cache.stats["refreshes"] == 1)
+    assert cache.get("k", load) == "new"
+
+
+def test_too_old_value_blocks_for_a_reload():
+    cache, values = SingleFlightCache("t", ttl=0.01, max_stale=0.01), iter(["a", "b"])
+    cache.get("k", lambda: next(values))
+    time.sleep(0.05)
+    assert cache.get("k", lambda: next(values)) == "b"
+    assert cache.stats["misses"] == 2
+
+
+def test_waiters_reload_when_the_leader_stops():
+    cache, started, release = SingleFlightCache("t", ttl=60, max_stale=0), \
+        threading.Event(), threading.Event()
+
+    def stopped():
+        started.set()
+        release.wait(2)
+        raise StopException()
+
+    errors, out = [], []
+
+    def leader():
+        try:
+            cache.get("k", stopped)
+        except StopException as exc:
+            errors.append(exc)
+
+    t = threading.Thread(target=leader)
+    t.start()
+    started.wait(2)
+    w = threading.Thread(target=lambda: out.append(cache.get("k", lambda: "mine")))
+    w.start()
+    assert _wait_for(lambda: cache.stats["coalesced"] == 1)
+    release.set()
+    t.join()
+    w.join()
+    assert len(errors) == 1 and out == ["mine"]
+
+
+def test_entries_are_bounded_too_old_first():
+    cache = SingleFlightCache("t", ttl=0.02, max_stale=0.02, max_entries=3)
+    cache.get("old", lambda: 0)
+    time.sleep(0.05)
+    for key in ("a", "b"):
+        cache.get(key, lambda: key)
+    cache.get("a", lambda: "a")                   # "b" is now least recently used
+    cache.get("c", lambda: "c")
+    assert list(cache._entries) == ["b", "a", "c"]
+    cache.get("d", lambda: "d")
+    assert list(cache._entries) == ["a", "c", "d"]
+    assert cache.stats["evictions"] == 2
+
+
+def test_entries_with_a_load_in_flight_are_kept():
+    cache, gate = SingleFlightCache("t", ttl=60, max_stale=0, max_entries=1), threading.Event()
+    t = threading.Thread(target=cache.get, args=("slow", lambda: gate.wait(2)))
+    t.start()
+    assert _wait_for(lambda: cache.stats["misses"] == 1)
+    assert cache.get("fast", lambda: "v") == "v"
+    assert "slow" in cache._entries
+    gate.set()
+    t.join()
+    cache.get("next", lambda: "n")
+    assert len(cache._entries) == 1
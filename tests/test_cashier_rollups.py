@@ -0,0 +1,72 @@
+import pandas as pd
+
+from cashier_rollups import CashierRollups, _normalise
+
+NOW = pd.Timestamp("2024-03-10 12:00")
+
+
+def _rollup(rows):
+    df = pd.DataFrame(rows, columns=["t", "cashier", "total", "count",
+                                     "max_sale", "min_sale", "last_sale"])
+    return _normalise(df.assign(t=df["t"].map(pd.Timestamp),
+                                last_sale=df["last_sale"].map(pd.Timestamp)))
+
+
+def _rollups() -> CashierRollups:
+    r = CashierRollups()
+    r.now = NOW
+    # minute grain from 2024-03-01 09:00 on, day grain for all of it
+    r.minutes = _rollup([
+        ("2024-03-01 09:00", "ann", 10.0, 1, 10.0, 10.0, "2024-03-01 09:00:30"),
+        ("2024-03-09 08:00", "ann", 5.0, 1, 5.0, 5.0, "2024-03-09 08:00:10"),
+        ("2024-03-09 20:00", "bob", 7.0, 1, 7.0, 7.0, "2024-03-09 20:00:10"),
+        ("2024-03-10 09:30", "bob", 3.0, 1, 3.0, 3.0, "2024-03-10 09:30:10"),
+    ])
+    r.days = _rollup([
+        ("2024-02-01", "ann", 40.0, 4, 20.0, 2.0, "2024-02-01 18:00"),
+        ("2024-03-01", "ann", 10.0, 1, 10.0, 10.0, "2024-03-01 09:00:30"),
+        ("2024-03-09", "ann", 5.0, 1, 5.0, 5.0, "2024-03-09 08:00:10"),
+        ("2024-03-09", "bob", 7.0, 1, 7.0, 7.0, "2024-03-09 20:00:10"),
+        ("2024-03-10", "bob", 3.0, 1, 3.0, 3.0, "2024-03-10 09:30:10"),
+    ])
+    return r
+
+
+def _totals(r, start, end) -> dict:
+    summary = r.summary(start, end)
+    return dict(zip(summary["cashier"], summary["total_sales"]))
+
+
+def test_shift_inside_minute_horizon_reads_minutes():
+    r = _rollups()
+    assert _totals(r, "2024-03-09 06:00", "2024-03-09 14:00") == {"ann": 5.0}
+    assert r.span("2024-03-09 06:00", "2024-03-09 14:00") == \
+        (pd.Timestamp("2024-03-09 06:00"), pd.Timestamp("2024-03-09 14:00"))
+
+
+def test_old_shift_falls_back_to_the_whole_day():
+    r = _rollups()
+    assert _totals(r, "2024-02-01 08:00", "2024-02-01 16:00") == {"ann": 40.0}
+    assert r.span("2024-02-01 08:00", "2024-02-01 16:00") == \
+        (pd.Timestamp("2024-02-01"), pd.Timestamp("2024-02-02"))
+
+
+def test_date_range_mixes_days_and_partial_minutes():
+    r = _rollups()
+    assert _totals(r, "2024-03-09 12:00", "2024-03-10 10:00") == {"bob": 10.0}
+    assert _totals(r, "2024-03-01", "2024-03-11") == {"ann": 15.0, "bob": 10.0}
+
+
+def test_range_starting_before_the_minute_horizon():
+    r = _rollups()
+    assert _totals(r, "2024-01-31 12:00", "2024-03-09 12:00") == {"ann": 55.0}
+    assert r.span("2024-01-31 12:00", "2024-03-09 12:00")[0] == pd.Timestamp("2024-01-31")
+
+
+def test_range_ending_before_the_minute_horizon():
+    r = _rollups()
+    assert _totals(r, "2024-01-30", "2024-02-01 10:00") == {"ann": 40.0}
+
+
+def test_empty_period():
+    assert _rollups().summary("2024-03-05", "2024-03-06").empty
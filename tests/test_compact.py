@@ -0,0 +1,60 @@
+import decimal
+
+import numpy as np
+import pandas as pd
+
+from compact import compact_frame, compact_report, shared_categories
+
+
+def _sales():
+    return pd.DataFrame({
+        "saleid":   pd.Series([1, 2, 3, 4], dtype="int64"),
+        "amount":   [decimal.Decimal("1.10"), decimal.Decimal("2.25"),
+                     decimal.Decimal("0.05"), decimal.Decimal("10.00")],
+        "cashier":  ["ann", "bob", "ann", "ann"],
+        "note":     ["x", "y", "x", "x"],
+        "free":     ["a", "b", "c", "d"],
+        "price":    [1.5, 2.5, 3.5, 4.5],
+    })
+
+
+def test_dtypes_are_downcast():
+    out = compact_frame(_sales())
+    assert out["saleid"].dtype == np.int8
+    assert out["amount"].dtype == np.float32
+    assert out["price"].dtype == np.float32
+    assert out["note"].dtype == "category"
+    assert out["free"].dtype != "category"      # too many distinct values
+    assert out["cashier"].tolist() == ["ann", "bob", "ann", "ann"]
+
+
+def test_amount_scale_keeps_exact_cents():
+    out = compact_frame(_sales(), amount_scale=100)
+    assert out["amount"].tolist() == [110, 225, 5, 1000]
+    assert out.attrs["amount_scale"] == 100
+
+
+def test_amount_scale_needs_every_value():
+    df = _sales()
+    df.loc[1, "amount"] = None
+    assert compact_frame(df, amount_scale=100)["amount"].dtype == np.float32
+
+
+def test_shared_categories_are_reused_across_frames():
+    a = compact_frame(pd.DataFrame({"cashier": ["zed", "amy"]}))
+    b = compact_frame(pd.DataFrame({"cashier": ["amy"]}))
+    assert list(b["cashier"].cat.categories) == list(a["cashier"].cat.categories)
+    assert {"zed", "amy", "Unknown"} <= set(shared_categories.categories("cashier"))
+
+
+def test_named_frames_are_reported():
+    compact_frame(_sales(), name="sales-test")
+    report = compact_report().set_index("frame")
+    row = report.loc["sales-test"]
+    assert row["rows"] == 4 and row["bytes_after"] < row["bytes_before"]
+    assert "TOTAL" in report.index
+
+
+def test_empty_frame_is_returned_as_is():
+    empty = pd.DataFrame()
+    assert compact_frame(empty) is empty
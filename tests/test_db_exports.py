@@ -0,0 +1,133 @@
+import io
+import threading
+
+import pytest
+from psycopg2 import OperationalError
+
+import db_handler
+from db_handler import DatabaseManager
+from db_resilience import CircuitBreaker
+
+
+class FakeCursor:
+    description = (("saleid",),)
+
+    def __init__(self, conn):
+        self.conn, self.rowcount = conn, -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def execute(self, sql, params=None):
+        self.conn.check()
+
+    def mogrify(self, sql, params=None):
+        return sql.encode()
+
+    def fetchmany(self, n):
+        self.conn.check()
+        return self.conn.chunks.pop(0) if self.conn.chunks else []
+
+    def copy_expert(self, sql, out):
+        self.conn.check()
+        out.write(b"saleid\n1\n")
+        if self.conn.drop_mid_copy:
+            raise OperationalError("server closed the connection")
+        self.rowcount = 1
+
+
+class FakeConn:
+    def __init__(self, dead=False, drop_mid_copy=False):
+        self.closed, self.timeout_ms = 0, None
+        self.dead, self.drop_mid_copy = dead, drop_mid_copy
+        self.chunks = [[(1,), (2,)], [(3,)]]
+
+    def check(self):
+        if self.dead:
+            raise OperationalError("server closed the connection")
+
+    def cursor(self, name=None):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.timeout_ms = None
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    fresh = []
+
+    def get_conn(dsn, key, per_session=True):
+        fresh.append(FakeConn())
+        return fresh[-1]
+
+    get_conn.clear = lambda: None
+    monkeypatch.setattr(db_handler, "get_conn", get_conn)
+    monkeypatch.setattr(db_handler, "breaker", CircuitBreaker())
+    db = DatabaseManager.__new__(DatabaseManager)
+    db.dsn, db._key, db.per_session = "dsn", "export-test", False
+    db._lock, db._conn = threading.RLock(), None
+    db.reconnects = fresh
+    return db
+
+
+def _lock_free(db) -> bool:
+    out = []
+
+    def probe():
+        out.append(db._lock.acquire(blocking=False))
+        if out[0]:
+            db._lock.release()
+
+    t = threading.Thread(target=probe)
+    t.start()
+    t.join()
+    return out[0]
+
+
+def test_stream_holds_the_connection_for_the_cursor_lifetime(manager):
+    manager.conn = FakeConn()
+    seen = []
+    for rows, _ in manager.stream_rows("q", chunk_rows=2):
+        seen.append(rows)
+        assert not _lock_free(manager)
+    assert seen == [[(1,), (2,)], [(3,)]]
+    assert _lock_free(manager)
+
+
+def test_stream_reconnects_once_before_the_first_row(manager):
+    manager.conn = FakeConn(dead=True)
+    rows = [r for chunk, _ in manager.stream_rows("q") for r in chunk]
+    assert rows == [(1,), (2,), (3,)] and len(manager.reconnects) == 1
+
+
+def test_stream_gives_up_after_one_reconnect(manager, monkeypatch):
+    def get_conn(dsn, key, per_session=True):
+        return FakeConn(dead=True)
+
+    get_conn.clear = lambda: None
+    monkeypatch.setattr(db_handler, "get_conn", get_conn)
+    manager.conn = FakeConn(dead=True)
+    with pytest.raises(OperationalError):
+        list(manager.stream_rows("q"))
+    assert db_handler.breaker.failures == 1 and _lock_free(manager)
+
+
+def test_copy_reconnects_once_before_writing(manager):
+    manager.conn = FakeConn(dead=True)
+    out = io.BytesIO()
+    assert manager.copy_out("q", None, out) == 1
+    assert out.getvalue() == b"saleid\n1\n" and len(manager.reconnects) == 1
+
+
+def test_copy_is_not_retried_once_output_started(manager):
+    manager.conn = FakeConn(drop_mid_copy=True)
+    with pytest.raises(OperationalError):
+        manager.copy_out("q", None, io.BytesIO())
+    assert manager.reconnects == [] and _lock_free(manager)
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+import db_resilience
+from db_resilience import CircuitBreaker, backoff_delays
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(db_resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _in_thread(func):
+    out = []
+    t = threading.Thread(target=lambda: out.append(func()))
+    t.start()
+    t.join()
+    return out[0]
+
+
+# ────────── CircuitBreaker ──────────
+def test_opens_after_threshold_failures(clock):
+    breaker = CircuitBreaker(threshold=3, reset_s=15)
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+    assert breaker.opens == 1
+
+
+def test_half_open_lets_exactly_one_probe_through(clock):
+    breaker = CircuitBreaker(threshold=1, reset_s=15)
+    breaker.failure()
+    clock[0] += 15
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert breaker.allow()                          # the probe's own reconnect
+    assert not _in_thread(breaker.allow)            # every other session waits
+
+
+def test_probe_outcome_closes_or_reopens(clock):
+    breaker = CircuitBreaker(threshold=1, reset_s=15)
+    breaker.failure()
+    clock[0] += 15
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open" and breaker.opens == 2
+    clock[0] += 15
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.failures == 0
+    assert _in_thread(breaker.allow)
+
+
+def test_release_frees_a_probe_without_a_verdict(clock):
+    breaker = CircuitBreaker(threshold=1, reset_s=15)
+    breaker.failure()
+    clock[0] += 15
+    assert breaker.allow()
+    _in_thread(breaker.release)                     # not the probe: no effect
+    assert not _in_thread(breaker.allow)
+    breaker.release()
+    assert breaker.state == "half_open" and _in_thread(breaker.allow)
+
+
+# ────────── backoff ──────────
+def test_backoff_is_jittered_below_a_capped_exponential():
+    for _ in range(200):
+        delays = list(backoff_delays(attempts=8, base=0.25, cap=2.0))
+        assert len(delays) == 7
+        for n, delay in enumerate(delays):
+            assert 0 <= delay <= min(2.0, 0.25 * 2 ** n)
+
+
+def test_backoff_draws_differ():
+    draws = {tuple(backoff_delays(attempts=4)) for _ in range(20)}
+    assert len(draws) > 1
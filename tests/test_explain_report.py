@@ -0,0 +1,24 @@
+import importlib.util
+import os
+
+import pytest
+
+_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                     "tools", "explain_report.py")
+_spec = importlib.util.spec_from_file_location("explain_report", _PATH)
+explain_report = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(explain_report)
+
+
+@pytest.mark.parametrize("name", sorted(explain_report.DASHBOARD_QUERIES))
+def test_params_match_placeholders(name):
+    sql, params = explain_report.DASHBOARD_QUERIES[name]
+    assert sql.count("%s") == len(params)
+
+
+def test_probe_names_are_known():
+    probes = {"recent_ids", "recent_items", "old_saleid", "top_saleid"}
+    for _, params in explain_report.DASHBOARD_QUERIES.values():
+        for p in params:
+            if isinstance(p, str) and p.startswith("{"):
+                assert p[1:-1] in probes
@@ -0,0 +1,64 @@
+import io
+import os
+import time
+
+import pytest
+
+import exporter
+from exporter import _CountingWriter, _to_csv, read_once, sweep_exports
+
+CSV = (b'saleid,note\n'
+       b'1,"two\nlines"\n'
+       b'2,"say ""hi""\nthere"\n'
+       b'3,plain\n')
+
+
+def _count(chunks) -> int:
+    seen = []
+    writer = _CountingWriter(io.BytesIO(), seen.append)
+    for chunk in chunks:
+        writer.write(chunk)
+    return seen[-1]
+
+
+def test_newlines_inside_quotes_are_not_rows():
+    assert _count([CSV]) == 3
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7])
+def test_count_survives_any_chunking(size):
+    assert _count([CSV[i:i + size] for i in range(0, len(CSV), size)]) == 3
+
+
+class FakeCopy:
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+
+    def copy_out(self, query, params, out):
+        out.write(CSV)
+        return self.rowcount
+
+
+def test_copy_row_count_wins_when_known():
+    assert _to_csv(FakeCopy(3), "q", None, io.BytesIO(), lambda rows: None) == 3
+    assert _to_csv(FakeCopy(-1), "q", None, io.BytesIO(), lambda rows: None) == 3
+
+
+def test_read_once_removes_the_file(tmp_path):
+    path = tmp_path / "viz-export-x.csv"
+    path.write_bytes(b"a\n")
+    assert read_once(str(path)) == b"a\n"
+    assert not path.exists()
+
+
+def test_sweep_removes_only_old_exports(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter, "EXPORT_DIR", str(tmp_path))
+    old, new, other = (tmp_path / n for n in ("viz-export-old.csv", "viz-export-new.csv",
+                                              "unrelated.csv"))
+    for p in (old, new, other):
+        p.write_bytes(b"")
+    past = time.time() - 7200
+    os.utime(old, (past, past))
+    os.utime(other, (past, past))
+    assert sweep_exports(max_age_s=3600) == 1
+    assert not old.exists() and new.exists() and other.exists()
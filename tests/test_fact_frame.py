@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pandas as pd
+
+import fact_frame
+from fact_frame import FactFrames, data_version
+from item_cost import STATE_COLS, ItemCostIndex
+
+
+class FakeDim:
+    max_xmin = 7
+
+    def __len__(self):
+        return 3
+
+
+class FakeScheduler:
+    def __init__(self, blocks=None):
+        self.blocks = blocks
+
+    def snapshot(self, name, timeout=None):
+        return self.blocks
+
+
+def _blocks(*saleids):
+    return {"sales": pd.DataFrame({"saleid": list(saleids)}),
+            "salesitems": pd.DataFrame({"saleid": list(saleids)})}
+
+
+def test_late_sale_entering_the_last_n_moves_the_version(monkeypatch):
+    monkeypatch.setattr(fact_frame, "get_item_dim", FakeDim)
+    monkeypatch.setattr(fact_frame, "get_scheduler", FakeScheduler)
+    monkeypatch.setattr(fact_frame, "get_cost_index", ItemCostIndex)
+    # 98 commits late and pushes 95 out; newest id and line count stay put
+    before, after = _blocks(100, 99, 97, 96, 95), _blocks(100, 99, 98, 97, 96)
+    assert data_version(before) != data_version(after)
+    assert data_version(_blocks(100, 99)) == data_version(_blocks(100, 99))
+
+
+def test_cost_rebuild_with_unchanged_costs_keeps_the_version(monkeypatch):
+    costs = ItemCostIndex()
+    monkeypatch.setattr(fact_frame, "get_item_dim", FakeDim)
+    monkeypatch.setattr(fact_frame, "get_cost_index", lambda: costs)
+    state = pd.DataFrame([[7, 2.0, 2.0, 20.0, 10.0, 2.0]], columns=["itemid", *STATE_COLS])
+    blocks = _blocks(2, 1)
+    costs.install(state)
+    before = data_version(blocks)
+    costs.install(state.copy())                   # the 120 s job reran, nothing changed
+    assert data_version(blocks) == before
+    costs.record({"itemid": 7, "cost_per_unit": 3.0, "quantity": 5})
+    assert data_version(blocks) != before
+
+
+def test_one_build_per_version_outside_the_lock(monkeypatch):
+    scheduler = FakeScheduler(_blocks(3, 2, 1))
+    monkeypatch.setattr(fact_frame, "get_scheduler", lambda: scheduler)
+    monkeypatch.setattr(fact_frame, "data_version",
+                        lambda blocks: tuple(blocks["sales"]["saleid"]))
+    monkeypatch.setattr(fact_frame, "facts_db", lambda: None)
+    frames, builds = FactFrames(), []
+
+    def build(db, sales, salesitems):
+        builds.append(1)
+        assert not frames._lock.locked()          # readers are not blocked meanwhile
+        time.sleep(0.05)
+        return sales.assign(line=1)
+
+    monkeypatch.setattr(fact_frame, "build_facts", build)
+    threads = [threading.Thread(target=frames.get, args=(2,)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(builds) == 1
+    assert frames.get(2)["saleid"].tolist() == [3, 2]
+
+    scheduler.blocks = _blocks(4, 3, 2, 1)
+    assert frames.get(2)["saleid"].tolist() == [4, 3]
+    assert len(builds) == 2
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from heatmap_pyramid import HeatmapPyramid, auto_level, row_bounds
+
+
+@pytest.mark.parametrize("days, level", [(1, "day_hour"), (92, "day_hour"),
+                                         (93, "month_day"), (3 * 366, "month_day"),
+                                         (3 * 366 + 1, "year_month")])
+def test_auto_level_by_span(days, level):
+    start = pd.Timestamp("2024-01-01")
+    assert auto_level(start, start + pd.Timedelta(days=days)) == level
+
+
+def test_row_bounds():
+    assert row_bounds("year_month", 2024) == (pd.Timestamp("2024-01-01"),
+                                              pd.Timestamp("2025-01-01"))
+    assert row_bounds("month_day", "2024-02-01") == (pd.Timestamp("2024-02-01"),
+                                                     pd.Timestamp("2024-03-01"))
+    assert row_bounds("day_hour", "2024-02-29") == (pd.Timestamp("2024-02-29"),
+                                                    pd.Timestamp("2024-03-01"))
+
+
+def _pyramid() -> HeatmapPyramid:
+    p = HeatmapPyramid()
+    p.add_hourly(pd.DataFrame({"hour":  ["2024-02-28 09:00", "2024-02-29 09:00",
+                                         "2024-03-01 17:00"],
+                               "total": [10.0, 5.0, 2.0]}))
+    # a late sale in an hour already folded
+    p.add_hourly(pd.DataFrame({"hour": ["2024-02-29 09:00"], "total": [1.0]}))
+    return p
+
+
+def test_late_rows_add_to_every_level():
+    p = _pyramid()
+    assert p.hourly[pd.Timestamp("2024-02-29 09:00")] == 6.0
+    assert p.daily[pd.Timestamp("2024-02-29")] == 6.0
+    assert p.monthly.to_dict() == {pd.Timestamp("2024-02-01"): 16.0,
+                                   pd.Timestamp("2024-03-01"): 2.0}
+
+
+def test_pivots_agree_with_totals():
+    p = _pyramid()
+    start, end = pd.Timestamp("2024-02-01"), pd.Timestamp("2024-04-01")
+    days = p.pivot("month_day", start, end)
+    assert days.loc[pd.Timestamp("2024-02-01"), 29] == 6.0
+    assert np.isnan(days.loc[pd.Timestamp("2024-02-01"), 30])     # no 30 February
+    assert p.pivot("year_month", start, end).loc[2024, 2] == 16.0
+    hours = p.pivot("day_hour", "2024-03-01", "2024-03-02")
+    assert hours.shape == (1, 24) and hours.loc[pd.Timestamp("2024-03-01"), 17] == 2.0
@@ -0,0 +1,72 @@
+import pandas as pd
+
+from heavy_hitters import HeavyHitters, exact_recount, merge_summaries
+
+
+def _summary(hour, counts, errors=None):
+    return pd.DataFrame({"hour": pd.Timestamp(hour), "itemid": list(counts),
+                         "count": [float(c) for c in counts.values()],
+                         "error": [float(e) for e in (errors or dict.fromkeys(counts, 0)).values()]})
+
+
+def test_merge_summaries_bounds_true_totals():
+    # true totals: 1 → 13, 2 → 7, 3 → 5 (3 fell out of hour 0, whose floor is 2)
+    counters = pd.concat([_summary("2024-01-01 00:00", {1: 10, 2: 4}),
+                          _summary("2024-01-01 01:00", {1: 3, 2: 3, 3: 3})], ignore_index=True)
+    floors = pd.Series([2.0, 0.0], index=pd.DatetimeIndex(["2024-01-01 00:00",
+                                                           "2024-01-01 01:00"], name="hour"))
+    merged, floor = merge_summaries(counters, floors)
+    merged = merged.set_index("itemid")
+    truth = {1: 13, 2: 7, 3: 5}
+    for item, total in truth.items():
+        assert merged.at[item, "count"] - merged.at[item, "error"] <= total <= merged.at[item, "count"]
+    assert merged.at[3, "count"] == 5.0
+    assert floor == 2.0
+
+
+def test_merge_summaries_truncation_raises_floor():
+    counters = _summary("2024-01-01", {1: 9, 2: 5, 3: 2})
+    floors = pd.Series([0.0], index=pd.DatetimeIndex(["2024-01-01"], name="hour"))
+    merged, floor = merge_summaries(counters, floors, capacity=2)
+    assert merged["itemid"].tolist() == [1, 2]
+    assert floor == 2.0
+
+
+def test_top_marks_only_separated_items_guaranteed():
+    hh = HeavyHitters()
+    hh.counters["quantity"] = _summary("2024-01-01 10:00", {1: 50, 2: 12, 3: 11, 4: 1})
+    hh.floors["quantity"] = pd.Series([0.0], index=pd.DatetimeIndex(["2024-01-01 10:00"],
+                                                                   name="hour"))
+    top = hh.top("quantity", "2024-01-01 10:30", "2024-01-01 11:00", k=2)
+    assert top["itemid"].tolist() == [1, 2]
+    assert top["guaranteed"].tolist() == [True, True]
+    top = hh.top("quantity", "2024-01-01 10:00", "2024-01-01 11:00", k=1)
+    assert top["guaranteed"].tolist() == [True]
+
+    hh.counters["quantity"] = _summary("2024-01-01 10:00", {1: 50, 2: 12, 3: 11},
+                                       {1: 0, 2: 5, 3: 0})
+    top = hh.top("quantity", "2024-01-01 10:00", "2024-01-01 11:00", k=2)
+    assert top["guaranteed"].tolist() == [True, False]
+
+
+class FakeLines:
+    def __init__(self):
+        self.params = None
+
+    def fetch_data(self, sql, params):
+        self.params = params
+        return pd.DataFrame()
+
+
+def test_exact_recount_uses_the_ranked_hours():
+    db = FakeLines()
+    out = exact_recount(db, [5, 6], "2024-01-01 10:45", "2024-01-01 12:00")
+    assert db.params[0] == pd.Timestamp("2024-01-01 10:00")
+    assert db.params[2] == [5, 6]
+    assert list(out.columns) == ["itemid", "quantity", "totalprice", "lines"]
+
+
+def test_exact_recount_without_candidates_skips_the_query():
+    db = FakeLines()
+    out = exact_recount(db, [], "2024-01-01", "2024-01-02")
+    assert out.empty and db.params is None
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from item_cost import STATE_COLS, ItemCostIndex
+
+
+class FakeInventory:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetch_data(self, sql, params=None):
+        return pd.DataFrame(self.rows, columns=["itemid", *STATE_COLS])
+
+
+def test_first_receipt_sets_every_method():
+    index = ItemCostIndex()
+    index.record({"itemid": 7, "cost_per_unit": 2.0, "quantity": 10})
+    for method in ("min", "latest", "wavg", "fifo"):
+        assert index.lookup([7], method).tolist() == [2.0]
+
+
+def test_later_receipts_fold_into_running_state():
+    index = ItemCostIndex()
+    index.record({"itemid": 7, "cost_per_unit": 2.0, "quantity": 10})
+    index.record({"itemid": 7, "cost_per_unit": 3.0, "quantity": 30})
+    index.record({"itemid": 7, "cost_per_unit": 1.5, "quantity": 0})
+    assert index.lookup([7], "min").tolist() == [1.5]
+    assert index.lookup([7], "latest").tolist() == [1.5]
+    assert index.lookup([7], "wavg").tolist() == [pytest.approx(2.75)]
+    assert index.lookup([7], "fifo").tolist() == [2.0]     # oldest batch in stock
+    assert index.stats["recorded"] == 3
+
+
+def test_out_of_stock_item_falls_back_to_latest():
+    index = ItemCostIndex()
+    index.record({"itemid": 3, "cost_per_unit": 4.0, "quantity": 0})
+    assert index.lookup([3], "wavg").tolist() == [4.0]
+    assert index.lookup([3], "fifo").tolist() == [4.0]
+
+
+def test_incomplete_receipts_are_ignored():
+    index = ItemCostIndex()
+    index.record({"itemid": None, "cost_per_unit": 1.0})
+    index.record({"itemid": 1})
+    assert len(index) == 0
+
+
+def test_record_swaps_rather_than_edits_the_state():
+    index = ItemCostIndex()
+    index.record({"itemid": 1, "cost_per_unit": 1.0, "quantity": 1})
+    before = index.state
+    index.record({"itemid": 2, "cost_per_unit": 5.0, "quantity": 1})
+    assert len(before) == 1 and len(index.state) == 2
+
+
+def test_unknown_items_cost_nan():
+    index = ItemCostIndex()
+    index.record({"itemid": 1, "cost_per_unit": 1.0, "quantity": 1})
+    assert np.isnan(index.lookup([1, 99])[1])
+
+
+def test_rebuild_matches_recorded_state():
+    index = ItemCostIndex()
+    index.rebuild(FakeInventory([(5, 1.0, 2.0, 30.0, 12.0, 1.0)]))
+    assert index.lookup([5], "wavg").tolist() == [2.5]
+    index.record({"itemid": 5, "cost_per_unit": 3.0, "quantity": 12})
+    assert index.lookup([5], "wavg").tolist() == [pytest.approx(66 / 24)]
+
+
+def test_rebuild_of_empty_inventory():
+    index = ItemCostIndex()
+    assert index.rebuild(FakeInventory([])) == 0
+    assert np.isnan(index.lookup([1])).all()
+
+
+def test_receipt_sets_min_cost_after_null_costs():
+    index = ItemCostIndex()
+    index.install(pd.DataFrame([[7, np.nan, np.nan, 0.0, 0.0, np.nan]],
+                               columns=["itemid", *STATE_COLS]))
+    index.record({"itemid": 7, "cost_per_unit": 2.5, "quantity": 4})
+    assert index.lookup([7], "min").tolist() == [2.5]
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from quantiles import (ALPHA, GAMMA, ZERO_KEY, QuantileSketches, _normalise, bucket_keys,
+                       bucket_values, sketch_quantiles)
+
+
+def test_bucket_keys_bracket_values():
+    values = np.array([0.01, 0.5, 1.0, 3.7, 99.99, 12345.0])
+    keys = bucket_keys(values)
+    assert np.all(GAMMA ** (keys - 1) < values)
+    assert np.all(values <= GAMMA ** keys * (1 + 1e-12))
+
+
+def test_non_positive_values_share_the_zero_bucket():
+    keys = bucket_keys([0.0, -4.5, 2.0])
+    assert keys[0] == keys[1] == ZERO_KEY
+    assert bucket_values(keys[:2]).tolist() == [0.0, 0.0]
+
+
+def test_bucket_values_within_relative_error():
+    values = np.geomspace(0.05, 50_000, 500)
+    approx = bucket_values(bucket_keys(values))
+    assert np.all(np.abs(approx - values) <= ALPHA * values * (1 + 1e-9))
+
+
+def test_sketch_quantiles_within_relative_error():
+    rng = np.random.default_rng(7)
+    values = rng.lognormal(3, 1, 20_000)
+    keys, counts = np.unique(bucket_keys(values), return_counts=True)
+    qs = [0.5, 0.9, 0.99]
+    got = sketch_quantiles(keys, counts, qs)
+    exact = np.quantile(values, qs, method="lower")
+    assert np.all(np.abs(got - exact) <= ALPHA * exact * (1 + 1e-9))
+
+
+def test_sketch_quantiles_of_empty_sketch():
+    assert np.isnan(sketch_quantiles([], [], [0.5, 0.9])).all()
+
+
+def test_period_quantiles_merge_hourly_sketches():
+    rng = np.random.default_rng(3)
+    amounts = {"09:00": rng.lognormal(2, 0.5, 3000), "10:00": rng.lognormal(3, 0.5, 3000)}
+    rows = []
+    for hour, values in amounts.items():
+        keys, counts = np.unique(bucket_keys(values), return_counts=True)
+        rows.append(pd.DataFrame({"hour": pd.Timestamp(f"2024-01-01 {hour}"),
+                                  "cashier": "ann", "key": keys, "count": counts}))
+    sketches = QuantileSketches(path=None)
+    sketches.install(_normalise(pd.concat(rows, ignore_index=True), "cashier"),
+                     sketches.items, pd.Timestamp("2024-01-01 11:00"), 0)
+
+    both = sketches.quantiles("cashier", "2024-01-01 09:00", "2024-01-01 11:00")
+    exact = np.quantile(np.concatenate(list(amounts.values())), 0.9, method="lower")
+    assert both.loc[0, "count"] == 6000
+    assert abs(both.loc[0, "p90"] - exact) <= ALPHA * exact * (1 + 1e-9)
+
+    # hourly resolution: the start is floored to its hour
+    first = sketches.quantiles("cashier", "2024-01-01 09:30", "2024-01-01 10:00")
+    assert first.loc[0, "count"] == 3000
+    second = sketches.quantiles("cashier", "2024-01-01 09:30", "2024-01-01 10:30")
+    assert second.loc[0, "count"] == 6000
@@ -0,0 +1,73 @@
+from query_plans import explainable, plan_summary, statement_shape, suggest_indexes
+
+PLAN = [{
+    "Plan": {
+        "Node Type": "Limit", "Shared Hit Blocks": 120, "Shared Read Blocks": 30,
+        "Plans": [{
+            "Node Type": "Sort", "Sort Key": ["s.saletime DESC"],
+            "Plans": [{
+                "Node Type": "Hash Join", "Hash Cond": "(si.saleid = s.saleid)",
+                "Plans": [
+                    {"Node Type": "Seq Scan", "Relation Name": "salesitems", "Alias": "si",
+                     "Actual Rows": 400, "Actual Loops": 2, "Rows Removed by Filter": 50,
+                     "Filter": "(itemid = ANY ('{1,2}'::bigint[]))"},
+                    {"Node Type": "Hash", "Plans": [
+                        {"Node Type": "Seq Scan", "Relation Name": "sales", "Alias": "s",
+                         "Actual Rows": 90, "Actual Loops": 1,
+                         "Filter": "(saletime >= '2024-01-01 00:00:00'::timestamp without time zone)",
+                         "Rows Removed by Filter": 910}]},
+                ],
+            }],
+        }],
+    },
+    "Planning Time": 0.4,
+    "Execution Time": 12.5,
+}]
+
+
+def test_plan_summary_totals():
+    summary = plan_summary(PLAN)
+    assert (summary["execution_ms"], summary["planning_ms"]) == (12.5, 0.4)
+    assert (summary["shared_hit"], summary["shared_read"]) == (120, 30)
+
+
+def test_plan_summary_seq_scans():
+    items, sales = plan_summary(PLAN)["seq_scans"]
+    assert (items["relation"], items["rows"], items["rows_removed"], items["scanned"]) \
+        == ("salesitems", 800, 100, 900)
+    assert items["filter_columns"] == ["itemid"]
+    assert items["join_columns"] == ["saleid"]
+    assert items["sort_columns"] == ["saletime"]
+    assert (sales["relation"], sales["scanned"]) == ("sales", 1000)
+    assert sales["filter_columns"] == ["saletime"]
+    assert sales["join_columns"] == ["saleid"]
+
+
+def test_suggest_indexes_for_large_tables_only():
+    scans = plan_summary(PLAN)["seq_scans"]
+    out = suggest_indexes(scans, {"salesitems": 900, "sales": 50}, min_rows=100)
+    assert [(s["table"], s["columns"], s["reason"]) for s in out] == [
+        ("salesitems", ["itemid"], "filter"),
+        ("salesitems", ["saletime"], "order by … limit"),
+        ("salesitems", ["saleid"], "join"),
+    ]
+    assert out[0]["sql"] == ("CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                             "salesitems_itemid_idx ON salesitems (itemid);")
+
+
+def test_suggest_indexes_skips_leading_index_columns():
+    scans = plan_summary(PLAN)["seq_scans"]
+    out = suggest_indexes(scans, {"salesitems": 900, "sales": 50},
+                          {"salesitems": [["itemid"], ["saleid"]]}, min_rows=100)
+    assert [s["reason"] for s in out] == ["order by … limit"]
+
+
+def test_statement_shape_ignores_literals():
+    assert statement_shape("SELECT * FROM s  WHERE id = 42 AND n = 'o''k'") == \
+        statement_shape("SELECT * FROM s WHERE id = %s AND n = $2")
+
+
+def test_only_plain_reads_are_explainable():
+    assert explainable("WITH x AS (SELECT 1) SELECT * FROM x")
+    assert not explainable("SELECT * FROM sales FOR UPDATE")
+    assert not explainable("UPDATE sales SET x = 1")
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from caching import ResultCache
+
+
+def _blob(seed: int, rows: int = 2000) -> pd.DataFrame:
+    # random floats barely compress, so each entry has a predictable size
+    return pd.DataFrame({"x": np.random.default_rng(seed).random(rows)})
+
+
+def _size(value) -> int:
+    cache = ResultCache(budget_bytes=1 << 30)
+    cache.put("k", value)
+    return cache.metrics()["bytes"]
+
+
+def test_hit_returns_an_equal_copy():
+    cache, df = ResultCache(), _blob(1)
+    cache.put("k", df)
+    hit, value = cache.get("k", ttl=60)
+    assert hit and value is not df
+    pd.testing.assert_frame_equal(value, df)
+
+
+def test_lru_stays_within_budget():
+    size = _size(_blob(0))
+    cache = ResultCache(budget_bytes=int(size * 2.5))
+    for i in range(3):
+        cache.put(i, _blob(i))
+    assert cache.metrics()["bytes"] <= cache.budget_bytes
+    assert cache.stats["evictions"] == 1
+    assert cache.get(0, ttl=60)[0] is False
+    assert cache.get(2, ttl=60)[0] is True
+
+
+def test_lru_evicts_least_recently_used():
+    size = _size(_blob(0))
+    cache = ResultCache(budget_bytes=int(size * 2.5))
+    cache.put("a", _blob(1))
+    cache.put("b", _blob(2))
+    cache.get("a", ttl=60)
+    cache.put("c", _blob(3))
+    assert cache.get("b", ttl=60)[0] is False
+    assert cache.get("a", ttl=60)[0] is True
+
+
+def test_lfu_evicts_least_used():
+    size = _size(_blob(0))
+    cache = ResultCache(budget_bytes=int(size * 2.5), policy="lfu")
+    cache.put("a", _blob(1))
+    cache.put("b", _blob(2))
+    for _ in range(3):
+        cache.get("a", ttl=60)
+    cache.get("b", ttl=60)
+    cache.put("c", _blob(3))
+    assert cache.get("b", ttl=60)[0] is False
+    assert cache.get("a", ttl=60)[0] is True
+
+
+def test_value_larger_than_budget_is_rejected():
+    cache = ResultCache(budget_bytes=100)
+    cache.put("k", _blob(1))
+    assert cache.stats["rejected"] == 1 and cache.metrics()["entries"] == 0
+
+
+def test_expired_entry_is_kept_for_get_stale():
+    cache = ResultCache()
+    cache.put("k", {"a": 1})
+    assert cache.get("k", ttl=-1) == (False, None)
+    assert cache.get_stale("k") == (True, {"a": 1})
+
+
+def test_replacing_a_key_does_not_double_count():
+    cache = ResultCache()
+    cache.put("k", _blob(1))
+    first = cache.metrics()["bytes"]
+    cache.put("k", _blob(2))
+    assert abs(cache.metrics()["bytes"] - first) < first * 0.05
+    assert cache.metrics()["entries"] == 1
+
+
+def test_arrow_cannot_type_falls_back_to_pickle():
+    cache = ResultCache()
+    df = pd.DataFrame({"j": [{"a": 1}, [1, 2], "x"]})
+    cache.put("k", df)
+    hit, value = cache.get("k", ttl=60)
+    assert hit and value["j"].tolist() == df["j"].tolist()
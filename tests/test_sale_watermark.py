@@ -0,0 +1,85 @@
+import pandas as pd
+
+import sale_watermark
+from sale_watermark import SaleWatermark, sale_batch
+from sales_buckets import MinuteBuckets
+
+
+class FakeSales:
+    """Committed saleids; answers the watermark's visible-ids query."""
+
+    def __init__(self, *ids):
+        self.committed = set(ids)
+
+    def fetch_data(self, sql, params):
+        after, through, ids = params
+        seen = [i for i in self.committed if after < i <= through or i in ids]
+        return pd.DataFrame({"saleid": pd.Series(seen, dtype="int64")})
+
+
+def folded(batch, committed) -> set[int]:
+    """What a query filtered by ``sale_batch`` would read for ``batch``."""
+    after, through, ids = batch
+    return {i for i in committed if after < i <= through or i in ids}
+
+
+def run(wm: SaleWatermark, db: FakeSales) -> set[int]:
+    batch = wm.batch(db, max(db.committed, default=0))
+    wm.advance()
+    return folded(batch, db.committed) if batch else set()
+
+
+def test_sale_batch_filter():
+    assert sale_batch("s.saleid") == \
+        "((s.saleid > %s AND s.saleid <= %s) OR s.saleid = ANY(%s::bigint[]))"
+
+
+def test_late_commit_is_folded_exactly_once():
+    db, wm = FakeSales(1, 2, 4, 5), SaleWatermark()
+    assert run(wm, db) == {1, 2, 4, 5}
+    assert wm.state == (5, (3,))
+
+    db.committed |= {3, 6}
+    assert run(wm, db) == {3, 6}
+    assert wm.state == (6, ())
+    assert run(wm, db) == set()
+
+
+def test_nothing_new_gives_no_batch():
+    db, wm = FakeSales(1, 2), SaleWatermark()
+    run(wm, db)
+    assert wm.batch(db, 2) is None
+    wm.advance()
+    assert wm.state == (2, ())
+
+
+def test_batch_does_not_move_until_advanced():
+    db, wm = FakeSales(1, 3), SaleWatermark()
+    first = wm.batch(db, 3)
+    assert wm.state == (0, ())
+    assert wm.batch(db, 3) == first
+
+
+def test_old_gaps_are_given_up(monkeypatch):
+    monkeypatch.setattr(sale_watermark, "LATE_SALE_IDS", 3)
+    db, wm = FakeSales(1, 3), SaleWatermark()
+    run(wm, db)
+    assert wm.gaps == [2]
+    db.committed |= {4, 5, 6}
+    run(wm, db)
+    assert wm.gaps == []                      # 2 is now more than 3 ids behind
+    db.committed.add(2)
+    assert run(wm, db) == set()
+
+
+def test_ids_behind_the_window_are_read_by_range(monkeypatch):
+    monkeypatch.setattr(sale_watermark, "LATE_SALE_IDS", 2)
+    db, wm = FakeSales(*range(1, 11)), SaleWatermark()
+    after, through, ids = wm.batch(db, 10)
+    assert (after, through, ids) == (0, 8, [9, 10])
+
+
+def test_window_totals_by_group_when_empty():
+    totals = MinuteBuckets().window_totals("Last 1 h", by="familycat")
+    assert totals.empty and totals.index.name == "familycat"
+    assert list(totals.columns) == ["quantity", "totalprice", "revenue", "lines"]
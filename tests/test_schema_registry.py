@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+import schema_registry
+from schema_registry import SchemaRegistry
+
+
+@pytest.fixture
+def registry():
+    reg = SchemaRegistry()
+    reg.columns_df = pd.DataFrame({
+        "table_name":  ["sales", "sales", "sales", 'odd"table'],
+        "column_name": ["saleid", "saletime", 'we"ird', "id"],
+        "data_type":   ["bigint", "timestamp without time zone", "text", "integer"],
+        "avg_width":   [8, 8, 12, 4],
+    })
+    return reg
+
+
+def test_select_sql_quotes_identifiers_and_passes_values(registry):
+    sql, params = registry.select_sql(
+        "sales", ["saleid", 'we"ird', "nope"],
+        filters=[("saleid", ">=", 10), ('we"ird', "contains", "a'b"), ("saletime", "=", "")],
+        order_by="saletime")
+    assert sql == ('SELECT "saleid", "we""ird" FROM "sales" '
+                   'WHERE "saleid" >= %s AND "we""ird"::text ILIKE %s '
+                   'ORDER BY "saletime" DESC')
+    assert params == [10, "%a'b%"]
+
+
+def test_select_sql_drops_unknown_columns_and_operators(registry):
+    sql, params = registry.select_sql(
+        'odd"table', ["missing"], filters=[("id", "; DROP", 1), ("ghost", "=", 1)],
+        order_by="ghost", descending=False)
+    assert sql == 'SELECT "id" FROM "odd""table"'
+    assert params == []
+
+
+def test_select_sql_rejects_unknown_tables(registry):
+    with pytest.raises(KeyError):
+        registry.select_sql("users; --")
+
+
+class FakeCatalog:
+    def __init__(self, columns):
+        self.fingerprint, self.columns, self.reads = "v1", columns, 0
+
+    def fetch_data(self, sql, params=None):
+        if sql is schema_registry._FINGERPRINT_SQL:
+            return pd.DataFrame({"v": [self.fingerprint]})
+        self.reads += 1
+        return self.columns
+
+
+def test_ensure_reloads_only_when_the_fingerprint_moves(registry, monkeypatch):
+    monkeypatch.setattr(schema_registry, "CHECK_EVERY_S", 0.0)
+    db = FakeCatalog(registry.columns_df)
+    reg = SchemaRegistry()
+    reg.ensure(db)
+    loads = reg.loads
+    reg.ensure(db)
+    assert reg.loads == loads
+    db.fingerprint = "v2"                  # e.g. ALTER TABLE … ADD COLUMN
+    reg.ensure(db)
+    assert reg.loads == loads + 1 and reg.fingerprint == "v2"
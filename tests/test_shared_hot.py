@@ -0,0 +1,39 @@
+import os
+
+import pandas as pd
+import pytest
+
+from shared_hot import KEEP_VERSIONS, HotStore
+
+pytest.importorskip("pyarrow")
+
+
+def _parts(n):
+    return {"rows": pd.DataFrame({"saleid": [n, n + 1], "amount": [1.5, 2.5]})}
+
+
+def test_publish_then_read_the_latest_version(tmp_path):
+    writer, reader = HotStore(str(tmp_path)), HotStore(str(tmp_path))
+    assert reader.read("blocks", ["rows"]) is None
+    assert writer.publish("blocks", _parts(1)) == 1
+    pd.testing.assert_frame_equal(reader.read("blocks", ["rows"])["rows"], _parts(1)["rows"])
+    assert writer.publish("blocks", _parts(5)) == 2
+    assert reader.read("blocks", ["rows"])["rows"]["saleid"].tolist() == [5, 6]
+
+
+def test_old_versions_are_unlinked(tmp_path):
+    store = HotStore(str(tmp_path))
+    for n in range(KEEP_VERSIONS + 2):
+        store.publish("blocks", _parts(n))
+    latest = store.version("blocks")
+    kept = sorted(int(f.split(".")[1]) for f in os.listdir(tmp_path) if f.endswith(".arrow"))
+    assert kept == list(range(latest - KEEP_VERSIONS + 1, latest + 1))
+    assert not any(f.endswith(".tmp") for f in os.listdir(tmp_path))
+
+
+def test_one_writer_until_it_lets_go(tmp_path):
+    first, second = HotStore(str(tmp_path)), HotStore(str(tmp_path))
+    assert first.is_writer() and first.is_writer()
+    assert not second.is_writer()
+    first._lock_file.close()                  # the writer process exits
+    assert second.is_writer()
@@ -0,0 +1,181 @@
+"""Flag sequential scans in dashboard query plans and suggest indexes.
+
+    python tools/explain_report.py --dsn postgresql://localhost/viz_synthetic
+    python tools/explain_report.py --dsn ... --apply        # create, then re-time
+
+Runs EXPLAIN (ANALYZE, BUFFERS) on the dashboard's recurring query
+shapes. It also reads the plans DatabaseManager sampled in production
+(``VIZ_PLAN_LOG``, see query_plans.PlanSampler). Every Seq Scan on a
+table of at least --min-rows rows is listed, together with a CREATE
+INDEX suggestion for its filter, ORDER BY … LIMIT or join column.
+"""
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_handler import PREPARED_STATEMENTS                  # noqa: E402
+from item_cost import _COST_STATE_SQL                       # noqa: E402
+from query_plans import (LARGE_TABLE_ROWS, PLAN_LOG, plan_summary,  # noqa: E402
+                         statement_shape, suggest_indexes)
+from sales_buckets import _NEW_BUCKETS_SQL                  # noqa: E402
+from schema_registry import SchemaRegistry                  # noqa: E402
+
+DEFAULT_DSN = os.environ.get("VIZ_LOCAL_DSN", "postgresql://localhost/viz_synthetic")
+
+
+def _adhoc(name: str) -> str:
+    return PREPARED_STATEMENTS[name][1].replace("$1", "%s")
+
+
+# name → (SQL, params); "{recent_ids}" etc. are replaced by values from _probes
+DASHBOARD_QUERIES = {
+    "recent sales (ORDER BY saleid DESC LIMIT n)": (_adhoc("recent_sales"), (2000,)),
+    "salesitems WHERE saleid IN (…)":   (_adhoc("salesitems_by_sale"), ("{recent_ids}",)),
+    "items by id":                      (_adhoc("items_by_id"), ("{recent_items}",)),
+    "sales WHERE saletime >= now - 7 d": (
+        "SELECT saleid, saletime, totalamount, cashier FROM sales "
+        "WHERE saletime >= LOCALTIMESTAMP - INTERVAL '7 days'", ()),
+    # the (after, through, ids, horizon) batch MinuteBuckets.refresh reads
+    "minute buckets (saleid > n, last 7 d)": (
+        _NEW_BUCKETS_SQL, ("{old_saleid}", "{top_saleid}", [], 7)),
+    "inventory lookup by item": (
+        "SELECT itemid, quantity, cost_per_unit FROM inventory WHERE itemid = ANY(%s)",
+        ("{recent_items}",)),
+    "inventory cost state": (_COST_STATE_SQL, ()),
+}
+
+
+class _DB:
+    """The one method SchemaRegistry needs, on a plain psycopg2 connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def fetch_data(self, sql, params=None):
+        with self.conn.cursor() as cur:
+            cur.execute(sql, params or ())
+            rows = cur.fetchall()
+            cols = [c[0] for c in cur.description]
+        return pd.DataFrame(rows, columns=cols)
+
+
+def _fill(params, probes: dict):
+    return tuple(probes[p[1:-1]] if isinstance(p, str) and p.startswith("{") else p
+                 for p in params)
+
+
+def _probes(db: _DB) -> dict:
+    ids = db.fetch_data("SELECT saleid FROM sales ORDER BY saleid DESC LIMIT 2000")["saleid"]
+    items = db.fetch_data("SELECT DISTINCT itemid FROM salesitems WHERE saleid = ANY(%s)",
+                          (ids.tolist(),))["itemid"]
+    top = int(ids.max()) if len(ids) else 0
+    return {"recent_ids": ids.tolist(), "recent_items": items.tolist(),
+            "old_saleid": max(top - 50_000, 0), "top_saleid": top}
+
+
+def explain(db: _DB, sql: str, params) -> dict:
+    plan = db.fetch_data(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params).iat[0, 0]
+    db.conn.rollback()
+    return plan_summary(json.loads(plan) if isinstance(plan, str) else plan)
+
+
+def sampled_plans(path: str) -> dict:
+    """Latest captured plan per statement shape from the sampler's log."""
+    out = {}
+    if not path or not os.path.exists(path):
+        return out
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec.get("plan"):
+                out[rec["shape"]] = rec
+    return out
+
+
+def report(summaries: dict, table_rows: dict, existing: dict, min_rows: int) -> list[dict]:
+    suggestions = []
+    for name, s in summaries.items():
+        big = [x for x in s["seq_scans"] if table_rows.get(x["relation"], 0) >= min_rows]
+        flag = "SEQ SCAN" if big else "ok"
+        print(f"\n[{flag}] {name}")
+        print(f"    execution {s['execution_ms'] or 0:9.1f} ms   "
+              f"buffers hit {s['shared_hit'] or 0:,} / read {s['shared_read'] or 0:,}")
+        for x in big:
+            print(f"    seq scan on {x['relation']} ({table_rows[x['relation']]:,} rows, "
+                  f"{x['rows_removed']:,} removed by filter {x['filter'] or '-'})")
+        for sug in suggest_indexes(big, table_rows, existing, min_rows):
+            sug["query"] = name
+            suggestions.append(sug)
+    return suggestions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--dsn", default=DEFAULT_DSN)
+    ap.add_argument("--log", default=PLAN_LOG, help="plan log written by the app")
+    ap.add_argument("--min-rows", type=int, default=LARGE_TABLE_ROWS)
+    ap.add_argument("--apply", action="store_true",
+                    help="create the suggested indexes and time the queries again")
+    args = ap.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    db = _DB(conn)
+    registry = SchemaRegistry().ensure(db)
+    existing = {}
+    for _, row in registry.indexes_df.iterrows():
+        existing.setdefault(row["table_name"], []).append(list(row["columns"]))
+    counts = db.fetch_data("""
+        SELECT c.relname, GREATEST(c.reltuples, 0)::bigint AS n
+          FROM pg_class c JOIN pg_namespace ns ON ns.oid = c.relnamespace
+         WHERE ns.nspname = 'public' AND c.relkind IN ('r', 'p')""")
+    table_rows = dict(zip(counts["relname"], counts["n"]))
+    probes = _probes(db)
+
+    print("=== dashboard queries ===")
+    before = {name: explain(db, sql, _fill(params, probes))
+              for name, (sql, params) in DASHBOARD_QUERIES.items()}
+    suggestions = report(before, table_rows, existing, args.min_rows)
+
+    captured = sampled_plans(args.log)
+    if captured:
+        print(f"\n=== {len(captured)} plans sampled by the app ({args.log}) ===")
+        known = {statement_shape(sql) for sql, _ in DASHBOARD_QUERIES.values()}
+        extra = {shape[:90]: plan_summary(rec["plan"])
+                 for shape, rec in captured.items() if shape not in known}
+        suggestions += report(extra, table_rows, existing, args.min_rows)
+
+    unique = list({s["sql"]: s for s in suggestions}.values())
+    print("\n=== suggested indexes ===")
+    if not unique:
+        print("none: no sequential scans on large tables")
+    for s in unique:
+        print(f"-- {s['query']}: {s['reason']} on {s['table']} ({s['table_rows']:,} rows)")
+        print(s["sql"])
+
+    if args.apply and unique:
+        conn.autocommit = True                    # CREATE INDEX CONCURRENTLY
+        with conn.cursor() as cur:
+            for s in unique:
+                cur.execute(s["sql"].rstrip(";"))
+            cur.execute("ANALYZE")
+        conn.autocommit = False
+        print("\n=== after creating the indexes ===")
+        for name, (sql, params) in DASHBOARD_QUERIES.items():
+            after = explain(db, sql, _fill(params, probes))
+            print(f"{name:<45} {before[name]['execution_ms'] or 0:9.1f} ms → "
+                  f"{after['execution_ms'] or 0:9.1f} ms  "
+                  f"seq scans: {', '.join(x['relation'] for x in after['seq_scans']) or '-'}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
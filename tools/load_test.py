@@ -0,0 +1,283 @@
+"""Drive N concurrent dashboard sessions against one Streamlit server.
+
+    python tools/load_test.py --dsn postgresql://localhost/viz_synthetic --sessions 1,5,10,25
+    python tools/load_test.py --url http://localhost:8501 --pid 4242 --sessions 10
+
+Starts ``streamlit run app.py`` on the DSN (seed it first with
+tools/synthetic_data.py) unless --url points at a running server. Then
+it opens N headless websocket clients spread over app.py and every page.
+Each client acts like a browser tab left open on its page: it asks for
+a rerun every --refresh seconds (the pages' autorefresh default) and
+times each rerun until ``script_finished``. Every step reports rerun
+latency percentiles, database queries per second, open connections and
+the server's RSS. The row is appended to --out so capacity can be
+compared between releases.
+
+Headless clients are used instead of ``streamlit.testing`` AppTest,
+because AppTest swaps the global runtime and secrets on every run and
+cannot run sessions concurrently.
+
+Needs ``websockets`` (in requirements.txt) for the clients. ``psutil``
+stays optional: without it the server's RSS is read from /proc.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import pandas as pd
+import psycopg2
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DSN = os.environ.get("VIZ_LOCAL_DSN", "postgresql://localhost/viz_synthetic")
+DEFAULT_OUT = os.path.join(os.path.expanduser("~"), ".cache", "viz", "load_tests.jsonl")
+RERUN_TIMEOUT_S = 120.0
+
+
+def pages() -> list[str]:
+    """Page names as the server resolves them ("" is app.py)."""
+    names = sorted(f[:-3] for f in os.listdir(os.path.join(ROOT, "pages"))
+                   if f.endswith(".py") and not f.startswith("_"))
+    return [""] + names
+
+
+# ───────────────────────────────────────────────────────────────
+# 1. Server process, RSS and database-side counters
+# ───────────────────────────────────────────────────────────────
+def start_server(dsn: str, port: int, warm: bool = False) -> tuple[subprocess.Popen, str]:
+    """``streamlit run app.py``, or serve.py (same options) when ``warm``."""
+    secrets = tempfile.NamedTemporaryFile("w", suffix=".toml", delete=False)
+    secrets.write(f'[neon]\ndsn = "{dsn}"\n')
+    secrets.close()
+    proc = subprocess.Popen(
+        [sys.executable, *(["serve.py"] if warm else ["-m", "streamlit", "run", "app.py"]),
+         "--server.headless=true", f"--server.port={port}",
+         "--server.fileWatcherType=none", "--browser.gatherUsageStats=false",
+         f"--secrets.files={secrets.name}"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://localhost:{port}"
+    for _ in range(120):
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return proc, url
+        except OSError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise SystemExit("streamlit server did not become healthy")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    # scheduler workers finish their current job first; do not wait for backoffs
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def rss_mb(pid: int | None) -> float | None:
+    if not pid:
+        return None
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss / 2**20
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class DbCounters:
+    """Statement count and open connections of the app's database.
+
+    Statements come from pg_stat_statements when it is installed. Without
+    it, the sum of sequential and index scans is the nearest proxy.
+    """
+
+    def __init__(self, dsn: str):
+        self.conn = psycopg2.connect(dsn)
+        self.conn.autocommit = True
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+            self.source = "statements" if cur.fetchone() else "scans"
+
+    def sample(self) -> tuple[int, int]:
+        count_sql = (
+            "SELECT COALESCE(SUM(calls), 0) FROM pg_stat_statements s "
+            "JOIN pg_database d ON d.oid = s.dbid WHERE d.datname = current_database()"
+            if self.source == "statements" else
+            "SELECT COALESCE(SUM(seq_scan + COALESCE(idx_scan, 0)), 0) FROM pg_stat_user_tables")
+        with self.conn.cursor() as cur:
+            cur.execute(count_sql)
+            count = int(cur.fetchone()[0])
+            cur.execute("SELECT count(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() AND pid <> pg_backend_pid()")
+            conns = int(cur.fetchone()[0])
+        return count, conns
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. One headless session: rerun, wait for script_finished, sleep
+# ───────────────────────────────────────────────────────────────
+async def _rerun(ws, page: str, auto: bool, elements: list | None = None) -> bool:
+    """One script run; True if it finished without an exception element.
+
+    New elements of the run are appended to ``elements`` when given.
+    """
+    msg = BackMsg()
+    msg.rerun_script.page_name = page
+    msg.rerun_script.is_auto_rerun = auto
+    await ws.send(msg.SerializeToString())
+    failed = False
+    while True:
+        fwd = ForwardMsg()
+        fwd.ParseFromString(await ws.recv())
+        kind = fwd.WhichOneof("type")
+        if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+            if fwd.delta.new_element.WhichOneof("type") == "exception":
+                failed = True
+            if elements is not None:
+                elements.append(fwd.delta.new_element)
+        elif kind == "script_finished":
+            return not failed and fwd.script_finished in (
+                ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+
+
+async def session(url: str, page: str, refresh_s: float, stop_at: float, runs: list) -> None:
+    ws_url = url.replace("http", "ws", 1) + "/_stcore/stream"
+    await asyncio.sleep(random.uniform(0, refresh_s))        # tabs open at different times
+    try:
+        async with websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None) as ws:
+            n = 0
+            while time.monotonic() < stop_at:
+                t0 = time.perf_counter()
+                try:
+                    ok = await asyncio.wait_for(_rerun(ws, page, n > 0), RERUN_TIMEOUT_S)
+                except asyncio.TimeoutError:
+                    ok = False
+                ms = (time.perf_counter() - t0) * 1000
+                runs.append({"page": page or "app", "first": n == 0, "ms": ms, "ok": ok})
+                n += 1
+                await asyncio.sleep(max(0.0, refresh_s - ms / 1000))
+    except (OSError, websockets.WebSocketException):
+        runs.append({"page": page or "app", "first": True, "ms": float("nan"), "ok": False})
+
+
+# ───────────────────────────────────────────────────────────────
+# 3. One step of N sessions, then the report
+# ───────────────────────────────────────────────────────────────
+async def run_step(url: str, n: int, duration_s: float, refresh_s: float,
+                   counters: DbCounters, pid: int | None) -> dict:
+    names = pages()
+    runs: list[dict] = []
+    samples = []
+    stop_at = time.monotonic() + duration_s
+    tasks = [asyncio.create_task(session(url, names[i % len(names)], refresh_s, stop_at, runs))
+             for i in range(n)]
+    t0 = time.monotonic()
+    count0, _ = await asyncio.to_thread(counters.sample)
+    while time.monotonic() < stop_at:
+        await asyncio.sleep(2.0)
+        count, conns = await asyncio.to_thread(counters.sample)
+        samples.append({"count": count, "conns": conns, "rss_mb": rss_mb(pid)})
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - t0
+
+    df = pd.DataFrame(runs)
+    steady = df[~df["first"] & df["ok"]]["ms"] if not df.empty else pd.Series(dtype=float)
+    first = df[df["first"] & df["ok"]]["ms"] if not df.empty else pd.Series(dtype=float)
+    s = pd.DataFrame(samples)
+    # every sample is two statements of our own
+    own = 2 * (len(samples) + 1) if counters.source == "statements" else 0
+    return {
+        "sessions": n, "seconds": round(elapsed, 1), "reruns": len(df),
+        "errors": int((~df["ok"]).sum()) if not df.empty else 0,
+        "p50_ms": steady.quantile(0.50), "p90_ms": steady.quantile(0.90),
+        "p99_ms": steady.quantile(0.99), "max_ms": steady.max(),
+        "first_p50_ms": first.quantile(0.50),
+        "db_per_s": (s["count"].iat[-1] - count0 - own) / elapsed if not s.empty else None,
+        "db_count": counters.source,
+        "conns_max": int(s["conns"].max()) if not s.empty else None,
+        "rss_mb_start": s["rss_mb"].iat[0] if not s.empty else None,
+        "rss_mb_max": s["rss_mb"].max() if not s.empty else None,
+    }
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--dsn", default=DEFAULT_DSN)
+    ap.add_argument("--url", help="use a running server instead of starting one")
+    ap.add_argument("--pid", type=int, help="server pid for RSS when --url is given")
+    ap.add_argument("--port", type=int, default=8599)
+    ap.add_argument("--sessions", default="1,5,10,25", help="comma-separated steps")
+    ap.add_argument("--duration", type=float, default=60.0, help="seconds per step")
+    ap.add_argument("--refresh", type=float, default=5.0, help="autorefresh interval (s)")
+    ap.add_argument("--label", default="", help="stored with the results, e.g. a release")
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    args = ap.parse_args()
+
+    proc = None
+    if args.url:
+        url, pid = args.url.rstrip("/"), args.pid
+    else:
+        proc, url = start_server(args.dsn, args.port)
+        pid = proc.pid
+    counters = DbCounters(args.dsn)
+    meta = {"at": pd.Timestamp.now().isoformat(timespec="seconds"), "rev": _git_rev(),
+            "label": args.label, "refresh_s": args.refresh}
+    rows = []
+    try:
+        for n in (int(x) for x in args.sessions.split(",") if x.strip()):
+            row = asyncio.run(run_step(url, n, args.duration, args.refresh, counters, pid))
+            rows.append(row)
+            print(f"{n:>4} sessions  p50 {row['p50_ms']:7.0f} ms  p99 {row['p99_ms']:7.0f} ms  "
+                  f"db {row['db_per_s'] or 0:6.1f}/s  conns {row['conns_max']}  "
+                  f"rss {row['rss_mb_max'] or 0:6.0f} MB  errors {row['errors']}", flush=True)
+    finally:
+        counters.close()
+        if proc is not None:
+            stop_server(proc)
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps({**meta, **row}, default=float) + "\n")
+    print(f"\nappended {len(rows)} rows to {args.out}")
+    print(pd.DataFrame(rows).round(1).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Insert sales at a fixed high rate to soak-test the realtime pages.
+
+    python tools/replay_sales.py --dsn postgresql://localhost/viz_synthetic --rate 500
+    python tools/replay_sales.py --rate 2000 --baskets recorded --hours 4 --url http://localhost:8501 --pid 4242
+
+Inserts into ``sales`` / ``salesitems`` of a local database (seed it with
+tools/synthetic_data.py) at 1 to 2,000 sales per second. Sales are spread
+over --cashiers cashiers and written in one transaction per --batch-ms.
+Baskets are either drawn from recorded sales already in the database or
+generated with the same skew as the synthetic data.
+
+A headless session (see tools/load_test.py) keeps the realtime page open
+at its refresh interval. The newest sale time drawn in its chart gives
+the freshness lag: when a sale time first appears on screen, minus when
+the first batch holding that time committed. Sale times have one-second
+resolution, so the lag is an upper bound within a second. Every
+--report-every seconds the achieved rate, lag percentiles and the server
+RSS (with growth per hour) are printed and appended to --out.
+
+Like tools/load_test.py it needs ``websockets`` (in requirements.txt).
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg2
+import websockets
+from psycopg2.extras import execute_values
+
+from load_test import RERUN_TIMEOUT_S, _rerun, rss_mb, start_server, stop_server
+
+DEFAULT_DSN = os.environ.get("VIZ_LOCAL_DSN", "postgresql://localhost/viz_synthetic")
+DEFAULT_OUT = os.path.join(os.path.expanduser("~"), ".cache", "viz", "soak_runs.jsonl")
+MAX_RATE    = 2_000
+RECORDED_BASKETS = 20_000          # most recent sales sampled by --baskets recorded
+
+
+# ───────────────────────────────────────────────────────────────
+# 1. Basket sources
+# ───────────────────────────────────────────────────────────────
+class Baskets:
+    """Draws (itemid, quantity, unitprice) lists for new sales."""
+
+    def __init__(self, conn, source: str, seed: int | None = None):
+        self.rng = random.Random(seed)
+        with conn.cursor() as cur:
+            cur.execute("SELECT itemid, sellingprice FROM item ORDER BY itemid")
+            items = cur.fetchall()
+            if not items:
+                raise SystemExit("no items; seed the database with tools/synthetic_data.py")
+            self.items = [(i, float(p or 0)) for i, p in items]
+            self.recorded = []
+            if source == "recorded":
+                cur.execute("""
+                    SELECT array_agg(si.itemid), array_agg(si.quantity), array_agg(si.unitprice)
+                      FROM salesitems si
+                     WHERE si.saleid > (SELECT COALESCE(MAX(saleid), 0) - %s FROM sales)
+                     GROUP BY si.saleid""", (RECORDED_BASKETS,))
+                self.recorded = [list(zip(ids, qty, (float(p or 0) for p in price)))
+                                 for ids, qty, price in cur.fetchall()]
+                if not self.recorded:
+                    raise SystemExit("no recorded baskets; use --baskets synthetic")
+        conn.rollback()
+
+    def draw(self) -> list[tuple]:
+        if self.recorded:
+            return self.rng.choice(self.recorded)
+        # 1–6 lines, random()^3 skew towards low item ids as in synthetic_data.py
+        lines = []
+        for _ in range(1 + self.rng.randrange(6)):
+            itemid, price = self.items[int(len(self.items) * self.rng.random() ** 3)]
+            lines.append((itemid, 1 + self.rng.randrange(4), price))
+        return lines
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Batched inserter (own thread, own connection)
+# ───────────────────────────────────────────────────────────────
+class Replayer:
+    """Commits ``rate * batch_ms / 1000`` sales per transaction on a fixed tick."""
+
+    def __init__(self, dsn: str, rate: float, batch_ms: float, cashiers: int, baskets: str):
+        self.conn     = psycopg2.connect(dsn)
+        self.baskets  = Baskets(self.conn, baskets)
+        self.rate     = rate
+        self.batch_s  = batch_ms / 1000
+        self.cashiers = [f"Cashier {i}" for i in range(1, cashiers + 1)]
+        self.sales    = 0
+        self.lines    = 0
+        self.behind   = 0                      # ticks that started late
+        self.commits: list[tuple[str, float]] = []   # (first sale second, commit wall time)
+        self._lock    = threading.Lock()
+        self._stop    = threading.Event()
+
+    def _batch(self, n: int) -> None:
+        baskets = [self.baskets.draw() for _ in range(n)]
+        rng = self.baskets.rng
+        with self.conn.cursor() as cur:
+            heads = execute_values(cur, """
+                INSERT INTO sales (saletime, totalamount, cashier) VALUES %s
+                RETURNING saleid, to_char(saletime, 'YYYY-MM-DD"T"HH24:MI:SS')""",
+                [(round(sum(q * p for _, q, p in b), 2), rng.choice(self.cashiers))
+                 for b in baskets],
+                template="(LOCALTIMESTAMP(0), %s, %s)", page_size=n, fetch=True)
+            rows = [(saleid, itemid, q, p, round(q * p, 2))
+                    for (saleid, _), basket in zip(heads, baskets) for itemid, q, p in basket]
+            execute_values(cur, """
+                INSERT INTO salesitems (saleid, itemid, quantity, unitprice, totalprice)
+                VALUES %s""", rows, page_size=len(rows))
+        self.conn.commit()
+        with self._lock:
+            self.commits.append((heads[0][1], time.time()))
+            self.sales += n
+            self.lines += len(rows)
+
+    def run(self) -> None:
+        due, owed = time.monotonic(), 0.0
+        while not self._stop.is_set():
+            owed += self.rate * self.batch_s
+            n, owed = int(owed), owed - int(owed)
+            if n:
+                self._batch(n)
+            due += self.batch_s
+            wait = due - time.monotonic()
+            if wait > 0:
+                self._stop.wait(wait)
+            else:
+                self.behind += 1
+
+    def start(self) -> threading.Thread:
+        t = threading.Thread(target=self.run, name="replayer", daemon=True)
+        t.start()
+        return t
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def committed_at(self, second: str) -> float | None:
+        """Commit time of the first batch whose sales carry ``second``."""
+        with self._lock:
+            i = bisect.bisect_left(self.commits, (second,))
+            if i < len(self.commits) and self.commits[i][0] == second:
+                return self.commits[i][1]
+        return None
+
+
+# ───────────────────────────────────────────────────────────────
+# 3. Watcher: newest sale time on the realtime page
+# ───────────────────────────────────────────────────────────────
+_CHART_TIMES = re.compile(r'"t": (\[[^\]]*\])')
+
+
+def newest_on_screen(elements) -> str | None:
+    newest = None
+    for el in elements:
+        if el.WhichOneof("type") != "iframe":
+            continue
+        m = _CHART_TIMES.search(el.iframe.srcdoc)
+        if m:
+            times = json.loads(m.group(1))
+            if times:
+                newest = max(newest or "", max(times))
+    return newest
+
+
+async def watch(url: str, refresh_s: float, stop_at: float, replayer: Replayer,
+                lags: list) -> None:
+    ws_url = url.replace("http", "ws", 1) + "/_stcore/stream"
+    seen = ""
+    async with websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None) as ws:
+        n = 0
+        while time.monotonic() < stop_at:
+            t0 = time.perf_counter()
+            elements = []
+            try:
+                await asyncio.wait_for(_rerun(ws, "realtime", n > 0, elements), RERUN_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                pass
+            shown = time.time()
+            newest = newest_on_screen(elements)
+            if newest and newest > seen:
+                seen = newest
+                committed = replayer.committed_at(newest)
+                if committed is not None:
+                    lags.append((shown, shown - committed))
+            n += 1
+            await asyncio.sleep(max(0.0, refresh_s - (time.perf_counter() - t0)))
+
+
+# ───────────────────────────────────────────────────────────────
+# 4. Periodic report
+# ───────────────────────────────────────────────────────────────
+def growth_mb_per_h(rss: list[tuple[float, float]]) -> float | None:
+    if len(rss) < 3:
+        return None
+    t, mb = np.array(rss).T
+    return float(np.polyfit((t - t[0]) / 3600, mb, 1)[0])
+
+
+async def soak(args, url: str, pid: int | None, replayer: Replayer) -> list[dict]:
+    start = time.monotonic()
+    stop_at = start + args.hours * 3600
+    lags: list[tuple[float, float]] = []
+    rss: list[tuple[float, float]] = []
+    watcher = asyncio.create_task(watch(url, args.refresh, stop_at, replayer, lags))
+    reports, last_sales, last_t, last_lag = [], 0, time.monotonic(), 0
+    while time.monotonic() < stop_at and not watcher.done():
+        await asyncio.sleep(min(args.report_every, max(0.0, stop_at - time.monotonic())))
+        now = time.monotonic()
+        mb = rss_mb(pid)
+        if mb is not None:
+            rss.append((now, mb))
+        window = np.array([lag for _, lag in lags[last_lag:]])
+        row = {
+            "at": pd.Timestamp.now().isoformat(timespec="seconds"),
+            "elapsed_min": round((now - start) / 60, 1),
+            "rate": round((replayer.sales - last_sales) / (now - last_t), 1),
+            "sales": replayer.sales, "lines": replayer.lines, "behind": replayer.behind,
+            "lag_p50_s": float(np.percentile(window, 50)) if window.size else None,
+            "lag_p95_s": float(np.percentile(window, 95)) if window.size else None,
+            "lag_max_s": float(window.max()) if window.size else None,
+            "rss_mb": mb, "rss_growth_mb_h": growth_mb_per_h(rss),
+        }
+        reports.append(row)
+        last_sales, last_t, last_lag = replayer.sales, now, len(lags)
+        print(f"{row['elapsed_min']:7.1f} min  {row['rate']:7.1f} sales/s  "
+              f"lag p50 {row['lag_p50_s'] or 0:5.1f} s  p95 {row['lag_p95_s'] or 0:5.1f} s  "
+              f"rss {mb or 0:6.0f} MB  growth {row['rss_growth_mb_h'] or 0:+6.1f} MB/h", flush=True)
+    if watcher.done() and watcher.exception():
+        print("watcher stopped:", watcher.exception())
+    watcher.cancel()
+    return reports
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--dsn", default=DEFAULT_DSN)
+    ap.add_argument("--rate", type=float, default=100.0, help=f"sales per second (≤ {MAX_RATE})")
+    ap.add_argument("--batch-ms", type=float, default=100.0, help="one transaction per tick")
+    ap.add_argument("--cashiers", type=int, default=12)
+    ap.add_argument("--baskets", choices=["synthetic", "recorded"], default="synthetic")
+    ap.add_argument("--hours", type=float, default=1.0)
+    ap.add_argument("--refresh", type=float, default=5.0, help="realtime page refresh (s)")
+    ap.add_argument("--report-every", type=float, default=60.0, help="seconds")
+    ap.add_argument("--url", help="use a running server instead of starting one")
+    ap.add_argument("--pid", type=int, help="server pid for RSS when --url is given")
+    ap.add_argument("--port", type=int, default=8598)
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    args = ap.parse_args()
+    if not 1 <= args.rate <= MAX_RATE:
+        ap.error(f"--rate must be between 1 and {MAX_RATE}")
+
+    proc = None
+    if args.url:
+        url, pid = args.url.rstrip("/"), args.pid
+    else:
+        proc, url = start_server(args.dsn, args.port)
+        pid = proc.pid
+    replayer = Replayer(args.dsn, args.rate, args.batch_ms, args.cashiers, args.baskets)
+    thread = replayer.start()
+    meta = {"rate_target": args.rate, "batch_ms": args.batch_ms, "baskets": args.baskets,
+            "cashiers": args.cashiers}
+    try:
+        reports = asyncio.run(soak(args, url, pid, replayer))
+    finally:
+        replayer.stop()
+        thread.join(timeout=10)
+        replayer.conn.close()
+        if proc is not None:
+            stop_server(proc)
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        for row in reports:
+            f.write(json.dumps({**meta, **row}) + "\n")
+    print(f"\n{replayer.sales:,} sales / {replayer.lines:,} lines inserted; "
+          f"{len(reports)} reports appended to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Import time and time-to-first-render of app.py and every page.
+
+    python tools/startup_report.py --dsn postgresql://localhost/viz_synthetic
+    python tools/startup_report.py --warm --settle 20     # through serve.py
+
+Import time: each script's top-level imports are executed in a fresh
+interpreter and timed one statement at a time, as a cold worker would.
+Time to first render: for each page a fresh server is started (like
+right after a deploy), optionally given --settle seconds, then one
+session opens the page. The tool records the time to the first element
+on screen and to ``script_finished``, and the same again for a second
+session once the caches are warm. With --warm the server is started
+through serve.py, so the warm-up hook runs before the first session.
+
+Like tools/load_test.py it needs ``websockets`` (in requirements.txt).
+"""
+import argparse
+import ast
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from load_test import (DEFAULT_DSN, ROOT, RERUN_TIMEOUT_S, pages,
+                       start_server, stop_server)
+
+DEFAULT_OUT = os.path.join(os.path.expanduser("~"), ".cache", "viz", "startup_reports.jsonl")
+
+
+# ───────────────────────────────────────────────────────────────
+# 1. Cold import time of each script's top-level imports
+# ───────────────────────────────────────────────────────────────
+_TIMER = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+out = []
+for stmt in {stmts!r}:
+    t0 = time.perf_counter()
+    try:
+        exec(stmt, {{}})
+        error = None
+    except Exception as exc:
+        error = type(exc).__name__
+    out.append([stmt, (time.perf_counter() - t0) * 1000, error])
+print(json.dumps(out))
+"""
+
+
+def script_path(page: str) -> str:
+    return os.path.join(ROOT, "app.py" if not page else os.path.join("pages", f"{page}.py"))
+
+
+def import_statements(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def import_times(page: str) -> list[tuple[str, float, str | None]]:
+    code = _TIMER.format(root=ROOT, stmts=import_statements(script_path(page)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                         text=True, check=True)
+    return [tuple(x) for x in json.loads(out.stdout.strip().splitlines()[-1])]
+
+
+# ───────────────────────────────────────────────────────────────
+# 2. Time to first element / full render on a fresh server
+# ───────────────────────────────────────────────────────────────
+async def first_render(url: str, page: str) -> dict:
+    """Open one session on ``page``: ms to the first element and to the end."""
+    ws_url = url.replace("http", "ws", 1) + "/_stcore/stream"
+    t0 = time.perf_counter()
+    first = None
+    ok = True
+    async with websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None) as ws:
+        msg = BackMsg()
+        msg.rerun_script.page_name = page
+        await ws.send(msg.SerializeToString())
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await asyncio.wait_for(ws.recv(), RERUN_TIMEOUT_S))
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                if first is None:
+                    first = (time.perf_counter() - t0) * 1000
+                if fwd.delta.new_element.WhichOneof("type") == "exception":
+                    ok = False
+            elif kind == "script_finished":
+                return {"first_element_ms": first, "render_ms": (time.perf_counter() - t0) * 1000,
+                        "ok": ok}
+
+
+def render_times(dsn: str, port: int, page: str, warm: bool, settle_s: float) -> dict:
+    proc, url = start_server(dsn, port, warm=warm)
+    try:
+        time.sleep(settle_s)
+        cold = asyncio.run(first_render(url, page))
+        again = asyncio.run(first_render(url, page))
+    finally:
+        stop_server(proc)
+    return {"cold_first_element_ms": cold["first_element_ms"],
+            "cold_render_ms": cold["render_ms"],
+            "warm_render_ms": again["render_ms"],
+            "ok": cold["ok"] and again["ok"]}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--dsn", default=DEFAULT_DSN)
+    ap.add_argument("--port", type=int, default=8597)
+    ap.add_argument("--warm", action="store_true", help="start the server through serve.py")
+    ap.add_argument("--settle", type=float, default=0.0,
+                    help="seconds between server start and the first session")
+    ap.add_argument("--imports-only", action="store_true")
+    ap.add_argument("--top", type=int, default=3, help="slowest imports listed per page")
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    args = ap.parse_args()
+
+    rows = []
+    for page in pages():
+        name = page or "app"
+        times = import_times(page)
+        slowest = sorted(times, key=lambda t: -t[1])[:args.top]
+        row = {"page": name, "import_ms": sum(ms for _, ms, _ in times),
+               "slowest_imports": "; ".join(f"{stmt} {ms:.0f} ms" for stmt, ms, _ in slowest),
+               "failed_imports": "; ".join(f"{stmt} ({err})" for stmt, _, err in times if err)}
+        if not args.imports_only:
+            row.update(render_times(args.dsn, args.port, page, args.warm, args.settle))
+        rows.append(row)
+        print(f"{name:<16} imports {row['import_ms']:7.0f} ms"
+              + (f"   first element {row['cold_first_element_ms'] or 0:7.0f} ms   "
+                 f"render cold {row['cold_render_ms']:7.0f} ms / "
+                 f"warm {row['warm_render_ms']:6.0f} ms"
+                 if not args.imports_only else ""), flush=True)
+
+    meta = {"at": pd.Timestamp.now().isoformat(timespec="seconds"), "warm": args.warm,
+            "settle_s": args.settle}
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps({**meta, **row}) + "\n")
+    print(f"\nappended {len(rows)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Fill a local Postgres with a synthetic copy of the store schema.
+
+    python tools/synthetic_data.py --dsn postgresql://localhost/viz_synthetic --sales 500000
+
+Only primary keys are created, like a freshly restored database, so
+tools/explain_report.py shows which dashboard queries need indexes.
+Sale ids grow with sale time and item popularity is skewed (a few items
+sell far more often), which is what the realtime pages assume.
+"""
+import argparse
+import os
+import time
+
+import psycopg2
+
+DEFAULT_DSN = os.environ.get("VIZ_LOCAL_DSN", "postgresql://localhost/viz_synthetic")
+
+SCHEMA_SQL = """
+DROP TABLE IF EXISTS salesitems, sales, inventory, item, supplier, dropdowns CASCADE;
+
+CREATE TABLE supplier (
+    supplierid   serial PRIMARY KEY,
+    suppliername text NOT NULL
+);
+CREATE TABLE dropdowns (
+    section text NOT NULL,
+    value   text NOT NULL
+);
+CREATE TABLE item (
+    itemid          serial PRIMARY KEY,
+    itemnameenglish text,
+    familycat       text,
+    sectioncat      text,
+    departmentcat   text,
+    classcat        text,
+    sellingprice    numeric(10, 2)
+);
+CREATE TABLE inventory (
+    inventoryid   serial PRIMARY KEY,
+    itemid        integer REFERENCES item (itemid),
+    supplierid    integer REFERENCES supplier (supplierid),
+    quantity      integer,
+    cost_per_unit numeric(10, 2)
+);
+CREATE TABLE sales (
+    saleid      bigserial PRIMARY KEY,
+    saletime    timestamp NOT NULL,
+    totalamount numeric(12, 2),
+    cashier     text
+);
+CREATE TABLE salesitems (
+    salesitemid bigserial PRIMARY KEY,
+    saleid      bigint REFERENCES sales (saleid),
+    itemid      integer REFERENCES item (itemid),
+    quantity    integer,
+    unitprice   numeric(10, 2),
+    totalprice  numeric(12, 2)
+);
+"""
+
+FILL_SQL = [
+    ("supplier", """
+        INSERT INTO supplier (suppliername)
+        SELECT 'Supplier ' || g FROM generate_series(1, 25) g
+    """),
+    ("dropdowns", """
+        INSERT INTO dropdowns (section, value)
+        SELECT s, s || ' ' || g
+          FROM unnest(ARRAY['family', 'section', 'department', 'class']) s,
+               generate_series(1, 10) g
+    """),
+    ("item", """
+        INSERT INTO item (itemnameenglish, familycat, sectioncat, departmentcat,
+                          classcat, sellingprice)
+        SELECT 'Item ' || g, 'Family ' || g %% 12, 'Section ' || g %% 40,
+               'Department ' || g %% 8, 'Class ' || g %% 150,
+               round((0.5 + random() * 49.5)::numeric, 2)
+          FROM generate_series(1, %(items)s) g
+    """),
+    ("inventory", """
+        INSERT INTO inventory (itemid, supplierid, quantity, cost_per_unit)
+        SELECT i.itemid, 1 + (i.itemid + n) %% 25, (10 + random() * 190)::int,
+               round(i.sellingprice * (0.5 + random() * 0.3), 2)
+          FROM item i, LATERAL generate_series(1, 1 + i.itemid %% 4) n
+    """),
+    # saleid order == saletime order, spread evenly over the last --days days
+    ("sales", """
+        INSERT INTO sales (saletime, totalamount, cashier)
+        SELECT date_trunc('second', LOCALTIMESTAMP - make_interval(
+                   secs => (%(sales)s - g) * %(days)s * 86400.0 / %(sales)s)),
+               0, 'Cashier ' || (1 + (random() * (%(cashiers)s - 1))::int)
+          FROM generate_series(1, %(sales)s) g
+    """),
+    # 1–6 lines per sale; random()^3 makes low item ids the best sellers
+    ("salesitems", """
+        INSERT INTO salesitems (saleid, itemid, quantity, unitprice, totalprice)
+        SELECT s.saleid, i.itemid, q.qty, i.sellingprice, q.qty * i.sellingprice
+          FROM sales s
+         CROSS JOIN LATERAL generate_series(1, 1 + (s.saleid * 7919) %% 6) n
+         CROSS JOIN LATERAL (SELECT 1 + floor(%(items)s * random() ^ 3)::int AS itemid,
+                                    1 + floor(random() * 4)::int AS qty
+                              WHERE n > 0) q
+          JOIN item i ON i.itemid = q.itemid
+    """),
+    ("sales totals", """
+        UPDATE sales s SET totalamount = t.total
+          FROM (SELECT saleid, SUM(totalprice) AS total FROM salesitems GROUP BY saleid) t
+         WHERE t.saleid = s.saleid
+    """),
+]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--dsn", default=DEFAULT_DSN)
+    ap.add_argument("--sales", type=int, default=200_000)
+    ap.add_argument("--items", type=int, default=5_000)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--cashiers", type=int, default=12)
+    args = ap.parse_args()
+    params = {"sales": args.sales, "items": args.items, "days": args.days,
+              "cashiers": args.cashiers}
+
+    conn = psycopg2.connect(args.dsn)
+    with conn, conn.cursor() as cur:
+        cur.execute(SCHEMA_SQL)
+        for name, sql in FILL_SQL:
+            t0 = time.perf_counter()
+            cur.execute(sql, params)
+            print(f"{name:<14} {cur.rowcount:>10,} rows  {time.perf_counter() - t0:6.1f} s")
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE")
+    conn.close()
+    print("done; now run tools/explain_report.py --dsn", args.dsn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import importlib
+import os
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+# ───────────────────────────────────────────────────────────────
+# 1. Warm-up: connections, reference data and hot snapshots
+# ───────────────────────────────────────────────────────────────
+WARMUP_WAIT_S = float(os.environ.get("VIZ_WARMUP_WAIT_S", "60"))   # per snapshot
+HOT_JOBS = ["item_dim", "recent_blocks", "minute_buckets", "cashier_rollups",
+            "top_items", "category_leaderboards", "quantile_sketches", "heatmap_pyramid"]
+# imported by pages only when a chart is drawn; loaded last, off the page's path
+LAZY_MODULES = ["matplotlib.pyplot", "seaborn"]
+
+
+def _runtime_ready(timeout: float) -> bool:
+    """Wait until ``streamlit run`` has applied its config (secrets paths)."""
+    from streamlit.runtime import Runtime
+    deadline = time.monotonic() + timeout
+    while not Runtime.exists():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.1)
+    return True
+
+
+def _import(module: str) -> None:
+    importlib.import_module(module)
+
+
+class WarmUp:
+    """Runs the warm-up steps once, in order, on a background thread."""
+
+    def __init__(self):
+        self.steps: list[dict] = []
+        self.state    = "idle"
+        self.started  = None
+        self.finished = None
+        self._lock    = threading.Lock()
+
+    def _step(self, name: str, fn) -> None:
+        t0 = time.perf_counter()
+        try:
+            detail = fn()
+        except Exception as exc:
+            ok, detail = False, f"{type(exc).__name__}: {exc}"
+        else:
+            ok = detail is not False
+        with self._lock:
+            self.steps.append({"step": name, "ms": (time.perf_counter() - t0) * 1000,
+                               "ok": ok, "detail": "" if detail in (None, True, False)
+                               else str(detail)})
+
+    def run(self, wait_for_runtime: bool = False) -> None:
+        self.state, self.started = "running", time.time()
+        if wait_for_runtime:
+            self._step("wait for server", lambda: _runtime_ready(WARMUP_WAIT_S))
+        from datasets import get_scheduler
+        from db_handler import DatabaseManager, get_warm_pool
+        from schema_registry import get_registry
+
+        def connections():
+            pool = get_warm_pool(st.secrets["neon"]["dsn"])
+            pool.tick()                            # fill the spares now, not on the next ping
+            return f"{pool.ready()} ready"
+
+        self._step("connections", connections)
+        self._step("schema registry",
+                   lambda: get_registry().ensure(DatabaseManager(key="warmup")).metrics()["tables"])
+        sched = get_scheduler()
+        for job in HOT_JOBS:
+            self._step(f"snapshot {job}",
+                       lambda job=job: sched.snapshot(job, WARMUP_WAIT_S) is not None)
+        for module in LAZY_MODULES:
+            self._step(f"import {module}", lambda module=module: _import(module))
+        self.state, self.finished = "done", time.time()
+
+    def start(self, wait_for_runtime: bool = False) -> "WarmUp":
+        with self._lock:
+            if self.state != "idle":
+                return self
+            self.state = "starting"
+        threading.Thread(target=self.run, args=(wait_for_runtime,), name="warmup",
+                         daemon=True).start()
+        return self
+
+    def report(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.DataFrame(self.steps, columns=["step", "ms", "ok", "detail"])
+
+
+warmup = WarmUp()
+
+
+@st.cache_resource(show_spinner=False)
+def start_warmup() -> WarmUp:
+    """Start the warm-up once per process (no-op if serve.py already did)."""
+    return warmup.start()